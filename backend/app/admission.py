@@ -0,0 +1,204 @@
+"""Admission control in front of the routers.
+
+API requests are split into two classes: catalog reads (GET/HEAD outside /api/cart, plus
+the read-only POST /api/products/batch) and writes (everything else under /api, including
+every cart route). Each class has its own concurrency limit and a bounded FIFO wait queue.
+A request that finds the queue full, or that waits longer than admission_queue_timeout,
+gets 503 with Retry-After. Past that point, extra load turns into quick rejections
+instead of an unbounded backlog on the threadpool and the SQLite pools, and p99 stays
+bounded. The read limit never exceeds the reader pool, so an admitted read does not queue
+for a connection; a request that still times out on a pool gets the same 503
+(pool_timeout_handler) rather than a 500.
+
+A streamed response (NDJSON or ?stream=true listings) gives its slot back once the first
+body chunk is out: the rest of the download runs in short per-batch sessions, and a few
+slow stream clients must not hold every read slot.
+
+/, /health, /metrics, static files, the docs and the SSE stream are never shed. Limits apply per process.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+READ = "read"
+WRITE = "write"
+# POST-маршруты, которые только читают каталог (тело вместо длинной строки запроса)
+READ_POST_PATHS = ("/api/products/batch",)
+OVERLOADED = "Server is overloaded, retry later"
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class ConcurrencyLimiter:
+    """At most `limit` holders; up to `queue_size` waiters, each for at most `timeout` seconds."""
+
+    def __init__(self, limit: int, queue_size: int, timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "timeout": 0}
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            self.rejected["queue_full"] += 1
+            raise Overloaded("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            # Слот мог быть передан в тот же момент, когда истёк таймаут: тогда он уже наш
+            if not (waiter.done() and not waiter.cancelled()):
+                self._remove(waiter)
+                self.rejected["timeout"] += 1
+                raise Overloaded("timeout")
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # клиент ушёл сразу после получения слота
+            else:
+                self._remove(waiter)
+            raise
+        self.admitted += 1
+
+    def release(self) -> None:
+        # Слот передаётся первому ожидающему напрямую, active не меняется
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def _remove(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+
+def request_class(scope: Scope) -> Optional[str]:
+    """Admission class of a request, or None for routes that are never shed."""
+    path = scope["path"]
+    # /api/events держит соединение часами: у SSE свой лимит (events_max_connections)
+    if not path.startswith("/api/") or path.startswith(("/api/docs", "/api/redoc", "/api/events")):
+        return None
+    if scope["method"] in ("GET", "HEAD") and not path.startswith("/api/cart"):
+        return READ
+    if scope["method"] == "POST" and path in READ_POST_PATHS:
+        return READ
+    return WRITE
+
+
+def read_limit() -> int:
+    """admission_read_limit capped by the reader pool capacity (the capacity itself when unset)."""
+    pool_capacity = settings.db_read_pool_size + settings.db_read_max_overflow
+    if settings.admission_read_limit is None:
+        return pool_capacity
+    return min(settings.admission_read_limit, pool_capacity)
+
+
+def _limiters() -> Dict[str, ConcurrencyLimiter]:
+    return {
+        READ: ConcurrencyLimiter(read_limit(), settings.admission_read_queue, settings.admission_queue_timeout),
+        WRITE: ConcurrencyLimiter(settings.admission_write_limit, settings.admission_write_queue, settings.admission_queue_timeout),
+    }
+
+
+_limiters_by_class = _limiters()
+
+
+def get_limiters() -> Dict[str, ConcurrencyLimiter]:
+    return _limiters_by_class
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying the per-class limiters; the slot is held until the response ends."""
+
+    def __init__(self, app: ASGIApp, limiters: Optional[Dict[str, ConcurrencyLimiter]] = None):
+        self.app = app
+        self.limiters = limiters if limiters is not None else _limiters_by_class
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        kind = request_class(scope) if scope["type"] == "http" else None
+        if kind is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters[kind]
+        try:
+            await limiter.acquire()
+        except Overloaded:
+            await self._reject(send)
+            return
+
+        held = True
+
+        async def send_releasing_on_stream(message: Message) -> None:
+            nonlocal held
+            await send(message)
+            if held and message["type"] == "http.response.body" and message.get("more_body", False):
+                held = False
+                limiter.release()
+
+        try:
+            await self.app(scope, receive, send_releasing_on_stream)
+        finally:
+            if held:
+                limiter.release()
+
+    async def _reject(self, send: Send) -> None:
+        body = json.dumps({"detail": OVERLOADED}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(settings.admission_retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+async def pool_timeout_handler(request: Request, exc: Exception) -> JSONResponse:
+    """Exception handler for sqlalchemy.exc.TimeoutError: no pooled connection within db_pool_timeout."""
+    return JSONResponse(
+        {"detail": OVERLOADED},
+        status_code=503,
+        headers={"Retry-After": str(settings.admission_retry_after)},
+    )
+
+
+def admission_gauges() -> Iterable[Tuple[Dict[str, str], float]]:
+    for kind, limiter in _limiters_by_class.items():
+        yield {"class": kind, "stat": "active"}, limiter.active
+        yield {"class": kind, "stat": "queued"}, limiter.queued
+        yield {"class": kind, "stat": "limit"}, limiter.limit
+        yield {"class": kind, "stat": "admitted"}, limiter.admitted
+        for reason, count in limiter.rejected.items():
+            yield {"class": kind, "stat": f"rejected_{reason}"}, count
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from .config import settings
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTL and hit/miss/eviction counters.
+
+    get()/set() optionally take the catalog version the caller works at. The cache keeps
+    entries of a single version: a newer version drops everything stored so far, and a
+    caller at an older version neither reads nor stores entries.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.version: Optional[int] = None
+        self.generations = 0
+
+    def _admit(self, version: Optional[int]) -> bool:
+        # Вызывается под self._lock: False — версия вызывающего старше содержимого кэша
+        if version is None or version == self.version:
+            return True
+        if self.version is not None and version < self.version:
+            return False
+        if self.version is not None:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self.generations += 1
+        self.version = version
+        return True
+
+    def get(self, key: Hashable, version: Optional[int] = None) -> Optional[Any]:
+        with self._lock:
+            if not self._admit(version):
+                self.misses += 1
+                return None
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None) -> None:
+        with self._lock:
+            if not self._admit(version):
+                return
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_prefix(self, prefix: Tuple[Any, ...]) -> None:
+        """Drop every tuple key that starts with `prefix`."""
+        size = len(prefix)
+        with self._lock:
+            stale = [key for key in self._entries if isinstance(key, tuple) and key[:size] == prefix]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "generations": self.generations,
+            }
+
+
+class NullCache:
+    """Drop-in replacement that never stores anything (cache disabled / tests)."""
+
+    def get(self, key: Hashable, version: Optional[int] = None) -> Optional[Any]:
+        return None
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None) -> None:
+        pass
+
+    def invalidate(self, key: Hashable) -> None:
+        pass
+
+    def invalidate_prefix(self, prefix: Tuple[Any, ...]) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+
+class VersionMemo:
+    """Last catalog_state stamp, shared by the requests of one process for `ttl_seconds`.
+
+    Local writes and the event hub (which sees other workers' writes) call invalidate().
+    A read that started before an invalidation is not stored: pass set() the generation
+    taken before the read.
+    """
+
+    def __init__(self, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entry: Optional[Tuple[float, Any]] = None
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def get(self) -> Optional[Any]:
+        entry = self._entry
+        if entry is None or entry[0] <= self._clock():
+            return None
+        return entry[1]
+
+    def set(self, value: Any, generation: int) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if generation == self.generation:
+                self._entry = (self._clock() + self.ttl_seconds, value)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entry = None
+
+
+_version_memo = VersionMemo(settings.catalog_version_ttl)
+
+
+def get_catalog_version_memo() -> VersionMemo:
+    return _version_memo
+
+
+# Версия каталога, по которой текущий запрос выставил ETag (conditional_get); потоки
+# run_in_threadpool и задачи склейки получают её вместе с копией контекста
+_request_version: ContextVar[Optional[int]] = ContextVar("catalog_version", default=None)
+
+
+def set_request_catalog_version(version: Optional[int]) -> None:
+    _request_version.set(version)
+
+
+class VersionedCache:
+    """Catalog cache as the services see it: entries are tagged with the request's catalog version.
+
+    Every worker process has its own cache, and a write only clears the writer's. Here
+    a request at a newer version (read by conditional_get, see VersionMemo) drops the
+    entries of older versions, so no worker serves a body from before the version in the
+    ETag it sends. Without a version (POST routes, CLI, tests calling services directly)
+    the cache is bypassed.
+    """
+
+    def __init__(self, cache: TTLCache):
+        self.cache = cache
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        version = _request_version.get()
+        return None if version is None else self.cache.get(key, version)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        version = _request_version.get()
+        if version is not None:
+            self.cache.set(key, value, version)
+
+    def invalidate(self, key: Hashable) -> None:
+        self.cache.invalidate(key)
+
+    def invalidate_prefix(self, prefix: Tuple[Any, ...]) -> None:
+        self.cache.invalidate_prefix(prefix)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return self.cache.stats()
+
+
+_catalog_cache: Any = None
+
+
+def get_catalog_cache() -> Any:
+    """Process-wide cache of validated catalog responses, built from Settings on first use."""
+    global _catalog_cache
+    if _catalog_cache is None:
+        if settings.cache_enabled:
+            _catalog_cache = VersionedCache(TTLCache(settings.cache_max_entries, settings.cache_ttl_seconds))
+        else:
+            _catalog_cache = NullCache()
+    return _catalog_cache
+
+
+def set_catalog_cache(cache: Any) -> None:
+    """Swap the catalog cache (e.g. NullCache() in tests); None rebuilds it from Settings."""
+    global _catalog_cache
+    _catalog_cache = cache
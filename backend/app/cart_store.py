@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models.cart import Cart, CartLine
+
+
+def new_cart_token() -> str:
+    return secrets.token_urlsafe(16)
+
+
+class CartOperationError(Exception):
+    def __init__(self, index: int, message: str):
+        super().__init__(message)
+        self.index = index
+        self.message = message
+
+
+CartOp = Tuple[str, int, Optional[int]]
+
+
+def plan_operations(lines: Dict[int, int], operations: Iterable[CartOp]) -> Dict[int, Optional[int]]:
+    """Replay (op, product_id, quantity) over a snapshot; returns the changed lines (None = removed).
+
+    Raises CartOperationError on the first invalid operation so nothing is applied.
+    """
+    state = dict(lines)
+    changes: Dict[int, Optional[int]] = {}
+    for index, (op, product_id, quantity) in enumerate(operations):
+        if op == "add":
+            state[product_id] = state.get(product_id, 0) + (quantity or 0)
+        elif op == "update":
+            if product_id not in state:
+                raise CartOperationError(index, f"Product with id {product_id} is not in the cart")
+            state[product_id] = quantity or 0
+        elif op == "remove":
+            if product_id not in state:
+                raise CartOperationError(index, f"Product with id {product_id} is not in the cart")
+            del state[product_id]
+        else:
+            raise CartOperationError(index, f"Unknown operation {op!r}")
+        changes[product_id] = state.get(product_id)
+    return changes
+
+
+class CartStore(ABC):
+    """Server-side carts keyed by an opaque token; every mutation touches a single line."""
+
+    @abstractmethod
+    def create(self) -> str:
+        """Start an empty cart and return its token."""
+
+    @abstractmethod
+    def exists(self, token: str) -> bool:
+        """True if the cart exists and has not expired."""
+
+    @abstractmethod
+    def get(self, token: str) -> Optional[Dict[int, int]]:
+        """All lines of the cart (product_id -> quantity), or None if it is unknown or expired."""
+
+    @abstractmethod
+    def add(self, token: Optional[str], product_id: int, quantity: int) -> Tuple[str, int]:
+        """Increase a line by `quantity` (creating it) and return (token, new quantity).
+
+        A missing, unknown or expired `token` starts a new cart in the same step, so a cart
+        that expires concurrently cannot make the call fail.
+        """
+
+    @abstractmethod
+    def set(self, token: str, product_id: int, quantity: int) -> bool:
+        """Overwrite an existing line; False if the line is not in the cart."""
+
+    @abstractmethod
+    def remove(self, token: str, product_id: int) -> bool:
+        """Delete a line; False if the line is not in the cart."""
+
+    @abstractmethod
+    def count(self, token: str) -> int:
+        """Number of lines in the cart."""
+
+    @abstractmethod
+    def apply(self, token: Optional[str], operations: Iterable[CartOp]) -> Tuple[str, Dict[int, int]]:
+        """Apply a batch all-or-nothing and return (token, resulting lines); raises CartOperationError.
+
+        Without a live cart the batch is checked against an empty one, and a new cart is
+        started only if it succeeds: a rejected batch leaves nothing behind.
+        """
+
+
+class MemoryCartStore(CartStore):
+    """Process-local LRU of carts with sliding TTL expiry."""
+
+    def __init__(self, max_carts: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_carts = max_carts
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._carts: "OrderedDict[str, Tuple[float, Dict[int, int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lines(self, token: str) -> Optional[Dict[int, int]]:
+        # Вызывается под self._lock: продлевает TTL и поднимает корзину в LRU
+        entry = self._carts.get(token)
+        if entry is None:
+            return None
+        expires_at, lines = entry
+        now = self._clock()
+        if expires_at <= now:
+            del self._carts[token]
+            return None
+        self._carts[token] = (now + self.ttl_seconds, lines)
+        self._carts.move_to_end(token)
+        return lines
+
+    def _create(self) -> Tuple[str, Dict[int, int]]:
+        # Вызывается под self._lock
+        token, lines = new_cart_token(), {}
+        self._carts[token] = (self._clock() + self.ttl_seconds, lines)
+        while len(self._carts) > self.max_carts:
+            self._carts.popitem(last=False)
+        return token, lines
+
+    def create(self) -> str:
+        with self._lock:
+            return self._create()[0]
+
+    def exists(self, token: str) -> bool:
+        with self._lock:
+            return self._lines(token) is not None
+
+    def get(self, token: str) -> Optional[Dict[int, int]]:
+        with self._lock:
+            lines = self._lines(token)
+            return dict(lines) if lines is not None else None
+
+    def add(self, token: Optional[str], product_id: int, quantity: int) -> Tuple[str, int]:
+        with self._lock:
+            lines = self._lines(token) if token else None
+            if lines is None:
+                token, lines = self._create()
+            lines[product_id] = lines.get(product_id, 0) + quantity
+            return token, lines[product_id]
+
+    def set(self, token: str, product_id: int, quantity: int) -> bool:
+        with self._lock:
+            lines = self._lines(token)
+            if lines is None or product_id not in lines:
+                return False
+            lines[product_id] = quantity
+            return True
+
+    def remove(self, token: str, product_id: int) -> bool:
+        with self._lock:
+            lines = self._lines(token)
+            if lines is None or product_id not in lines:
+                return False
+            del lines[product_id]
+            return True
+
+    def count(self, token: str) -> int:
+        with self._lock:
+            lines = self._lines(token)
+            return len(lines) if lines is not None else 0
+
+    def apply(self, token: Optional[str], operations: Iterable[CartOp]) -> Tuple[str, Dict[int, int]]:
+        with self._lock:
+            lines = self._lines(token) if token else None
+            changes = plan_operations(lines or {}, operations)
+            if lines is None:
+                token, lines = self._create()
+            for product_id, quantity in changes.items():
+                if quantity is None:
+                    lines.pop(product_id, None)
+                else:
+                    lines[product_id] = quantity
+            return token, dict(lines)
+
+
+class SqliteCartStore(CartStore):
+    """Carts in the `carts`/`cart_items` tables, bound to the request's Session.
+
+    Survives restarts and is shared by all worker processes. Expired carts are
+    treated as missing and purged lazily when new carts are created.
+    """
+
+    def __init__(self, db: Session, ttl_seconds: float):
+        self.db = db
+        self.ttl = timedelta(seconds=ttl_seconds)
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def _touch(self, token: str) -> bool:
+        now = self._now()
+        result = self.db.execute(
+            update(Cart)
+            .where(Cart.token == token, Cart.updated_at > now - self.ttl)
+            .values(updated_at=now)
+        )
+        return bool(result.rowcount)
+
+    def _create(self) -> str:
+        # В транзакции вызывающего: вызывающий делает commit
+        token = new_cart_token()
+        now = self._now()
+        expired = select(Cart.token).where(Cart.updated_at <= now - self.ttl)
+        self.db.execute(delete(CartLine).where(CartLine.token.in_(expired)))
+        self.db.execute(delete(Cart).where(Cart.updated_at <= now - self.ttl))
+        self.db.add(Cart(token=token, updated_at=now))
+        self.db.flush()
+        return token
+
+    def create(self) -> str:
+        token = self._create()
+        self.db.commit()
+        return token
+
+    def exists(self, token: str) -> bool:
+        found = self._touch(token)
+        self.db.commit()
+        return found
+
+    def get(self, token: str) -> Optional[Dict[int, int]]:
+        if not self._touch(token):
+            self.db.rollback()
+            return None
+        lines = dict(self.db.execute(
+            select(CartLine.product_id, CartLine.quantity).where(CartLine.token == token)
+        ).all())
+        self.db.commit()
+        return lines
+
+    def add(self, token: Optional[str], product_id: int, quantity: int) -> Tuple[str, int]:
+        # Продление и вставка строки идут в одной транзакции писателя: корзина не истечёт между ними
+        if not token or not self._touch(token):
+            token = self._create()
+        statement = sqlite_insert(CartLine).values(token=token, product_id=product_id, quantity=quantity)
+        statement = statement.on_conflict_do_update(
+            index_elements=[CartLine.token, CartLine.product_id],
+            set_={"quantity": CartLine.quantity + statement.excluded.quantity},
+        ).returning(CartLine.quantity)
+        new_quantity = self.db.execute(statement).scalar_one()
+        self.db.commit()
+        return token, new_quantity
+
+    def set(self, token: str, product_id: int, quantity: int) -> bool:
+        if not self._touch(token):
+            self.db.rollback()
+            return False
+        result = self.db.execute(
+            update(CartLine)
+            .where(CartLine.token == token, CartLine.product_id == product_id)
+            .values(quantity=quantity)
+        )
+        self.db.commit()
+        return bool(result.rowcount)
+
+    def remove(self, token: str, product_id: int) -> bool:
+        if not self._touch(token):
+            self.db.rollback()
+            return False
+        result = self.db.execute(
+            delete(CartLine).where(CartLine.token == token, CartLine.product_id == product_id)
+        )
+        self.db.commit()
+        return bool(result.rowcount)
+
+    def count(self, token: str) -> int:
+        return self.db.execute(
+            select(func.count()).select_from(CartLine).where(CartLine.token == token)
+        ).scalar_one()
+
+    def apply(self, token: Optional[str], operations: Iterable[CartOp]) -> Tuple[str, Dict[int, int]]:
+        # UPDATE в _touch берёт блокировку записи, так что чтение и запись ниже атомарны
+        try:
+            if token and self._touch(token):
+                lines = dict(self.db.execute(
+                    select(CartLine.product_id, CartLine.quantity).where(CartLine.token == token)
+                ).all())
+                changes = plan_operations(lines, operations)
+            else:
+                lines = {}
+                changes = plan_operations(lines, operations)
+                token = self._create()
+
+            removed = [product_id for product_id, quantity in changes.items() if quantity is None]
+            upserts = [
+                {"token": token, "product_id": product_id, "quantity": quantity}
+                for product_id, quantity in changes.items() if quantity is not None
+            ]
+            if removed:
+                self.db.execute(delete(CartLine).where(CartLine.token == token, CartLine.product_id.in_(removed)))
+            if upserts:
+                statement = sqlite_insert(CartLine)
+                self.db.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=[CartLine.token, CartLine.product_id],
+                        set_={"quantity": statement.excluded.quantity},
+                    ),
+                    upserts,
+                )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        for product_id, quantity in changes.items():
+            if quantity is None:
+                lines.pop(product_id, None)
+            else:
+                lines[product_id] = quantity
+        return token, lines
+
+
+_memory_store: Optional[MemoryCartStore] = None
+
+
+def get_cart_store(db: Session) -> CartStore:
+    """Cart store for Settings.cart_backend: the process-wide memory LRU or the SQLite tables via `db`."""
+    global _memory_store
+    if settings.cart_backend == "sqlite":
+        return SqliteCartStore(db, settings.cart_ttl_seconds)
+    if _memory_store is None:
+        _memory_store = MemoryCartStore(settings.cart_max_carts, settings.cart_ttl_seconds)
+    return _memory_store
@@ -0,0 +1,99 @@
+"""Compaction of the catalog change log behind GET /api/catalog/changes.
+
+    python -m app.catalog_changes            # one pass, prints what was removed
+    python -m app.catalog_changes --reset    # drop the log; every delta client resyncs
+
+A pass removes entries superseded by a later entry of the same entity. It then trims the
+log to changes_retention_rows entries that are at most changes_retention_days old, and
+records how far it trimmed, so that clients behind that point get resync_required. The
+API process also runs a pass every changes_compact_interval seconds. The pass is
+idempotent, so several workers may run it.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import List, Optional
+
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+from .repositories.catalog_changes import ChangeLogRepository
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CompactionReport:
+    superseded: int
+    trimmed: int
+    trimmed_through: int
+    head: int
+
+
+def compact_change_log(
+    engine: Engine,
+    keep: Optional[int] = None,
+    max_age: Optional[timedelta] = None,
+) -> CompactionReport:
+    with engine.begin() as connection:
+        changes = ChangeLogRepository(connection)
+        superseded, trimmed = changes.compact(
+            keep if keep is not None else settings.changes_retention_rows,
+            max_age if max_age is not None else timedelta(days=settings.changes_retention_days),
+        )
+        trimmed_through, head = changes.bounds()
+    return CompactionReport(superseded=superseded, trimmed=trimmed, trimmed_through=trimmed_through, head=head)
+
+
+async def run_compaction(engine: Engine, interval: float) -> None:
+    """Background loop started by the app lifespan; cancelled on shutdown."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            report = await run_in_threadpool(compact_change_log, engine)
+        except Exception:
+            # Сбой одного прохода (например, занятая БД) не должен останавливать цикл
+            logger.exception("Change log compaction failed")
+            continue
+        if report.superseded or report.trimmed:
+            logger.info(
+                "Change log compacted: %s superseded, %s trimmed, retained %s..%s",
+                report.superseded, report.trimmed, report.trimmed_through, report.head,
+            )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compact the catalog change log.")
+    parser.add_argument("--keep", type=int, default=None, help="defaults to Settings.changes_retention_rows")
+    parser.add_argument("--max-age-days", type=float, default=None, help="defaults to Settings.changes_retention_days")
+    parser.add_argument("--reset", action="store_true", help="drop every entry; all delta clients resync")
+    args = parser.parse_args(argv)
+
+    from .database import engine, ensure_schema
+
+    ensure_schema()
+    if args.reset:
+        with engine.begin() as connection:
+            seq = ChangeLogRepository(connection).reset()
+        print(f"change log reset at seq {seq}")
+        return 0
+
+    report = compact_change_log(
+        engine,
+        keep=args.keep,
+        max_age=timedelta(days=args.max_age_days) if args.max_age_days is not None else None,
+    )
+    print(
+        f"{report.superseded} superseded, {report.trimmed} trimmed; "
+        f"retained seq {report.trimmed_through}..{report.head}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
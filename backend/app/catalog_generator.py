@@ -0,0 +1,255 @@
+"""Deterministic synthetic catalog at production scale.
+
+    uv run python -m app.catalog_generator --categories 40 --products 1000000 --seed 42
+
+Products are FurnacePayload rows derived from the hand-written FURNACES. Names, models and
+description lengths vary, and category sizes follow a Zipf-like skew. Categories go
+through ensure_categories()/slugify() like the regular seed. Products are bulk inserted
+with the search triggers and secondary indexes dropped and durability pragmas relaxed
+(on the loading connection only, restored before it returns to the pool). Indexes and
+the FTS table are rebuilt in one pass at the end. The same arguments on an empty
+database always produce the same rows.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from .models.cart import CartLine
+from .models.catalog_state import CatalogState
+from .models.category import Category
+from .models.product import Product
+from .repositories.catalog_changes import ChangeLogRepository
+from .repositories.catalog_state import STATE_ID, CatalogStateRepository
+from .search import create_search_index, drop_search_index
+from .seed_data import FURNACES, FurnacePayload, ensure_categories
+from .translit import slugify
+
+BASE_CREATED_AT = datetime(2024, 1, 1)
+INSERT_BATCH = 20_000
+# Загрузка в обход SQLAlchemy: executemany кортежей; created_at в формате DateTime SQLAlchemy для SQLite
+_PRODUCT_INSERT = (
+    "INSERT INTO products (id, name, description, category_id, image_url, created_at) VALUES (?, ?, ?, ?, ?, ?)"
+)
+_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+_BULK_PRAGMAS = {"synchronous": "OFF", "temp_store": "MEMORY", "cache_size": "-262144"}
+DESCRIPTION_MAX = 200  # ограничение ProductBase.description
+
+# Словарь для названий категорий и моделей; комбинации дают сотни уникальных вариантов
+_MATERIALS = (
+    "черная", "цветная", "стальная", "чугунная", "медная", "алюминиевая", "никелевая", "титановая",
+    "цинковая", "свинцовая", "ферросплавная", "огнеупорная", "стекольная", "керамическая",
+)
+_PURPOSES = (
+    "плавка", "рафинирование", "обжиг", "восстановление", "переплав", "литье", "термообработка", "спекание",
+)
+_MAKERS = ("Урал", "Сибирь", "Волга", "Кама", "Нева", "Енисей", "Амур", "Ока", "Дон", "Печора")
+_DESCRIPTION_PHRASES = (
+    "Футеровка из магнезиальных огнеупоров.",
+    "Водоохлаждаемые панели свода и стен.",
+    "Автоматическое управление тепловым режимом.",
+    "Подходит для непрерывной работы в три смены.",
+    "Рекуперация тепла отходящих газов.",
+    "Пониженный расход электродов и электроэнергии.",
+    "Система газоочистки входит в комплект.",
+    "Возможна поставка с вакуумной камерой.",
+)
+
+
+@dataclass(frozen=True)
+class GeneratorReport:
+    categories: int
+    products: int
+    load_seconds: float
+    index_seconds: float
+    total_seconds: float
+
+
+def category_payloads(count: int, rng: random.Random) -> List[FurnacePayload]:
+    """One payload per category; ensure_categories() derives name and slug from furnace_type."""
+    names: List[str] = []
+    seen = set()
+    # Сначала настоящие типы из FURNACES, затем синтетические «материал + назначение»
+    synthetic = [f"{material} {purpose}" for material in _MATERIALS for purpose in _PURPOSES]
+    rng.shuffle(synthetic)
+    for name in [*dict.fromkeys(payload.furnace_type for payload in FURNACES), *synthetic]:
+        if len(names) == count:
+            break
+        if slugify(name) not in seen:
+            seen.add(slugify(name))
+            names.append(name)
+    number = 1
+    while len(names) < count:
+        name = f"{rng.choice(_MATERIALS)} {rng.choice(_PURPOSES)} {number}"
+        number += 1
+        if slugify(name) not in seen:
+            seen.add(slugify(name))
+            names.append(name)
+    return [
+        FurnacePayload(furnace_id=0, furnace_name="", furnace_info="", furnace_type=name, image_res="")
+        for name in names
+    ]
+
+
+def product_payloads(count: int, category_types: Sequence[str], rng: random.Random, skew: float) -> Iterator[FurnacePayload]:
+    """`count` products with unique names; category i gets weight 1 / (i + 1) ** skew."""
+    cum_weights = list(accumulate(1.0 / (rank + 1) ** skew for rank in range(len(category_types))))
+    for number in range(1, count + 1):
+        template = FURNACES[rng.randrange(len(FURNACES))]
+        # Название: «Доменная печь Урал-417 №12345» — номер делает его уникальным (uq_products_name)
+        base = template.furnace_name.split(" (")[0]
+        name = f"{base} {rng.choice(_MAKERS)}-{rng.randint(100, 999)} №{number}"
+        # Длины описаний: от одного предложения до лимита схемы, чаще короткие
+        info = template.furnace_info
+        while len(info) < DESCRIPTION_MAX and rng.random() < 0.45:
+            info = f"{info} {rng.choice(_DESCRIPTION_PHRASES)}"
+        yield FurnacePayload(
+            furnace_id=number,
+            furnace_name=name,
+            furnace_info=info[:DESCRIPTION_MAX].rstrip(),
+            furnace_type=rng.choices(category_types, cum_weights=cum_weights)[0],
+            image_res=template.image_res,
+        )
+
+
+@contextmanager
+def _relaxed_pragmas(connection: Connection) -> Iterator[None]:
+    # Только на время загрузки: при сбое файл придётся сгенерировать заново. Соединение
+    # вернётся в пул, которым может пользоваться приложение, поэтому прежние значения восстанавливаются
+    saved = {name: connection.exec_driver_sql(f"PRAGMA {name}").scalar() for name in _BULK_PRAGMAS}
+    for name, value in _BULK_PRAGMAS.items():
+        connection.exec_driver_sql(f"PRAGMA {name} = {value}")
+    connection.commit()  # закрывает автотранзакцию SQLAlchemy, открытую чтением прагм
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            connection.exec_driver_sql(f"PRAGMA {name} = {value}")
+        connection.commit()
+
+
+def generate_catalog(
+    engine: Engine,
+    categories: int,
+    products: int,
+    seed: int = 42,
+    skew: float = 1.1,
+    replace: bool = False,
+) -> GeneratorReport:
+    """Fill the database behind `engine` with a synthetic catalog."""
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    with Session(engine) as session:
+        has_products = session.execute(select(Product.id).limit(1)).first() is not None
+        if has_products and not replace:
+            raise SystemExit("database already has products; pass --replace to regenerate the catalog")
+        if replace:
+            # Без FTS-триггеров удаление не трогает индекс построчно; индекс строится заново в конце
+            drop_search_index(session.connection())
+            session.execute(delete(CartLine))
+            session.execute(delete(Product))
+            session.execute(delete(Category))
+        payloads = category_payloads(categories, rng)
+        by_name = ensure_categories(session, payloads)
+        category_ids: Dict[str, int] = {
+            payload.furnace_type: by_name[payload.furnace_type.strip().capitalize()].id for payload in payloads
+        }
+        session.commit()
+
+    rows = product_payloads(products, list(category_ids), rng, skew)
+    product_indexes = list(Product.__table__.indexes)
+
+    # Прагмы меняются вне транзакции: вокруг неё, на одном и том же соединении
+    with engine.connect() as connection, _relaxed_pragmas(connection):
+        with connection.begin():
+            drop_search_index(connection)
+            for index in product_indexes:
+                index.drop(bind=connection, checkfirst=True)
+
+            while True:
+                batch = list(islice(rows, INSERT_BATCH))
+                if not batch:
+                    break
+                connection.exec_driver_sql(_PRODUCT_INSERT, [
+                    (
+                        payload.furnace_id,
+                        payload.furnace_name,
+                        payload.furnace_info,
+                        category_ids[payload.furnace_type],
+                        f"/static/images/{payload.image_res}.jpg",
+                        (BASE_CREATED_AT + timedelta(seconds=payload.furnace_id * 37)).strftime(_DATETIME_FORMAT),
+                    )
+                    for payload in batch
+                ])
+            load_seconds = time.perf_counter() - started
+
+            # Индексы строятся один раз по готовым данным, а не поддерживаются на каждой вставке
+            for index in product_indexes:
+                index.create(bind=connection)
+            if connection.execute(select(CatalogState.id).where(CatalogState.id == STATE_ID)).first() is None:
+                # Чистая база: фиксированная отметка, чтобы одинаковый seed давал одинаковый файл
+                connection.execute(insert(CatalogState).values(id=STATE_ID, version=1, updated_at=BASE_CREATED_AT))
+            else:
+                CatalogStateRepository(connection).bump()
+            # Построчно 100k+ товаров не журналируются: клиенты дельта-синхронизации перекачивают каталог
+            ChangeLogRepository(connection).reset()
+            # FTS-таблица и триггеры создаются заново, индекс заполняется одним проходом по товарам
+            create_search_index(connection)
+
+    total_seconds = time.perf_counter() - started
+    return GeneratorReport(
+        categories=len(category_ids),
+        products=products,
+        load_seconds=round(load_seconds, 2),
+        index_seconds=round(total_seconds - load_seconds, 2),
+        total_seconds=round(total_seconds, 2),
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic furnace catalog.")
+    parser.add_argument("--categories", type=int, default=40)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of category sizes")
+    parser.add_argument("--replace", action="store_true", help="delete the existing catalog first")
+    parser.add_argument("--database-url", default=None, help="defaults to Settings.database_url")
+    args = parser.parse_args(argv)
+
+    from sqlalchemy import create_engine, event
+
+    from . import database
+    from .search import register_sqlite_functions
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+        event.listen(engine, "connect", lambda dbapi_connection, _: register_sqlite_functions(dbapi_connection))
+        database.Base.metadata.create_all(bind=engine)
+    else:
+        engine = database.engine
+        database.ensure_schema()
+
+    report = generate_catalog(
+        engine, args.categories, args.products, seed=args.seed, skew=args.skew,
+        replace=args.replace,
+    )
+    print(
+        f"{report.categories} categories, {report.products} products in {report.total_seconds} s "
+        f"(load {report.load_seconds} s, indexes {report.index_seconds} s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
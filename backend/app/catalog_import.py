@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import logging
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
+
+from .cache import get_catalog_cache
+from .config import settings
+from .database import engine, ensure_schema
+from .events import notify_catalog_changed
+from .models.category import Category
+from .models.product import Product
+from .repositories.catalog_changes import ChangeLogRepository
+from .repositories.catalog_state import CatalogStateRepository
+from .schemas.catalog import ChangeEntity
+from .schemas.catalog_import import ImportReport, ImportRow, ImportRowError
+from .search import index_transliterations
+from .translit import slugify
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "ndjson")
+
+RawRow = Tuple[int, object]
+
+
+def detect_format(filename: str, content_type: Optional[str] = None) -> str:
+    if content_type:
+        if "csv" in content_type:
+            return "csv"
+        if "ndjson" in content_type or "jsonl" in content_type or "json" in content_type:
+            return "ndjson"
+    suffix = Path(filename).suffix.lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix in (".ndjson", ".jsonl"):
+        return "ndjson"
+    raise ValueError(f"Cannot detect import format of {filename or content_type!r}, expected one of {FORMATS}")
+
+
+def iter_raw_rows(stream: IO[str], fmt: str) -> Iterator[RawRow]:
+    """Yield (row number, raw record) one line at a time; nothing is buffered beyond the current line."""
+    if fmt == "csv":
+        for number, record in enumerate(csv.DictReader(stream), start=1):
+            yield number, record
+    elif fmt == "ndjson":
+        number = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield number, exc
+    else:
+        raise ValueError(f"Unknown import format {fmt!r}, expected one of {FORMATS}")
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in exc.errors()
+    )
+
+
+def _chunks(rows: Iterable[RawRow], size: int) -> Iterator[List[RawRow]]:
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class CatalogImporter:
+    """Upsert products (keyed by name) from a stream of rows in chunked transactions."""
+
+    def __init__(self, engine: Engine, chunk_size: Optional[int] = None, max_errors: int = 100):
+        self.engine = engine
+        self.chunk_size = chunk_size or settings.import_chunk_size
+        self.max_errors = max_errors
+        self.category_ids: Dict[str, int] = {}
+        self._slugs: Dict[str, str] = {}
+
+    def run(
+        self,
+        rows: Iterable[RawRow],
+        on_chunk: Optional[Callable[[ImportReport], None]] = None,
+    ) -> ImportReport:
+        report = ImportReport()
+        started = time.perf_counter()
+
+        with self.engine.connect() as connection:
+            # Единственный запрос к категориям на всё время импорта
+            self.category_ids = dict(connection.execute(select(Category.slug, Category.id)).all())
+
+        for chunk in _chunks(rows, self.chunk_size):
+            report.chunks += 1
+            report.rows_read += len(chunk)
+            self._import_chunk(chunk, report)
+
+            report.elapsed_seconds = time.perf_counter() - started
+            report.rows_per_second = report.rows_read / report.elapsed_seconds if report.elapsed_seconds else 0.0
+            if on_chunk is not None:
+                on_chunk(report)
+
+        return report
+
+    def _import_chunk(self, chunk: List[RawRow], report: ImportReport) -> None:
+        valid: List[Tuple[int, ImportRow]] = []
+        for number, raw in chunk:
+            try:
+                if isinstance(raw, Exception):
+                    raise ValueError(f"invalid JSON: {raw}")
+                if not isinstance(raw, dict):
+                    raise ValueError("record must be an object")
+                valid.append((number, ImportRow.model_validate({k: v for k, v in raw.items() if v != ""})))
+            except ValidationError as exc:
+                self._fail(report, report.chunks, number, _describe(exc))
+            except ValueError as exc:
+                self._fail(report, report.chunks, number, str(exc))
+
+        if not valid:
+            return
+
+        known_before = dict(self.category_ids)
+        rejected: List[Tuple[int, str]] = []
+        try:
+            with self.engine.begin() as connection:
+                created = self._ensure_categories(connection, valid)
+                values, rejected = self._product_values(valid)
+                for number, message in rejected:
+                    self._fail(report, report.chunks, number, message)
+
+                if values:
+                    statement = sqlite_insert(Product)
+                    statement = statement.on_conflict_do_update(
+                        index_elements=[Product.name],
+                        set_={
+                            "description": statement.excluded.description,
+                            "category_id": statement.excluded.category_id,
+                            "image_url": statement.excluded.image_url,
+                        },
+                    )
+                    # executemany: SQLAlchemy сам режет на пачки под лимит параметров SQLite
+                    connection.execute(statement, values)
+                    names = Product.name.in_([row["name"] for row in values])
+                    index_transliterations(connection, names)
+                    CatalogStateRepository(connection).bump()
+                    # upsert не возвращает id: журнал заполняется INSERT ... SELECT по естественному ключу
+                    ChangeLogRepository(connection).record_matching(
+                        ChangeEntity.product, Product.id, names
+                    )
+        except Exception as exc:
+            # Чанк откатывается целиком, импорт продолжается со следующего
+            self.category_ids = known_before
+            logger.exception("Import chunk %s failed", report.chunks)
+            # Строки с неизвестной категорией уже посчитаны в _fail()
+            report.rows_failed += len(valid) - len(rejected)
+            self._fail(report, report.chunks, None, f"chunk rolled back: {exc}")
+            return
+
+        report.categories_created += created
+        report.rows_upserted += len(values)
+        if values or created:
+            # Каждый закоммиченный чанк виден сразу: кэш сбрасывается до уведомления, иначе
+            # клиент, получивший событие, перечитал бы каталог из старого кэша
+            get_catalog_cache().clear()
+            notify_catalog_changed()
+
+    def _ensure_categories(self, connection: Connection, rows: List[Tuple[int, ImportRow]]) -> int:
+        missing: Dict[str, str] = {}
+        for _, row in rows:
+            if row.category_slug or not row.category:
+                continue
+            slug = self._slug(row.category)
+            if slug not in self.category_ids:
+                missing.setdefault(slug, row.category.strip().capitalize())
+
+        if not missing:
+            return 0
+
+        connection.execute(
+            sqlite_insert(Category).on_conflict_do_nothing(),
+            [{"name": name, "slug": slug} for slug, name in missing.items()],
+        )
+        ChangeLogRepository(connection).record_matching(ChangeEntity.category, Category.id, Category.slug.in_(list(missing)))
+        self.category_ids.update(
+            connection.execute(select(Category.slug, Category.id).where(Category.slug.in_(missing))).all()
+        )
+        return len(missing)
+
+    def _product_values(self, rows: List[Tuple[int, ImportRow]]) -> Tuple[List[dict], List[Tuple[int, str]]]:
+        values: Dict[str, dict] = {}
+        rejected: List[Tuple[int, str]] = []
+        for number, row in rows:
+            slug = row.category_slug or self._slug(row.category)
+            category_id = self.category_ids.get(slug)
+            if category_id is None:
+                rejected.append((number, f"unknown category slug {slug!r}"))
+                continue
+            # Повтор имени внутри одного INSERT недопустим для ON CONFLICT: побеждает последняя строка
+            values[row.name] = {
+                "name": row.name,
+                "description": row.description,
+                "category_id": category_id,
+                "image_url": row.image_url,
+            }
+        return list(values.values()), rejected
+
+    def _slug(self, category: str) -> str:
+        slug = self._slugs.get(category)
+        if slug is None:
+            slug = self._slugs[category] = slugify(category)
+        return slug
+
+    def _fail(self, report: ImportReport, chunk: int, row: Optional[int], message: str) -> None:
+        if row is not None:
+            report.rows_failed += 1
+        if len(report.errors) < self.max_errors:
+            report.errors.append(ImportRowError(chunk=chunk, row=row, message=message))
+        else:
+            report.errors_truncated = True
+
+
+def import_file(
+    path: Path,
+    fmt: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    on_chunk: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    fmt = fmt or detect_format(path.name)
+    with path.open("r", encoding="utf-8-sig", newline="") as stream:
+        return CatalogImporter(engine, chunk_size=chunk_size).run(iter_raw_rows(stream, fmt), on_chunk=on_chunk)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Stream a CSV/NDJSON supplier catalog into the database.")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=FORMATS, default=None)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    ensure_schema()
+
+    def progress(report: ImportReport) -> None:
+        print(
+            f"chunk {report.chunks}: {report.rows_read} read, {report.rows_upserted} upserted, "
+            f"{report.rows_failed} failed, {report.rows_per_second:,.0f} rows/s"
+        )
+
+    report = import_file(args.path, args.format, chunk_size=args.chunk_size, on_chunk=progress)
+    for error in report.errors:
+        print(f"chunk {error.chunk} row {error.row}: {error.message}")
+    print(report.model_dump_json(exclude={"errors"}))
+    return 0 if not report.rows_failed else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
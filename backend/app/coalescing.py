@@ -0,0 +1,114 @@
+"""Single-flight coalescing of identical concurrent catalog reads.
+
+When a burst of identical requests arrives (one category page after a marketing push),
+only the first one, the leader, runs the service call. Requests that arrive while it is
+in flight (followers) wait for the leader and share its result: the serialized JSON
+bytes on the fast read path, or the immutable response model. Keys are the route name
+plus normalized query parameters. Routers also pass the ETag set by conditional_get, so
+a request that started after a catalog write never receives a result computed before it.
+
+A follower waits at most coalescing_timeout. After that it computes the result itself,
+so a slow leader cannot hold followers indefinitely. If the leader is cancelled (client
+disconnected), its followers compute their own results too. An HTTPException raised by
+the leader (404) is shared like a result.
+"""
+from __future__ import annotations
+
+import asyncio
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Tuple, TypeVar
+
+from .config import settings
+
+T = TypeVar("T")
+
+
+def request_key(route: str, **params: Any) -> Tuple[Hashable, ...]:
+    """Route name plus parameters in a canonical order; None values are dropped, enums use their value."""
+    return (route, *sorted(
+        (name, value.value if isinstance(value, Enum) else value)
+        for name, value in params.items()
+        if value is not None
+    ))
+
+
+class SingleFlight:
+    """In-flight calls by key; lives on the event loop thread, so no locking is needed."""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+        self.timeouts = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        leader = self._calls.get(key)
+        if leader is not None:
+            return await self._follow(leader, call)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.leaders += 1
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # помечаем как полученное: без ведомых asyncio иначе предупредит при сборке
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    async def _follow(self, leader: asyncio.Future, call: Callable[[], Awaitable[T]]) -> T:
+        self.followers += 1
+        try:
+            # shield: таймаут ведомого не должен отменять общий future лидера
+            return await asyncio.wait_for(asyncio.shield(leader), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+        except asyncio.CancelledError:
+            # Отменили лидера (клиент ушёл), а не нас: считаем сами
+            current = asyncio.current_task()
+            if not leader.cancelled() or (current is not None and current.cancelling()):
+                raise
+        return await call()
+
+    def stats(self) -> Dict[str, float]:
+        requests = self.leaders + self.followers
+        return {
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "timeouts": self.timeouts,
+            "in_flight": self.in_flight,
+            "ratio": self.followers / requests if requests else 0.0,
+        }
+
+
+_single_flight = SingleFlight(settings.coalescing_timeout)
+
+
+def get_single_flight() -> SingleFlight:
+    return _single_flight
+
+
+async def coalesce(route: str, call: Callable[[], Awaitable[T]], **params: Any) -> T:
+    """Run `call` once for all concurrent requests with the same route and parameters."""
+    if not settings.coalescing_enabled:
+        return await call()
+    return await _single_flight.do(request_key(route, **params), call)
+
+
+def coalescing_gauges() -> Iterable[Tuple[Dict[str, str], float]]:
+    for stat, value in _single_flight.stats().items():
+        yield {"stat": stat}, value
@@ -0,0 +1,204 @@
+"""Response compression with a cache of compressed bodies.
+
+Generic gzip middleware recompresses the same catalog JSON on every request. Here,
+responses that carry an ETag are treated as cacheable: every conditional_get route
+does. Their compressed bodies are stored under a blake2b digest of the uncompressed
+body and the coding, so a repeated request is answered from the stored bytes without
+compression work. The key is derived from the bytes being sent, not from the ETag: a
+body and its ETag are not read in one snapshot, and a stale body must never be matched
+to compressed bytes of another one. Old entries simply age out of the LRU.
+
+gzip and deflate come from the standard library; br is offered when the optional
+`brotli` package is installed. Streaming responses (more_body) and bodies below
+compression_min_size pass through untouched.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него остаются gzip и deflate
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript", "image/svg+xml")
+
+
+def _compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    codecs: Dict[str, Callable[[bytes], bytes]] = {}
+    if brotli is not None:
+        codecs["br"] = lambda body: brotli.compress(body, quality=settings.compression_brotli_quality)
+    # mtime=0: одинаковое тело даёт одинаковые байты, независимо от времени сжатия
+    codecs["gzip"] = lambda body: gzip.compress(body, compresslevel=settings.compression_gzip_level, mtime=0)
+    codecs["deflate"] = lambda body: zlib.compress(body, settings.compression_gzip_level)
+    return codecs
+
+
+COMPRESSORS = _compressors()  # порядок задаёт предпочтение при равных q
+
+
+def negotiate(accept_encoding: str, available: Tuple[str, ...] = tuple(COMPRESSORS)) -> Optional[str]:
+    """Best available coding for an Accept-Encoding header, or None for identity."""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+
+    best, best_weight = None, 0.0
+    for coding in available:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def set(self, key: Hashable, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        self._entries[key] = body
+        self._size += len(body)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._size}
+
+
+_cache = CompressedBodyCache(settings.compression_cache_max_bytes)
+
+
+def get_compression_cache() -> CompressedBodyCache:
+    return _cache
+
+
+def _compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _cacheable(scope: Scope, headers: Headers) -> bool:
+    cache_control = headers.get("cache-control", "")
+    return (
+        scope["method"] == "GET"
+        and "etag" in headers
+        and "private" not in cache_control
+        and "no-store" not in cache_control
+    )
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware: negotiate a coding and reuse compressed bodies of cacheable GETs."""
+
+    def __init__(self, app: ASGIApp, cache: Optional[CompressedBodyCache] = None):
+        self.app = app
+        self.cache = cache if cache is not None else _cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # Решение о сжатии откладывается до первого куска тела: нужно знать его размер
+                start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            response_start, start = start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=list(response_start["headers"]))
+            if (
+                message.get("more_body", False)  # потоковые ответы (NDJSON) не буферизуются
+                or response_start["status"] != 200
+                or len(body) < settings.compression_min_size
+                or not _compressible(headers)
+            ):
+                await send(response_start)
+                await send(message)
+                return
+
+            compressed = None
+            key: Optional[Tuple[bytes, str]] = None
+            if _cacheable(scope, headers):
+                key = (hashlib.blake2b(body, digest_size=16).digest(), coding)
+                compressed = self.cache.get(key)
+            if compressed is None:
+                compressed = COMPRESSORS[coding](body)
+                if key is not None:
+                    self.cache.set(key, compressed)
+
+            headers["Content-Encoding"] = coding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            # Сжатое представление не совпадает побайтно с исходным: сильный ETag становится слабым.
+            # conditional_get сравнивает If-None-Match слабо, так что 304 продолжают работать
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            await send({**response_start, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def compression_gauges() -> List[Tuple[Dict[str, str], float]]:
+    return [({"stat": stat}, value) for stat, value in _cache.stats().items()]
@@ -1,9 +1,25 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     app_name: str = "Furnace api"
     debug: bool = True
     database_url: str = "sqlite:///./furnace.db"
+    # sync: Session и сервисы в тредпуле Starlette; async: AsyncSession поверх aiosqlite
+    db_mode: str = "sync"
+    async_database_url: Optional[str] = None
+
+    # SQLite: WAL, пул читателей только для чтения (GET) и один сериализованный писатель
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"  # off | normal | full
+    sqlite_cache_size_kib: int = 64 * 1024
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_busy_timeout_ms: int = 5000
+    db_read_pool_size: int = 8
+    db_read_max_overflow: int = 0
+    db_write_pool_size: int = 1
+    db_pool_timeout: float = 30.0
     cors_origins: list = [
         "http://localhost:5173",
         "http://localhost:3000",
@@ -12,6 +28,113 @@ class Settings(BaseSettings):
     ]
     static_dir: str = "static"
     images_dir: str = "static/images"
+    # Манифест отпечатков статики строится при сборке (python -m app.static_assets); True — пересборка
+    # на каждом старте (разработка): каждый воркер заново хеширует и сжимает статику и пишет в static_dir
+    static_manifest_rebuild: bool = False
+    static_gzip_min_size: int = 1024
+    static_gzip_level: int = 9
+
+    # Старт: демо-данные больше не заливаются автоматически (python -m app.seed_data);
+    # OpenAPI-схема кэшируется на диске по хэшу исходников (None — строить в каждом процессе)
+    seed_on_startup: bool = False
+    openapi_cache_file: Optional[str] = ".openapi-cache.json"
+
+    # Продакшн-запуск (python run.py --prod): приложение загружается один раз, воркеры форкаются от мастера
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 0  # 0 — по числу ядер
+    server_backlog: int = 2048
+    server_loop: str = "auto"  # auto: uvloop, если установлен
+    server_http: str = "auto"  # auto: httptools, если установлен
+    server_max_requests: int = 0  # перезапуск воркера после N запросов; 0 — без ограничения
+    server_max_requests_jitter: int = 0
+    server_graceful_timeout: float = 30.0
+    threadpool_size: int = 40  # потоки run_in_threadpool (sync-сервисы) в каждом процессе
+
+    # Постраничная выдача товаров
+    products_page_size: int = 50
+    products_max_page_size: int = 200
+    products_count_strategy: str = "estimated"  # exact | estimated | none
+    products_count_estimate_cap: int = 10_000
+    search_max_offset: int = 1000
+    stream_batch_size: int = 500
+    products_batch_max_ids: int = 500  # GET /api/products/batch?ids= и POST /api/products/batch
+    # Списки каталога отдаются готовыми JSON-байтами из кортежей колонок, минуя ORM и повторную валидацию
+    fast_read_path: bool = True
+
+    # Серверные корзины: memory (LRU в процессе) | sqlite (таблицы carts/cart_items)
+    cart_backend: str = "memory"
+    cart_ttl_seconds: float = 7 * 24 * 3600
+    cart_max_carts: int = 100_000
+
+    # Импорт каталога и админские эндпоинты (без токена они отключены); тело загрузки не больше import_max_bytes
+    import_chunk_size: int = 1000
+    import_max_bytes: int = 256 * 1024 * 1024
+    admin_token: Optional[str] = None
+
+    # /metrics в формате Prometheus: задержки по роутам, SQL на запрос, пулы, кэш, тредпул
+    metrics_enabled: bool = True
+
+    # Кэш каталога в памяти процесса (готовые ProductResponse/CategoryResponse)
+    cache_enabled: bool = True
+    cache_max_entries: int = 2048
+    cache_ttl_seconds: float = 300.0
+
+    # Контроль нагрузки: отдельные лимиты одновременных запросов для чтения каталога и для
+    # записей/корзин; сверх лимита — очередь с дедлайном, при переполнении 503 + Retry-After.
+    # Лимит чтения не больше пула читателей (db_read_pool_size + db_read_max_overflow): иначе
+    # допущенные запросы ждут соединение до db_pool_timeout; None — ровно размер пула
+    admission_enabled: bool = True
+    admission_read_limit: Optional[int] = None
+    admission_read_queue: int = 256
+    admission_write_limit: int = 8
+    admission_write_queue: int = 64
+    admission_queue_timeout: float = 2.0
+    admission_retry_after: int = 1
+
+    # Склейка одинаковых параллельных GET каталога: одно вычисление, общий результат;
+    # ведомый ждёт лидера не дольше coalescing_timeout и затем считает сам
+    coalescing_enabled: bool = True
+    coalescing_timeout: float = 2.0
+
+    # Сжатие ответов: br (если установлен brotli), gzip, deflate; сжатые тела ответов с ETag кэшируются
+    compression_enabled: bool = True
+    compression_min_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+    compression_cache_max_bytes: int = 32 * 1024 * 1024
+
+    # Журнал изменений каталога для дельта-синхронизации (GET /api/catalog/changes); компакция
+    # убирает перекрытые записи и хранит не больше changes_retention_rows за changes_retention_days,
+    # отставшие клиенты получают resync_required. Интервал 0 — только python -m app.catalog_changes
+    changes_page_size: int = 500
+    changes_max_page_size: int = 5000
+    changes_retention_rows: int = 100_000
+    changes_retention_days: int = 30
+    changes_compact_interval: float = 3600.0
+
+    # SSE-поток инвалидаций (GET /api/events): один опрос журнала изменений на процесс, общее кольцо
+    # кадров; отставший сильнее events_buffer_size клиент получает resync, зависшая отправка рвёт соединение.
+    # Поток закрывается через events_max_duration (0 — без ограничения), EventSource переподключается сам
+    events_enabled: bool = True
+    events_poll_interval: float = 1.0
+    events_heartbeat_interval: float = 15.0
+    events_buffer_size: int = 1024
+    events_replay_limit: int = 1000
+    events_send_timeout: float = 10.0
+    events_max_connections: int = 10_000
+    events_max_duration: float = 300.0
+    events_retry_ms: int = 3000
+
+    # HTTP-кэширование (Cache-Control) по роутерам
+    products_cache_max_age: int = 60
+    products_cache_stale_while_revalidate: int = 300
+    categories_cache_max_age: int = 300
+    categories_cache_stale_while_revalidate: int = 3600
+    changes_cache_max_age: int = 0  # только ревалидация: 304, пока каталог не изменился
+    # Версия каталога для ETag читается из catalog_state не чаще раза в catalog_version_ttl секунд на процесс;
+    # свои записи и хаб событий сбрасывают её сразу. 0 — читать на каждый запрос
+    catalog_version_ttl: float = 1.0
     
     class Config:
         env_file = ".env"
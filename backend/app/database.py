@@ -1,22 +1,222 @@
-from sqlalchemy import create_engine
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import Index, create_engine, event, func, inspect, select, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from .config import settings
 
+_url = make_url(settings.database_url)
+_async_url = settings.async_database_url or _url.set(drivername="sqlite+aiosqlite")
+# Отдельный пул читателей имеет смысл только для файловой SQLite: у :memory: у каждого соединения своя БД
+_routed = _url.get_backend_name() == "sqlite" and _url.database not in (None, "", ":memory:")
+
+def _pool_args(pool_size: int, max_overflow: int) -> dict:
+    if not _routed:
+        return {}
+    return {"pool_size": pool_size, "max_overflow": max_overflow, "pool_timeout": settings.db_pool_timeout}
+
+# Писатель: create/seed/import/корзины; пул из одного соединения сериализует записи внутри процесса
 engine = create_engine(
     settings.database_url,
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False},
+    **_pool_args(settings.db_write_pool_size, 0),
 )
+# Читатели: GET-роуты; в WAL они не блокируются писателем и друг другом
+read_engine = create_engine(
+    settings.database_url,
+    connect_args={"check_same_thread": False},
+    **_pool_args(settings.db_read_pool_size, settings.db_read_max_overflow),
+) if _routed else engine
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: раннер завершает читающую транзакцию после каждого вызова сервиса,
+# а загруженные объекты ещё сериализуются в ответ
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine)
 Base = declarative_base()
 
+# Асинхронный стек поверх того же файла БД (aiosqlite), включается settings.db_mode = "async"
+async_engine = create_async_engine(_async_url, **_pool_args(settings.db_write_pool_size, 0))
+async_read_engine = create_async_engine(
+    _async_url, **_pool_args(settings.db_read_pool_size, settings.db_read_max_overflow)
+) if _routed else async_engine
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    # translit() нужен запасному поиску через LIKE (app/search.py) на каждом соединении приложения
+    from .search import register_sqlite_functions
+    register_sqlite_functions(dbapi_connection)
+
+def _pragmas(readonly: bool):
+    statements = [
+        f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}",
+        f"PRAGMA synchronous = {settings.sqlite_synchronous}",
+        # Отрицательное значение cache_size задаётся в КиБ, а не в страницах
+        f"PRAGMA cache_size = -{int(settings.sqlite_cache_size_kib)}",
+        f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}",
+    ]
+    if readonly:
+        statements.append("PRAGMA query_only = ON")
+    else:
+        # journal_mode хранится в самом файле, достаточно выставлять его со стороны писателя
+        statements.insert(0, f"PRAGMA journal_mode = {settings.sqlite_journal_mode}")
+
+    def apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    return apply
+
+def _configure(target: Engine, readonly: bool) -> None:
+    event.listen(target, "connect", _register_sqlite_functions)
+    if _routed:
+        event.listen(target, "connect", _pragmas(readonly))
+
+_configure(engine, readonly=False)
+_configure(async_engine.sync_engine, readonly=False)
+if _routed:
+    _configure(read_engine, readonly=True)
+    _configure(async_read_engine.sync_engine, readonly=True)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
-        
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+async def dispose_engines() -> None:
+    for target in {async_engine, async_read_engine}:
+        await target.dispose()
+    for target in {engine, read_engine}:
+        target.dispose()
+
+def _forget_pools_after_fork() -> None:
+    # Соединения SQLite нельзя делить между процессами: потомок бросает унаследованные пулы,
+    # не закрывая их (close=False), чтобы не задеть соединения родителя
+    for target in {engine, read_engine, async_engine.sync_engine, async_read_engine.sync_engine}:
+        target.dispose(close=False)
+
+# Срабатывает при любом fork (run.py --prod, gunicorn --preload): воркеры открывают собственные соединения
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_pools_after_fork)
+
+class DuplicateKeyError(RuntimeError):
+    pass
+
+
+def _check_unique(index: Index) -> None:
+    """Refuse to build a unique index over existing duplicates with a message that says how to fix them."""
+    columns = list(index.columns)
+    with engine.connect() as connection:
+        duplicates = connection.execute(
+            select(*columns, func.count().label("copies"))
+            .group_by(*columns)
+            .having(func.count() > 1)
+            .order_by(func.count().desc())
+            .limit(5)
+        ).all()
+    if not duplicates:
+        return
+    names = ", ".join(f"{tuple(row[:-1]) if len(columns) > 1 else row[0]!r} x{row.copies}" for row in duplicates)
+    keys = ", ".join(column.name for column in columns)
+    raise DuplicateKeyError(
+        f"Cannot create unique index {index.name}: {index.table.name} has duplicate ({keys}), e.g. {names}. "
+        f"Rename or delete the extra rows (SELECT {keys}, count(*) FROM {index.table.name} "
+        f"GROUP BY {keys} HAVING count(*) > 1 lists them all) and start again."
+    )
+
+
+# Индексы, убранные из моделей: create_all их не удаляет
+OBSOLETE_INDEXES = ("ix_products_category_id",)
+
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        for name in OBSOLETE_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    # create_all пропускает индексы у уже существующих таблиц
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspect(engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            # Иначе IntegrityError посреди миграции без указания, какие строки мешают
+            if index.unique:
+                _check_unique(index)
+            index.create(bind=engine)
+
+
+# Версия схемы: увеличивать при любом изменении таблиц, индексов или FTS-схемы (search._FTS_DDL)
+SCHEMA_VERSION = 5
+
+
+def applied_schema_version() -> Optional[int]:
+    """Version recorded in schema_version, or None on a database that was never migrated."""
+    with engine.connect() as connection:
+        try:
+            return connection.execute(text("SELECT version FROM schema_version WHERE id = 1")).scalar()
+        except (OperationalError, ProgrammingError):  # таблицы ещё нет
+            return None
+
+
+def _normalize_created_at() -> None:
+    # Строки от CURRENT_TIMESTAMP (без микросекунд) приводим к формату SQLAlchemy: иначе курсор
+    # по created_at пропускает или повторяет товары на границе страниц
+    with engine.begin() as connection:
+        connection.execute(text(
+            "UPDATE products SET created_at = created_at || '.000000' WHERE length(created_at) = 19"
+        ))
+
+
+def ensure_schema() -> bool:
+    """Per-boot schema check: a single SELECT when the schema is current.
+
+    Otherwise creates missing tables, indexes and the search index and records
+    SCHEMA_VERSION. Returns True when that migration work ran.
+    """
+    if applied_schema_version() == SCHEMA_VERSION:
+        return False
+
+    # Модели и поиск нужны только для миграции: на обычном старте их импорт не требуется
+    from .models import SchemaVersion
+    from .repositories.catalog_changes import ChangeLogRepository
+    from .search import ensure_search_index
+
+    init_db()
+    _normalize_created_at()
+    ensure_search_index(engine)
+    applied_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    with engine.begin() as connection:
+        # Каталог старше журнала изменений: дельта-клиенты начинают с полной перекачки
+        ChangeLogRepository(connection).start()
+        table = SchemaVersion.__table__
+        connection.execute(table.delete())
+        connection.execute(table.insert().values(id=1, version=SCHEMA_VERSION, applied_at=applied_at))
+    return True
@@ -0,0 +1,374 @@
+"""Server-Sent Events: catalog invalidations pushed to browsers (GET /api/events).
+
+One EventHub per process polls the catalog change log (app.repositories.catalog_changes)
+every events_poll_interval seconds: one primary-key read however many clients are
+connected, and it also sees writes made by other workers and by the importer CLI.
+Writes in this process call notify_catalog_changed() after they commit, which wakes the
+poller at once. Each new entry is encoded once into an SSE frame
+
+    id: 42
+    event: invalidate
+    data: {"entity": "product", "id": 7, "op": "upsert", "version": 13}
+
+and appended to a bounded ring shared by all connections. A connection holds only its
+position in the ring and waits on a future shared by every idle connection, which the
+hub resolves on new frames and on each heartbeat. Idle connections therefore cost no
+per-connection timers or queues.
+
+Backpressure: a consumer too slow to keep up falls behind the start of the ring and gets
+a single `resync` event instead of an ever-growing backlog (reload the catalog, then
+carry on). A send blocked longer than events_send_timeout closes the connection.
+Last-Event-ID (or ?since=) resumes from the change log; when the requested point is no
+longer retained the stream starts with `resync`.
+
+Shutdown: the server waits for open responses before it stops, and a stream would hold
+it for up to events_max_duration. While the hub runs, SIGTERM/SIGINT first close every
+stream (close_streams_on_signals, installed by the app lifespan), whichever server runs
+the app: run.py, plain uvicorn, the reloader or app.server.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import signal
+import threading
+import time
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from .cache import get_catalog_version_memo
+from .config import settings
+from .database import ReadSessionLocal
+from .repositories.catalog_changes import ChangeLogRepository
+from .repositories.catalog_state import CatalogStateRepository
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT = b": ping\n\n"
+EVENTS = "events"
+
+
+def _invalidate_frame(seq: int, entity: str, entity_id: int, op: str, version: int) -> bytes:
+    data = json.dumps({"entity": entity, "id": entity_id, "op": op, "version": version}, separators=(",", ":"))
+    return f"id: {seq}\nevent: invalidate\ndata: {data}\n\n".encode()
+
+
+def _resync_frame(seq: int, version: int) -> bytes:
+    data = json.dumps({"seq": seq, "version": version}, separators=(",", ":"))
+    return f"id: {seq}\nevent: resync\ndata: {data}\n\n".encode()
+
+
+class EventHub:
+    """Polls the change log and fans frames out to every open stream of this process."""
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = ReadSessionLocal,
+        buffer_size: int = 1024,
+        poll_interval: float = 1.0,
+        heartbeat_interval: float = 15.0,
+    ):
+        self.session_factory = session_factory
+        self.buffer_size = buffer_size
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        # Кольцо кадров: параллельные списки, чтобы искать позицию клиента бинарным поиском
+        self._seqs: List[int] = []
+        self._frames: List[bytes] = []
+        self.head = 0  # последний опубликованный seq
+        self.covered_from = 0  # кадры после этого seq есть в кольце; клиенту, отставшему сильнее, — resync
+        self.version = 0
+        self.connections = 0
+        self.closing = False  # сервер останавливается: потоки завершаются, новые кадры не ждут
+        self.resyncs = 0
+        self.dropped = 0
+        self._tick: Optional[asyncio.Future] = None
+        self._poke: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # --- жизненный цикл (lifespan приложения) ---
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self.closing = False
+        self._poke = asyncio.Event()
+        self._tick = self._loop.create_future()
+        _, self.head, self.version = await run_in_threadpool(self._read_bounds)
+        self.covered_from = self.head
+        self._task = asyncio.create_task(self._run())
+
+    def close_streams(self) -> None:
+        """End every open stream (server shutdown); clients reconnect with Last-Event-ID.
+
+        Safe to call from a signal handler or another thread.
+        """
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._close)
+
+    def _close(self) -> None:
+        # Флаг видят и потоки, которые в момент отмены писали клиенту, а не ждали тик
+        self.closing = True
+        self._cancel_tick()
+
+    def _cancel_tick(self) -> None:
+        if self._tick is not None and not self._tick.done():
+            self._tick.cancel()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._cancel_tick()
+
+    def notify(self) -> None:
+        """Wake the poller now; safe to call from worker threads."""
+        if self._loop is not None and self._poke is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._poke.set)
+
+    # --- опрос журнала ---
+
+    def _read_bounds(self) -> Tuple[int, int, int]:
+        with self.session_factory() as db:
+            floor, head = ChangeLogRepository(db).bounds()
+            return floor, head, CatalogStateRepository(db).get().version
+
+    def _poll(self, after: int) -> Tuple[List[Tuple[int, bytes]], int, int, bool]:
+        """(frames after `after`, head, version, resync); resync when the log was trimmed or reset past `after`."""
+        with self.session_factory() as db:
+            changes = ChangeLogRepository(db)
+            floor, head = changes.bounds()
+            if head == after:
+                return [], head, self.version, False
+            version = CatalogStateRepository(db).get().version
+            if floor > after or head < after:
+                return [], head, version, True
+            rows = changes.read(after, self.buffer_size + 1)
+            if len(rows) > self.buffer_size:
+                # Больше, чем помещается в кольцо: всё равно всем пришлось бы перекачивать каталог
+                return [], head, version, True
+            frames = [(row.seq, _invalidate_frame(row.seq, row.entity, row.entity_id, row.op, version)) for row in rows]
+            return frames, head, version, False
+
+    async def _run(self) -> None:
+        last_heartbeat = time.monotonic()
+        while True:
+            timeout = min(self.poll_interval, max(0.0, last_heartbeat + self.heartbeat_interval - time.monotonic()))
+            try:
+                await asyncio.wait_for(self._poke.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._poke.clear()
+            try:
+                frames, head, version, resync = await run_in_threadpool(self._poll, self.head)
+            except Exception:
+                logger.exception("Catalog change log poll failed")
+                frames, resync = [], False
+
+            if resync:
+                self._reset_ring(head, version)
+            elif frames:
+                self._publish(frames, version)
+            elif time.monotonic() - last_heartbeat >= self.heartbeat_interval:
+                self._broadcast(HEARTBEAT)
+            else:
+                continue
+            last_heartbeat = time.monotonic()
+            if resync or frames:
+                # Запись могла прийти из другого воркера: версия для ETag перечитывается сразу
+                get_catalog_version_memo().invalidate()
+                self._broadcast(EVENTS)
+
+    def _publish(self, frames: List[Tuple[int, bytes]], version: int) -> None:
+        for seq, frame in frames:
+            self._seqs.append(seq)
+            self._frames.append(frame)
+        self.head = frames[-1][0]
+        self.version = version
+        # Обрезка пачкой, когда кольцо выросло вдвое: амортизированно O(1) на кадр
+        if len(self._seqs) > 2 * self.buffer_size:
+            cut = len(self._seqs) - self.buffer_size
+            self.covered_from = self._seqs[cut - 1]
+            del self._seqs[:cut], self._frames[:cut]
+
+    def _reset_ring(self, head: int, version: int) -> None:
+        self._seqs.clear()
+        self._frames.clear()
+        self.head = self.covered_from = head
+        self.version = version
+
+    def _broadcast(self, reason: Any) -> None:
+        tick, self._tick = self._tick, self._loop.create_future()
+        if not tick.done():  # отменён close_streams()
+            tick.set_result(reason)
+
+    # --- чтение для потоков ---
+
+    def next_tick(self) -> asyncio.Future:
+        return self._tick
+
+    def frames_after(self, cursor: int) -> Optional[bytes]:
+        """Frames newer than `cursor` joined into one chunk; None when the ring no longer covers it."""
+        if cursor >= self.head:
+            return b""
+        if cursor < self.covered_from:
+            return None
+        return b"".join(self._frames[bisect_right(self._seqs, cursor):])
+
+    def replay(self, after: int, limit: int) -> Tuple[bytes, int]:
+        """Frames after `after` from the change log (Last-Event-ID); a resync frame when not retained."""
+        with self.session_factory() as db:
+            changes = ChangeLogRepository(db)
+            floor, head = changes.bounds()
+            version = CatalogStateRepository(db).get().version
+            if head == after:
+                return b"", after
+            rows = changes.read(after, limit + 1) if floor <= after < head else []
+            if not rows or len(rows) > limit:
+                self.resyncs += 1
+                return _resync_frame(head, version), head
+            return b"".join(
+                _invalidate_frame(row.seq, row.entity, row.entity_id, row.op, version) for row in rows
+            ), rows[-1].seq
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "connections": self.connections,
+            "head": self.head,
+            "buffered": len(self._frames),
+            "resyncs": self.resyncs,
+            "dropped": self.dropped,
+        }
+
+
+class EventStreamResponse(Response):
+    """Pure ASGI text/event-stream response attached to the hub until the client leaves."""
+
+    media_type = "text/event-stream"
+
+    def __init__(self, hub: EventHub, last_event_id: Optional[int] = None):
+        self.hub = hub
+        self.last_event_id = last_event_id
+        self.status_code = 200
+        self.background = None
+        # Без тела: Content-Length не выставляется; X-Accel-Buffering выключает буферизацию в nginx
+        self.init_headers({"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Content-Type": self.media_type})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        hub = self.hub
+        disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+        hub.connections += 1
+        try:
+            if await self._stream(hub, send, disconnected):
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        except (asyncio.TimeoutError, OSError):
+            hub.dropped += 1  # медленный или пропавший клиент: соединение закрывается
+        finally:
+            hub.connections -= 1
+            disconnected.cancel()
+
+    async def _stream(self, hub: EventHub, send: Send, disconnected: asyncio.Future) -> bool:
+        """Send frames; returns True when the server ends the stream, False when the client left."""
+        async def write(chunk: bytes) -> None:
+            await asyncio.wait_for(
+                send({"type": "http.response.body", "body": chunk, "more_body": True}),
+                settings.events_send_timeout,
+            )
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await write(f"retry: {settings.events_retry_ms}\n\n".encode())
+
+        cursor = hub.head
+        if self.last_event_id is not None and self.last_event_id != hub.head:
+            chunk, cursor = await run_in_threadpool(hub.replay, self.last_event_id, settings.events_replay_limit)
+            if chunk:
+                await write(chunk)
+
+        deadline = time.monotonic() + settings.events_max_duration if settings.events_max_duration > 0 else None
+        while True:
+            chunk = hub.frames_after(cursor)
+            if chunk is None:
+                hub.resyncs += 1
+                chunk, cursor = _resync_frame(hub.head, hub.version), hub.head
+            elif chunk:
+                cursor = hub.head
+            if chunk:
+                await write(chunk)
+
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if hub.closing or (timeout is not None and timeout <= 0):
+                return True
+            tick = hub.next_tick()
+            done, _ = await asyncio.wait((tick, disconnected), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                return False
+            if tick.cancelled():
+                return True
+            if tick in done and tick.result() is HEARTBEAT and cursor >= hub.head:
+                await write(HEARTBEAT)
+
+
+async def _wait_disconnect(receive: Receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+_hub = EventHub(
+    buffer_size=settings.events_buffer_size,
+    poll_interval=settings.events_poll_interval,
+    heartbeat_interval=settings.events_heartbeat_interval,
+)
+
+
+def get_event_hub() -> EventHub:
+    return _hub
+
+
+def close_streams_on_signals(hub: EventHub) -> Callable[[], None]:
+    """Chain hub.close_streams() in front of the SIGTERM/SIGINT handlers the server installed.
+
+    Returns a function restoring the previous handlers. Outside the main thread, or when a
+    signal has no Python handler (the server does not catch it), nothing is changed.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return lambda: None
+    previous: Dict[int, Callable[..., Any]] = {}
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        handler = signal.getsignal(sig)
+        if callable(handler):
+            previous[sig] = handler
+
+    def close_streams_then(sig: int, frame: Any) -> None:
+        hub.close_streams()
+        previous[sig](sig, frame)
+
+    for sig in previous:
+        signal.signal(sig, close_streams_then)
+
+    def restore() -> None:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+    return restore
+
+
+def notify_catalog_changed() -> None:
+    """Called by catalog writers after commit: drops the memoized catalog version used for
+    ETags and wakes the event hub, so streams hear about the change without waiting for a poll."""
+    get_catalog_version_memo().invalidate()
+    _hub.notify()
+
+
+def events_gauges() -> Iterable[Tuple[Dict[str, str], float]]:
+    for stat, value in _hub.stats().items():
+        yield {"stat": stat}, value
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Optional
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .cache import get_catalog_version_memo, set_request_catalog_version
+from .services.catalog import CatalogService
+from .services.runner import ThreadpoolServiceRunner, service_dependency
+from .static_assets import get_asset_manifest
+
+get_catalog_service = service_dependency(CatalogService)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def prebuilt_json(body: bytes, response: Response) -> Response:
+    """Return already serialized JSON as is, skipping response_model validation."""
+    # Заголовки, выставленные зависимостями (ETag, Cache-Control), на возвращаемый Response сами не переносятся
+    return Response(content=body, media_type="application/json", headers=dict(response.headers))
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Cache-Control policy for a router's GET responses."""
+
+    max_age: int
+    stale_while_revalidate: int = 0
+    public: bool = True
+
+    def header(self) -> str:
+        parts = ["public" if self.public else "private", f"max-age={self.max_age}"]
+        if self.stale_while_revalidate:
+            parts.append(f"stale-while-revalidate={self.stale_while_revalidate}")
+        return ", ".join(parts)
+
+
+def catalog_etag(version: int, variant: Optional[str] = None) -> str:
+    # Ответы ссылаются на отпечатки статики: новая сборка ассетов тоже меняет ETag
+    assets = get_asset_manifest().digest
+    tag = f"catalog-{version}.{assets}" if assets else f"catalog-{version}"
+    # Разные представления одного URL (JSON/NDJSON) должны иметь разные сильные ETag
+    return f'"{tag}-{variant}"' if variant else f'"{tag}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match использует слабое сравнение: W/"x" совпадает с "x"
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+def _matches_any(if_none_match: str) -> bool:
+    return any(candidate.strip() == "*" for candidate in if_none_match.split(","))
+
+
+def _not_modified_since(if_modified_since: str, updated_at: Optional[datetime]) -> bool:
+    if updated_at is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return updated_at.replace(microsecond=0) <= since
+
+
+def conditional_get(policy: CachePolicy) -> Callable[..., Any]:
+    """Router dependency: emit ETag/Last-Modified/Cache-Control and answer 304 from the catalog stamp.
+
+    It runs before the endpoint, so a revalidation hit never touches product rows or the
+    serializer. The catalog_state stamp itself is memoized per process (catalog_version_ttl),
+    so most requests, hits included, do not read it either.
+
+    `If-None-Match: *` matches only an existing representation, which is known after the
+    endpoint ran: the dependency leaves it to ExistingRepresentationMiddleware.
+    """
+
+    async def check_catalog_freshness(
+        request: Request,
+        response: Response,
+        catalog: ThreadpoolServiceRunner[CatalogService] = Depends(get_catalog_service),
+    ) -> None:
+        if request.method not in ("GET", "HEAD"):
+            return
+
+        memo = get_catalog_version_memo()
+        state = memo.get()
+        if state is None:
+            generation = memo.generation
+            state = await catalog.call(CatalogService.get_version)
+            memo.set(state, generation)
+        # Кэш каталога отдаёт только записи этой версии (см. app.cache.VersionedCache)
+        set_request_catalog_version(state.version)
+        updated_at = state.updated_at.replace(tzinfo=timezone.utc) if state.updated_at else None
+        headers = {
+            "ETag": catalog_etag(state.version, "ndjson" if wants_ndjson(request) else None),
+            "Cache-Control": policy.header(),
+            "Vary": "Accept",
+        }
+        if updated_at is not None:
+            headers["Last-Modified"] = format_datetime(updated_at, usegmt=True)
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None and _matches_any(if_none_match):
+            request.state.not_modified_headers = headers
+            not_modified = False
+        elif if_none_match is not None:
+            not_modified = _etag_matches(if_none_match, headers["ETag"])
+        else:
+            if_modified_since = request.headers.get("if-modified-since")
+            not_modified = if_modified_since is not None and _not_modified_since(if_modified_since, updated_at)
+
+        if not_modified:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response.headers.update(headers)
+
+    return check_catalog_freshness
+
+
+class ExistingRepresentationMiddleware:
+    """Turns a 2xx answer to `If-None-Match: *` into 304 on conditional_get routes.
+
+    The endpoint runs as usual, so a missing product or category still gets its 404;
+    only when it produced a representation is the body dropped and 304 sent with the
+    validators prepared by the dependency.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        replaced = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal replaced
+            if message["type"] == "http.response.start":
+                headers = scope.get("state", {}).get("not_modified_headers")
+                if headers is not None and 200 <= message["status"] < 300:
+                    replaced = True
+                    await send({
+                        "type": "http.response.start",
+                        "status": status.HTTP_304_NOT_MODIFIED,
+                        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()],
+                    })
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+            elif replaced:
+                return  # тело представления клиенту не нужно
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
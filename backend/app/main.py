@@ -1,17 +1,36 @@
 from __future__ import annotations
 
+import asyncio
+import time
+
+_import_started = time.perf_counter()
+
 from contextlib import asynccontextmanager
 from pathlib import Path
 
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
+from .admission import AdmissionMiddleware, admission_gauges, pool_timeout_handler
+from .coalescing import coalescing_gauges
+from .compression import CompressionMiddleware, compression_gauges
 from .config import settings
-from .database import SessionLocal, init_db
-from .models.product import Product
-from .routers import cart_router, categories_router, products_router
-from .seed_data import seed
+from . import database
+from .http_cache import ExistingRepresentationMiddleware
+from .database import ReadSessionLocal, dispose_engines, ensure_schema
+from .metrics import (
+    MetricsMiddleware, cache_gauges, get_metrics_registry, instrument_engine, pool_gauges, threadpool_gauges,
+)
+from .query_budget import query_budget
+from .events import close_streams_on_signals, events_gauges, get_event_hub
+from .routers import admin_router, cart_router, catalog_router, categories_router, events_router, products_router
+from .startup import StartupTimer, cached_openapi, logger as startup_logger
+from .static_assets import AssetFiles, load_manifest, set_asset_manifest
+
+startup = StartupTimer(started=_import_started)
 
 
 def _resolve_under_app(path_str: str) -> Path:
@@ -21,23 +40,62 @@ def _resolve_under_app(path_str: str) -> Path:
     return p if p.is_absolute() else base / p
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    init_db()
+def _seed_if_empty() -> None:
+    # Сиды импортируются только здесь: на обычном старте модуль с демо-данными не нужен
+    from .models.product import Product
+    from .seed_data import seed
 
-    session = SessionLocal()
-    try:
-        has_products = session.query(Product.id).limit(1).first() is not None
-    finally:
-        session.close()
+    with ReadSessionLocal() as session:
+        if session.query(Product.id).limit(1).first() is None:
+            seed()
+
+
+_prepared = False
 
-    if not has_products:
-        seed()
+
+def prepare() -> None:
+    """One-time boot work; the prefork launcher (app.server) runs it in the master so workers inherit it."""
+    global _prepared
+    if _prepared:
+        return
+    # Обычный старт: одно чтение schema_version вместо create_all и проверки наличия товаров
+    with startup.phase("schema"):
+        ensure_schema()
+    if settings.seed_on_startup:
+        with startup.phase("seed"):
+            _seed_if_empty()
+    with startup.phase("static"):
+        set_asset_manifest(load_manifest(static_dir))
+    _prepared = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    prepare()
+    # Лимитер потоков принадлежит event loop, поэтому задаётся здесь, а не при импорте
+    to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    startup_logger.info(startup.finish())
+    compaction = None
+    if settings.changes_compact_interval > 0:
+        from .catalog_changes import run_compaction
+
+        compaction = asyncio.create_task(run_compaction(database.engine, settings.changes_compact_interval))
+    restore_signals = None
+    if settings.events_enabled:
+        await get_event_hub().start()
+        # Сервер ждёт открытые ответы до остановки: по сигналу выхода SSE-потоки закрываются сразу,
+        # клиенты переподключатся (к другому воркеру или к перезапущенному процессу)
+        restore_signals = close_streams_on_signals(get_event_hub())
 
     try:
         yield
     finally:
-        pass
+        if restore_signals is not None:
+            restore_signals()
+        if compaction is not None:
+            compaction.cancel()
+        await get_event_hub().stop()
+        await dispose_engines()
 
 
 app = FastAPI(
@@ -47,6 +105,18 @@ app = FastAPI(
     redoc_url="/api/redoc",
     lifespan=lifespan,
 )
+if settings.openapi_cache_file:
+    app.openapi = cached_openapi(app, _resolve_under_app(settings.openapi_cache_file))
+# Пул соединений исчерпан дольше db_pool_timeout: это перегрузка (503 + Retry-After), а не ошибка сервера
+app.add_exception_handler(PoolTimeoutError, pool_timeout_handler)
+
+# If-None-Match: * решается по ответу роута, поэтому этот слой самый внутренний
+app.add_middleware(ExistingRepresentationMiddleware)
+
+# Контроль нагрузки ближе всех к роутерам, но внутри CORS: ответ 503 получает CORS-заголовки,
+# и браузер может прочитать Retry-After
+if settings.admission_enabled:
+    app.add_middleware(AdmissionMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -54,28 +124,66 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cart-Token"],
 )
 
+# Сжатие внутри метрик: время сжатия попадает в задержку роута
+if settings.compression_enabled:
+    app.add_middleware(CompressionMiddleware)
+
+# Метрики Prometheus: добавляется последним, чтобы быть внешним слоем и видеть всё время запроса
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    _pools = (
+        {"write": database.async_engine.sync_engine, "read": database.async_read_engine.sync_engine}
+        if settings.db_mode == "async"
+        else {"write": database.engine, "read": database.read_engine}
+    )
+    for _engine in {id(e): e for e in (*_pools.values(), database.engine, database.read_engine)}.values():
+        instrument_engine(_engine)
+    _metrics = get_metrics_registry()
+    _metrics.register_gauges("catalog_cache", "Catalog cache counters and size.", cache_gauges)
+    _metrics.register_gauges("threadpool_threads", "Worker threads used by run_in_threadpool.", threadpool_gauges)
+    _metrics.register_gauges("db_pool_connections", "SQLAlchemy pool connections by pool and state.", pool_gauges(_pools))
+    _metrics.register_gauges("compression_cache", "Compressed response cache counters and size.", compression_gauges)
+    _metrics.register_gauges("admission", "Admission control by request class: slots, queue and rejections.", admission_gauges)
+    _metrics.register_gauges("coalescing", "Single-flight coalescing of identical catalog reads.", coalescing_gauges)
+    _metrics.register_gauges("event_streams", "SSE invalidation hub: open streams, ring and drops.", events_gauges)
+    _metrics.register_gauges("app_startup_seconds", "Process startup time by phase.", startup.gauges)
+
 # Подготовка статических директорий (создадим, если их нет)
 static_dir = _resolve_under_app(settings.static_dir)
 images_dir = _resolve_under_app(settings.images_dir)
 static_dir.mkdir(parents=True, exist_ok=True)
 images_dir.mkdir(parents=True, exist_ok=True)
 
-app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+app.mount("/static", AssetFiles(directory=str(static_dir)), name="static")
 
 # Роутеры
 app.include_router(products_router)
 app.include_router(categories_router)
 app.include_router(cart_router)  # <— вместо повторного products_router
+app.include_router(admin_router)
+app.include_router(catalog_router)
+if settings.events_enabled:
+    app.include_router(events_router)
 
-@app.get("/")
+@app.get("/", openapi_extra=query_budget(0))
 def root():
     return {
         "message": "Welcome to the API!",
         "docs": "/api/docs",  # лучше с ведущим слэшем
     }
 
-@app.get("/health")
+@app.get("/health", openapi_extra=query_budget(0))
 def health():
     return {"status": "ok"}
+
+if settings.metrics_enabled:
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(
+            get_metrics_registry().render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+startup.record("import", time.perf_counter() - _import_started)
@@ -0,0 +1,280 @@
+"""In-process request and SQL metrics rendered in the Prometheus text format.
+
+Recording is a bisect over a tuple of bucket bounds plus a couple of integer
+increments (see benchmarks/bench_metrics.py); there are no locks on the hot path.
+Request-level counters are only touched from the event loop thread. SQL timings
+arrive from worker threads but go into a per-request RequestStats object that is
+reached through a ContextVar, which run_in_threadpool and AsyncSession.run_sync
+both propagate, and are folded into process totals when the request finishes.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_COUNT_BUCKETS: Tuple[float, ...] = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED_ROUTE = "<unmatched>"
+
+GaugeSource = Callable[[], Iterable[Tuple[Dict[str, str], float]]]
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts are per bucket and made cumulative only when rendered."""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        # bisect_left: значение, равное границе, попадает в её бакет (семантика le)
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def samples(self, name: str, labels: Dict[str, str]) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        cumulative = 0
+        for bound, hits in zip(self.bounds, self.counts):
+            cumulative += hits
+            yield f"{name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+        cumulative += self.counts[-1]
+        yield f"{name}_bucket", {**labels, "le": "+Inf"}, cumulative
+        yield f"{name}_sum", labels, self.sum
+        yield f"{name}_count", labels, cumulative
+
+
+class RequestStats:
+    """SQL work attributed to one request."""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("metrics_request", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _current_request.get()
+
+
+class RouteMetrics:
+    __slots__ = ("latency", "queries", "db_seconds", "responses")
+
+    def __init__(self) -> None:
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_seconds = Histogram(LATENCY_BUCKETS)
+        self.responses: Dict[Tuple[str, int], int] = {}
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.routes: Dict[str, RouteMetrics] = {}
+        self.in_flight = 0
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        # Запросы вне HTTP-запроса (старт, CLI) приходят из любых потоков и редки: им можно лок
+        self._background_lock = threading.Lock()
+        self._background_queries = 0
+        self._background_seconds = 0.0
+        self._gauges: Dict[str, Tuple[str, GaugeSource]] = {}
+
+    def record(self, route: str, method: str, status: int, seconds: float, stats: RequestStats) -> None:
+        metrics = self.routes.get(route)
+        if metrics is None:
+            metrics = self.routes.setdefault(route, RouteMetrics())
+        metrics.latency.observe(seconds)
+        metrics.queries.observe(stats.queries)
+        metrics.db_seconds.observe(stats.db_seconds)
+        key = (method, status)
+        metrics.responses[key] = metrics.responses.get(key, 0) + 1
+        self.sql_queries += stats.queries
+        self.sql_seconds += stats.db_seconds
+
+    def record_background_query(self, seconds: float) -> None:
+        with self._background_lock:
+            self._background_queries += 1
+            self._background_seconds += seconds
+
+    def register_gauges(self, name: str, help_text: str, source: GaugeSource) -> None:
+        """Add a gauge family computed at scrape time; `source` yields (labels, value) pairs."""
+        self._gauges[name] = (help_text, source)
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str, samples: Iterable[Tuple[str, Dict[str, str], float]]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample, labels, value in samples:
+                lines.append(f"{sample}{_format_labels(labels)} {_format_value(value)}")
+
+        routes = sorted(self.routes.items())
+        family(
+            "http_request_duration_seconds", "histogram", "Request latency by route template.",
+            (s for route, m in routes for s in m.latency.samples("http_request_duration_seconds", {"route": route})),
+        )
+        family(
+            "http_responses_total", "counter", "Responses by route template, method and status code.",
+            (
+                ("http_responses_total", {"route": route, "method": method, "status": str(status)}, count)
+                for route, m in routes
+                for (method, status), count in sorted(m.responses.items())
+            ),
+        )
+        family(
+            "http_requests_in_flight", "gauge", "Requests currently being processed.",
+            [("http_requests_in_flight", {}, self.in_flight)],
+        )
+        family(
+            "http_request_db_queries", "histogram", "SQL statements executed per request.",
+            (s for route, m in routes for s in m.queries.samples("http_request_db_queries", {"route": route})),
+        )
+        family(
+            "http_request_db_duration_seconds", "histogram", "Time spent in SQL statements per request.",
+            (s for route, m in routes for s in m.db_seconds.samples("http_request_db_duration_seconds", {"route": route})),
+        )
+        family("db_queries_total", "counter", "SQL statements executed by the process.",
+               [("db_queries_total", {}, self.sql_queries + self._background_queries)])
+        family("db_query_duration_seconds_total", "counter", "Time spent in SQL statements by the process.",
+               [("db_query_duration_seconds_total", {}, self.sql_seconds + self._background_seconds)])
+
+        for name, (help_text, source) in sorted(self._gauges.items()):
+            family(name, "gauge", help_text, ((name, labels, value) for labels, value in source()))
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return _registry
+
+
+def route_name(scope: Scope) -> str:
+    # Шаблон пути, а не сам путь: /api/products/{product_id}, иначе кардинальность меток не ограничена
+    return getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: latency, status and SQL work per route template."""
+
+    def __init__(self, app: ASGIApp, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.registry = registry or _registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        registry.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            registry.in_flight -= 1
+            _current_request.reset(token)
+            registry.record(route_name(scope), scope["method"], status, elapsed, stats)
+
+
+def instrument_engine(engine: Engine, registry: Optional[MetricsRegistry] = None) -> None:
+    """Attribute every statement executed on `engine` to the current request and to process totals."""
+    registry = registry or _registry
+
+    def before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+        stats = _current_request.get()
+        if stats is None:
+            registry.record_background_query(elapsed)
+        else:
+            # Итоги процесса пополняются из record() в потоке event loop, без гонок между воркерами
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+    def handle_error(exception_context: Any) -> None:
+        # Упавший запрос не доходит до after_cursor_execute: снимаем его отметку времени
+        started = exception_context.connection and exception_context.connection.info.get("metrics_started")
+        if started:
+            started.pop()
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+
+def cache_gauges() -> Iterable[Tuple[Dict[str, str], float]]:
+    from .cache import get_catalog_cache
+
+    stats = getattr(get_catalog_cache(), "stats", None)
+    for stat, value in (stats() if stats else {}).items():
+        yield {"stat": stat}, value
+
+
+def threadpool_gauges() -> Iterable[Tuple[Dict[str, str], float]]:
+    # Лимитер anyio, которым пользуется run_in_threadpool; вызывается из /metrics внутри event loop
+    from anyio.to_thread import current_default_thread_limiter
+
+    limiter = current_default_thread_limiter()
+    yield {"state": "busy"}, limiter.borrowed_tokens
+    yield {"state": "limit"}, limiter.total_tokens
+
+
+def pool_gauges(engines: Dict[str, Engine]) -> GaugeSource:
+    def source() -> Iterable[Tuple[Dict[str, str], float]]:
+        for pool_name, engine in engines.items():
+            pool = engine.pool
+            for state, getter in (("checked_out", "checkedout"), ("idle", "checkedin"), ("size", "size")):
+                if hasattr(pool, getter):
+                    yield {"pool": pool_name, "state": state}, getattr(pool, getter)()
+
+    return source
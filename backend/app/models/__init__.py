@@ -1,4 +1,8 @@
+from .cart import Cart, CartLine
+from .catalog_change import CatalogChange, CatalogChangeLogState
+from .catalog_state import CatalogState
 from .category import Category
 from .product import Product
+from .schema_version import SchemaVersion
 
-__all__ = ["Category", "Product"]
\ No newline at end of file
+__all__ = ["Cart", "CartLine", "CatalogChange", "CatalogChangeLogState", "CatalogState", "Category", "Product", "SchemaVersion"]
\ No newline at end of file
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from ..database import Base
+
+class Cart(Base):
+    __tablename__ = 'carts'
+    
+    token = Column(String, primary_key=True)
+    updated_at = Column(DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<Cart(token='{self.token}', updated_at='{self.updated_at}')>"
+
+class CartLine(Base):
+    __tablename__ = 'cart_items'
+    
+    token = Column(String, ForeignKey('carts.token', ondelete='CASCADE'), primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    quantity = Column(Integer, nullable=False)
+    
+    def __repr__(self):
+        return f"<CartLine(token='{self.token}', product_id={self.product_id}, quantity={self.quantity})>"
\ No newline at end of file
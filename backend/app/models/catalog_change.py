@@ -0,0 +1,32 @@
+from sqlalchemy import Column, DateTime, Index, Integer, String
+from ..database import Base
+
+class CatalogChange(Base):
+    """One entry of the catalog change log: which entity changed and how, no payload."""
+    __tablename__ = 'catalog_changes'
+    __table_args__ = (
+        # Компакция ищет более поздние записи той же сущности
+        Index('ix_catalog_changes_entity_seq', 'entity', 'entity_id', 'seq'),
+        Index('ix_catalog_changes_changed_at', 'changed_at'),
+        # AUTOINCREMENT: номера удалённых компакцией записей никогда не выдаются повторно
+        {'sqlite_autoincrement': True},
+    )
+
+    seq = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)
+    changed_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<CatalogChange(seq={self.seq}, entity='{self.entity}', entity_id={self.entity_id}, op='{self.op}')>"
+
+class CatalogChangeLogState(Base):
+    """Single-row watermark: changes up to trimmed_through were compacted away or reset."""
+    __tablename__ = 'catalog_change_state'
+
+    id = Column(Integer, primary_key=True)
+    trimmed_through = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CatalogChangeLogState(trimmed_through={self.trimmed_through})>"
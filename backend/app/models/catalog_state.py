@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime, Integer
+from ..database import Base
+
+class CatalogState(Base):
+    """Single-row change stamp of the catalog, bumped by every catalog write."""
+    __tablename__ = 'catalog_state'
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
+    
+    def __repr__(self):
+        return f"<CatalogState(version={self.version}, updated_at='{self.updated_at}')>"
\ No newline at end of file
@@ -1,18 +1,37 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from ..database import Base
 
+# Формат, в котором SQLAlchemy пишет DateTime в SQLite; курсор created_at сравнивается с ним как со строкой
+CREATED_AT_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+def _utcnow() -> datetime:
+    # Значение задаёт приложение, а не CURRENT_TIMESTAMP: тот пишет без микросекунд, и строки
+    # двух форматов сортировались бы не так, как сравнивает курсор
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 class Product(Base):
     __tablename__ = 'products'
+    __table_args__ = (
+        # Keyset pagination: every ordering ends with id so the index covers the cursor predicate
+        Index('ix_products_created_at_id', 'created_at', 'id'),
+        Index('ix_products_name_id', 'name', 'id'),
+        Index('ix_products_category_id_id', 'category_id', 'id'),
+        Index('ix_products_category_created_at_id', 'category_id', 'created_at', 'id'),
+        Index('ix_products_category_name_id', 'category_id', 'name', 'id'),
+        # Естественный ключ товара: по нему работают сид и upsert при импорте
+        Index('uq_products_name', 'name', unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, nullable=False, index=True)
+    name = Column(String, nullable=False)
     description = Column(Text)
     category_id = Column(Integer, ForeignKey('categories.id'), nullable=False)
     image_url = Column(String)
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTime, default=_utcnow, server_default=func.now())
     
     category = relationship('Category', back_populates='products')
     
     def __repr__(self):
-        return f"<Product(id={self.id}, name='{self.name}', category_id={self.category_id})>"
\ No newline at end of file
+        return f"<Product(id={self.id}, name='{self.name}', category_id={self.category_id})>"
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime, Integer
+from ..database import Base
+
+class SchemaVersion(Base):
+    """Single-row marker of the applied schema; lets startup skip create_all when it is current."""
+    __tablename__ = 'schema_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+    applied_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<SchemaVersion(version={self.version}, applied_at='{self.applied_at}')>"
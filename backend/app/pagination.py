@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional, Tuple
+
+
+class ProductSort(str, Enum):
+    """Supported product orderings; every ordering is tie-broken by id."""
+
+    id = "id"
+    id_desc = "-id"
+    name = "name"
+    name_desc = "-name"
+    created_at = "created_at"
+    created_at_desc = "-created_at"
+
+    @property
+    def field(self) -> str:
+        return self.value.lstrip("-")
+
+    @property
+    def descending(self) -> bool:
+        return self.value.startswith("-")
+
+
+class CountStrategy(str, Enum):
+    """How `total` is computed for a page of products."""
+
+    exact = "exact"
+    estimated = "estimated"
+    none = "none"
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(sort: ProductSort, value: Any, last_id: int) -> str:
+    """Pack the last seen (sort value, id) pair into an opaque token."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort.value, value, last_id], separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: ProductSort) -> Tuple[Any, int]:
+    """Unpack a cursor; it must have been issued for the same sort order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, value, last_id = json.loads(base64.urlsafe_b64decode(padded).decode("utf-8"))
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursorError("Malformed cursor") from exc
+
+    if sort_value != sort.value:
+        raise InvalidCursorError("Cursor was issued for a different sort order")
+    if not isinstance(last_id, int):
+        raise InvalidCursorError("Malformed cursor")
+
+    if sort.field == "created_at" and value is not None:
+        try:
+            value = datetime.fromisoformat(value)
+        except (TypeError, ValueError) as exc:
+            raise InvalidCursorError("Malformed cursor") from exc
+    elif sort.field == "id":
+        value = last_id
+
+    return value, last_id
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Upper bound for an index-friendly `name >= prefix AND name < bound` range."""
+    if not prefix:
+        return None
+    return prefix + "\U0010ffff"
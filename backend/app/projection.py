@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional, Tuple
+
+
+class ProductField(str, Enum):
+    """Scalar product fields selectable with `fields=`; `id` is always returned."""
+
+    id = "id"
+    name = "name"
+    description = "description"
+    category_id = "category_id"
+    image_url = "image_url"
+    created_at = "created_at"
+
+
+class ProductInclude(str, Enum):
+    """Related objects that can be embedded with `include=`."""
+
+    category = "category"
+
+
+class InvalidProjectionError(ValueError):
+    pass
+
+
+def _split(value: str) -> list[str]:
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+@dataclass(frozen=True)
+class ProductProjection:
+    """Which product columns a listing selects; hashable, so it can be part of cache keys."""
+
+    fields: Tuple[ProductField, ...]
+    category: bool = False
+
+    @classmethod
+    def parse(cls, fields: Optional[str], include: Optional[str]) -> Optional["ProductProjection"]:
+        """Projection for the query parameters, or None for the full default representation.
+
+        Without `fields` every field and the category are returned, as before; `include`
+        matters only together with `fields`.
+        """
+        try:
+            included = {ProductInclude(name) for name in _split(include or "")}
+            if fields is None:
+                return None
+            selected = {ProductField(name) for name in _split(fields)}
+        except ValueError as exc:
+            raise InvalidProjectionError(
+                f"Unknown field; fields accepts {', '.join(field.value for field in ProductField)}, "
+                f"include accepts {', '.join(item.value for item in ProductInclude)}"
+            ) from exc
+        selected.add(ProductField.id)
+        # Порядок полей в ответе — как в объявлении ProductField (id первым), а не как в запросе
+        return cls(
+            fields=tuple(field for field in ProductField if field in selected),
+            category=ProductInclude.category in included,
+        )
+
+    @property
+    def key(self) -> Tuple[str, ...]:
+        return tuple(field.value for field in self.fields) + (("+category",) if self.category else ())
@@ -0,0 +1,314 @@
+"""Per-route SQL query budgets (N+1 guard).
+
+Every route declares how many statements one request may execute; the budget lands in
+the OpenAPI operation as `x-query-budget`::
+
+    @router.get("/{product_id}", ..., openapi_extra=query_budget(2))
+
+`python -m app.query_budget` builds a synthetic catalog in a temporary database, calls
+every route of the app with the scenarios below and exits non-zero when a route has no
+budget, has no scenario, or exceeds its budget; the offending SQL is printed. Because
+the catalog holds many rows per category, a per-row query shows up as a blown budget
+rather than as a slightly slower request. Streamed listings ("stream" scenarios) read
+one keyset batch per query, so they may also spend one query per stream_batch_size rows
+beyond the first batch.
+
+tests/test_query_budget.py runs the same check route by route under pytest, and
+tests/conftest.py exposes the counter as the `query_counter` fixture.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BUDGET_KEY = "x-query-budget"
+
+
+def query_budget(limit: int) -> Dict[str, int]:
+    """`openapi_extra` declaring the maximum number of SQL statements per request to a route."""
+    return {BUDGET_KEY: limit}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass
+class QueryCounter:
+    """Statements executed on the watched engines while the counter is active."""
+
+    statements: List[str] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def reset(self) -> None:
+        self.statements.clear()
+
+    def report(self) -> str:
+        return "\n".join(f"  {number}. {' '.join(sql.split())}" for number, sql in enumerate(self.statements, 1))
+
+    def assert_at_most(self, limit: int, label: str = "block") -> None:
+        if self.count > limit:
+            raise QueryBudgetExceeded(f"{label}: {self.count} queries, budget {limit}\n{self.report()}")
+
+
+@contextmanager
+def count_queries(*engines: Engine) -> Iterator[QueryCounter]:
+    """Record every statement executed on `engines` (default: all app engines) inside the block."""
+    if not engines:
+        engines = _app_engines()
+    counter = QueryCounter()
+
+    def before_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        counter.statements.append(statement)
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _app_engines() -> Tuple[Engine, ...]:
+    from . import database
+
+    engines = (
+        database.engine,
+        database.read_engine,
+        database.async_engine.sync_engine,
+        database.async_read_engine.sync_engine,
+    )
+    return tuple({id(engine): engine for engine in engines}.values())
+
+
+# Сценарии проверки: (method, path template) -> запросы; пути подставляются из синтетического каталога
+Scenario = Dict[str, Any]
+
+SCENARIOS: Dict[Tuple[str, str], List[Scenario]] = {
+    ("GET", "/"): [{}],
+    ("GET", "/health"): [{}],
+    ("GET", "/api/products"): [
+        {"params": {"limit": 200}},
+        {"params": {"limit": 200, "sort": "-created_at", "count": "exact"}},
+        {"params": {"limit": 200, "name_prefix": "Печь", "category_id": 1}},
+        {"params": {"stream": "true"}, "stream": True},
+    ],
+    ("GET", "/api/products/sparse"): [
+        {"params": {"limit": 200, "fields": "name", "sort": "name"}},
+        {"params": {"limit": 200, "fields": "name,image_url", "include": "category", "count": "exact"}},
+    ],
+    ("GET", "/api/products/batch"): [{"params": {"ids": ",".join(str(n) for n in range(200, 0, -1)) + ",999999"}}],
+    ("POST", "/api/products/batch"): [{"json": {"ids": list(range(1, 501))}}],
+    ("GET", "/api/products/search"): [{"params": {"q": "печь", "limit": 200}}],
+    ("GET", "/api/products/{product_id}"): [{"path": {"product_id": 1}}],
+    ("GET", "/api/products/category/{category_id}"): [
+        {"path": {"category_id": 1}, "params": {"limit": 200}},
+        {"path": {"category_id": 1}, "headers": {"accept": "application/x-ndjson"}, "stream": True},
+    ],
+    ("GET", "/api/products/category/{category_id}/sparse"): [
+        {"path": {"category_id": 1}, "params": {"limit": 200, "fields": "name,created_at", "sort": "-created_at"}},
+    ],
+    ("GET", "/api/catalog/changes"): [{"params": {"since": 0, "limit": 500}}],
+    ("GET", "/api/events"): [{"headers": {"Last-Event-ID": "1"}}],
+    ("GET", "/api/categories"): [{}],
+    ("GET", "/api/categories/{category_id}"): [{"path": {"category_id": 1}}],
+    ("GET", "/api/cart"): [{"cart": True}],
+    ("POST", "/api/cart/add"): [{"json": {"product_id": 2, "review": 1}, "cart": True}],
+    ("PUT", "/api/cart/update"): [{"json": {"product_id": 1, "review": 5}, "cart": True}],
+    ("DELETE", "/api/cart/remove/{product_id}"): [{"path": {"product_id": 1}, "cart": True}],
+    ("POST", "/api/cart/batch"): [{
+        "json": {"operations": [{"op": "add", "product_id": product_id, "review": 1} for product_id in range(1, 101)]},
+        "cart": True,
+    }],
+    ("POST", "/api/admin/import"): [{
+        "content": "".join(f'{{"name": "Импорт {n}", "category": "chernaya"}}\n' for n in range(500)),
+        "headers": {"content-type": "application/x-ndjson"},
+        "admin": True,
+    }],
+}
+
+# Повторный seed() на заполненной базе: чтение schema_version, предзагрузка категорий и товаров,
+# отметка версии каталога
+SEED_BUDGET = 4
+SYNTHETIC_PRODUCTS_PER_CATEGORY = 300
+ADMIN_TOKEN = "query-budget"
+
+
+def _synthetic_catalog(products_per_category: int) -> None:
+    from sqlalchemy import insert, select
+
+    from .database import engine
+    from .models.category import Category
+    from .models.product import Product
+    from .repositories.catalog_changes import ChangeLogRepository
+    from .repositories.catalog_state import CatalogStateRepository
+    from .schemas.catalog import ChangeEntity
+    from .seed_data import seed
+
+    seed()
+    with engine.begin() as connection:
+        category_ids = connection.execute(select(Category.id)).scalars().all()
+        connection.execute(insert(Product), [
+            {
+                "name": f"Печь {category_id}-{number:05d}",
+                "description": "Синтетический товар для проверки бюджета запросов",
+                "category_id": category_id,
+                "image_url": "/static/images/img_bf.jpg",
+            }
+            for category_id in category_ids
+            for number in range(products_per_category)
+        ])
+        CatalogStateRepository(connection).bump()
+        # Журнал изменений: страница /api/catalog/changes подтягивает и товары, и категории
+        ChangeLogRepository(connection).record_matching(
+            ChangeEntity.product, Product.id, Product.category_id.in_(category_ids)
+        )
+
+
+def _budgets(app: Any) -> Dict[Tuple[str, str], Optional[int]]:
+    # Берём маршруты из OpenAPI-схемы: там все роуты приложения вместе с объявленными бюджетами
+    return {
+        (method.upper(), path): operation.get(BUDGET_KEY)
+        for path, operations in app.openapi()["paths"].items()
+        for method, operation in operations.items()
+    }
+
+
+def _streamed_rows(response: Any) -> int:
+    if response.headers.get("content-type", "").startswith("application/x-ndjson"):
+        return len(response.text.splitlines())
+    return len(response.json()["products"])
+
+
+@dataclass
+class BudgetRun:
+    """An app client over a synthetic catalog, ready to check routes one by one."""
+
+    client: Any
+    budgets: Dict[Tuple[str, str], Optional[int]]
+    cart_token: str
+    admin_token: str
+    seed_failures: List[str]
+
+    def check_route(self, method: str, path: str) -> List[str]:
+        """Run every scenario of a route; returns its failures (empty when within budget)."""
+        from .config import settings
+
+        budget = self.budgets[(method, path)]
+        scenarios = SCENARIOS.get((method, path))
+        if budget is None:
+            return [f"{method} {path}: no openapi_extra=query_budget(...) declared"]
+        if not scenarios:
+            return [f"{method} {path}: no scenario in app.query_budget.SCENARIOS"]
+
+        failures: List[str] = []
+        for scenario in scenarios:
+            headers = dict(scenario.get("headers", {}))
+            if scenario.get("cart"):
+                headers["X-Cart-Token"] = self.cart_token
+            if scenario.get("admin"):
+                headers["X-Admin-Token"] = self.admin_token
+            url = path.format(**scenario.get("path", {}))
+
+            with count_queries() as counter:
+                response = self.client.request(
+                    method, url,
+                    params=scenario.get("params"), json=scenario.get("json"),
+                    content=scenario.get("content"), headers=headers,
+                )
+            label = f"{method} {url} {scenario.get('params') or ''}".rstrip()
+            allowed = budget
+            if scenario.get("stream") and response.status_code < 400:
+                # Поток читает пачками по stream_batch_size в коротких сессиях: каждая пачка сверх первой — запрос
+                allowed += _streamed_rows(response) // settings.stream_batch_size
+            if response.status_code >= 400:
+                failures.append(f"{label}: HTTP {response.status_code} {response.text[:200]}")
+            elif counter.count > allowed:
+                failures.append(f"{label}: {counter.count} queries, budget {allowed}\n{counter.report()}")
+            else:
+                print(f"ok   {counter.count:>3}/{allowed:<3} {label}")
+        return failures
+
+
+@contextmanager
+def budget_run(products_per_category: int = SYNTHETIC_PRODUCTS_PER_CATEGORY) -> Iterator[BudgetRun]:
+    """Start the app with the catalog cache off and fill the database with a synthetic catalog."""
+    from fastapi.testclient import TestClient
+
+    from .cache import NullCache, get_catalog_cache, set_catalog_cache
+    from .config import settings
+    from .events import get_event_hub
+    from .main import app
+    from .seed_data import seed
+
+    previous_cache = get_catalog_cache()
+    set_catalog_cache(NullCache())  # кэш скрыл бы лишние запросы
+    try:
+        with TestClient(app) as client:
+            # Фоновый опрос журнала SSE-хабом попадал бы в счётчик чужих запросов; без него
+            # GET /api/events отдаёт replay по Last-Event-ID и сразу закрывается
+            client.portal.call(get_event_hub().stop)
+            _synthetic_catalog(products_per_category)
+            with count_queries() as counter:
+                seed()
+            seed_failures = []
+            if counter.count > SEED_BUDGET:
+                seed_failures.append(f"seed(): {counter.count} queries, budget {SEED_BUDGET}\n{counter.report()}")
+
+            cart_token = client.post("/api/cart/add", json={"product_id": 1, "review": 1}).headers["X-Cart-Token"]
+            yield BudgetRun(
+                client=client,
+                budgets=_budgets(app),
+                cart_token=cart_token,
+                admin_token=settings.admin_token or "",
+                seed_failures=seed_failures,
+            )
+    finally:
+        set_catalog_cache(previous_cache)
+
+
+def check(products_per_category: int = SYNTHETIC_PRODUCTS_PER_CATEGORY) -> List[str]:
+    """Exercise every route against a synthetic catalog; returns the list of failures."""
+    with budget_run(products_per_category) as run:
+        failures = list(run.seed_failures)
+        for method, path in sorted(run.budgets):
+            failures.extend(run.check_route(method, path))
+    return failures
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check per-route SQL query budgets against a synthetic catalog.")
+    parser.add_argument("--products-per-category", type=int, default=SYNTHETIC_PRODUCTS_PER_CATEGORY)
+    parser.add_argument("--cart-backend", choices=("memory", "sqlite"), default="sqlite")
+    args = parser.parse_args(argv)
+
+    if "app.config" in sys.modules:
+        parser.error("must run before app.config is imported (settings are read at import time)")
+
+    workdir = tempfile.mkdtemp(prefix="query-budget-")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{workdir}/budget.db",
+        "CART_BACKEND": args.cart_backend,
+        "ADMIN_TOKEN": ADMIN_TOKEN,
+        "CACHE_ENABLED": "false",
+    })
+    failures = check(args.products_per_category)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
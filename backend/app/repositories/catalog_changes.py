@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Tuple, Union
+from sqlalchemy import delete, exists, func, insert, literal, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Row
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql.elements import ColumnElement
+from ..models.catalog_change import CatalogChange, CatalogChangeLogState
+from ..models.category import Category
+from ..schemas.catalog import ChangeEntity, ChangeOp
+
+STATE_ID = 1
+# Служебная запись reset(): только занимает номер в журнале и сразу удаляется
+_RESET_MARKER = {"entity": "catalog", "entity_id": 0, "op": "reset"}
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+class ChangeLogRepository:
+    """Catalog change log; like CatalogStateRepository it works on a Session or a Core Connection.
+
+    Writers append inside their own transaction and the caller commits, so an entry is
+    visible exactly when the change is. SQLite has a single writer, hence entries become
+    visible in seq order and a reader never skips over a not yet committed one.
+    """
+
+    def __init__(self, db: Union[Session, Connection]):
+        self.db = db
+
+    def record(self, entity: ChangeEntity, entity_ids: Iterable[int], op: ChangeOp = ChangeOp.upsert) -> None:
+        now = _now()
+        rows = [{"entity": entity.value, "entity_id": entity_id, "op": op.value, "changed_at": now} for entity_id in entity_ids]
+        if rows:
+            self.db.execute(insert(CatalogChange), rows)
+
+    def record_matching(
+        self,
+        entity: ChangeEntity,
+        id_column: ColumnElement,
+        condition: ColumnElement,
+        op: ChangeOp = ChangeOp.upsert,
+    ) -> None:
+        """Log every row matching `condition` with one INSERT ... SELECT (bulk upserts do not return ids)."""
+        rows = select(
+            literal(entity.value), id_column, literal(op.value), literal(_now())
+        ).where(condition)
+        self.db.execute(
+            insert(CatalogChange).from_select(["entity", "entity_id", "op", "changed_at"], rows)
+        )
+
+    def bounds(self) -> Tuple[int, int]:
+        """(trimmed_through, head): a client with `since` below the first must resync; head is the last seq."""
+        floor, last = self.db.execute(select(
+            select(CatalogChangeLogState.trimmed_through)
+            .where(CatalogChangeLogState.id == STATE_ID)
+            .scalar_subquery(),
+            select(func.max(CatalogChange.seq)).scalar_subquery(),
+        )).one()
+        floor = floor or 0
+        return floor, max(floor, last or 0)
+
+    def read(self, since: int, limit: int) -> List[Row]:
+        return self.db.execute(
+            select(CatalogChange.seq, CatalogChange.entity, CatalogChange.entity_id, CatalogChange.op, CatalogChange.changed_at)
+            .where(CatalogChange.seq > since)
+            .order_by(CatalogChange.seq)
+            .limit(limit)
+        ).all()
+
+    def compact(self, keep: int, max_age: timedelta) -> Tuple[int, int]:
+        """Drop superseded entries, then trim to `keep` entries not older than `max_age`.
+
+        Returns (superseded, trimmed). Superseded entries can go without a trace: a
+        client past them still receives the later entry of the same entity. Trimming
+        moves trimmed_through, and clients behind it are told to resync.
+        """
+        later = aliased(CatalogChange)
+        superseded = self.db.execute(delete(CatalogChange).where(exists().where(
+            later.entity == CatalogChange.entity,
+            later.entity_id == CatalogChange.entity_id,
+            later.seq > CatalogChange.seq,
+        ))).rowcount
+
+        by_age = self.db.execute(
+            select(func.max(CatalogChange.seq)).where(CatalogChange.changed_at < _now() - max_age)
+        ).scalar()
+        by_count = self.db.execute(
+            select(CatalogChange.seq).order_by(CatalogChange.seq.desc()).offset(keep).limit(1)
+        ).scalar()
+        cutoff = max(by_age or 0, by_count or 0)
+        trimmed = 0
+        if cutoff:
+            trimmed = self.db.execute(delete(CatalogChange).where(CatalogChange.seq <= cutoff)).rowcount
+            self._set_floor(cutoff)
+        return superseded, trimmed
+
+    def reset(self) -> int:
+        """Empty the log after a bulk load that was not logged row by row; every client resyncs."""
+        seq = self.db.execute(insert(CatalogChange).values(changed_at=_now(), **_RESET_MARKER)).inserted_primary_key[0]
+        self.db.execute(delete(CatalogChange).where(CatalogChange.seq <= seq))
+        self._set_floor(seq)
+        return seq
+
+    def start(self) -> bool:
+        """Reset an untracked log over an existing catalog (created before the log); True if it did."""
+        tracked = self.db.execute(select(CatalogChangeLogState.id).where(CatalogChangeLogState.id == STATE_ID)).first()
+        if tracked is not None or self.db.execute(select(Category.id).limit(1)).first() is None:
+            return False
+        self.reset()
+        return True
+
+    def _set_floor(self, seq: int) -> None:
+        statement = sqlite_insert(CatalogChangeLogState).values(id=STATE_ID, trimmed_through=seq)
+        self.db.execute(statement.on_conflict_do_update(
+            index_elements=[CatalogChangeLogState.id],
+            set_={"trimmed_through": func.max(CatalogChangeLogState.trimmed_through, statement.excluded.trimmed_through)},
+        ))
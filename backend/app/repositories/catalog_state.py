@@ -0,0 +1,34 @@
+from datetime import datetime, timezone
+from typing import Union
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from ..models.catalog_state import CatalogState
+from ..schemas.catalog import CatalogVersion
+
+STATE_ID = 1
+
+class CatalogStateRepository:
+    """Works on an ORM Session as well as on a Core Connection (bulk import paths)."""
+
+    def __init__(self, db: Union[Session, Connection]):
+        self.db = db
+
+    def get(self) -> CatalogVersion:
+        row = self.db.execute(
+            select(CatalogState.version, CatalogState.updated_at).where(CatalogState.id == STATE_ID)
+        ).first()
+        if row is None:
+            return CatalogVersion(version=0, updated_at=None)
+        return CatalogVersion(version=row.version, updated_at=row.updated_at)
+
+    def bump(self) -> None:
+        """Advance the stamp inside the caller's transaction; the caller commits."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        result = self.db.execute(
+            update(CatalogState)
+            .where(CatalogState.id == STATE_ID)
+            .values(version=CatalogState.version + 1, updated_at=now)
+        )
+        if not result.rowcount:
+            self.db.execute(insert(CatalogState).values(id=STATE_ID, version=1, updated_at=now))
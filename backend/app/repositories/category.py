@@ -1,24 +1,59 @@
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from ..models.category import Category
+from .catalog_changes import ChangeLogRepository
+from .catalog_state import CatalogStateRepository
+from ..schemas.catalog import ChangeEntity
 from ..schemas.category import CategoryCreate
 
+_ALL = select(Category)
+_ALL_ROWS = select(Category.name, Category.slug, Category.id)
+
 class CategoryRepository:
     def __init__(self, db: Session):
         self.db = db
-    
+
     def get_all(self) -> List[Category]:
-        return self.db.query(Category).all()
-    
+        return list(self.db.execute(_ALL).scalars().all())
+
+    def get_all_rows(self) -> List[Row]:
+        return list(self.db.execute(_ALL_ROWS).all())
+
     def get_by_id(self, category_id: int) -> Optional[Category]:
-        return self.db.query(Category).filter(Category.id == category_id).first()
-    
+        return self.db.execute(select(Category).where(Category.id == category_id).limit(1)).scalars().first()
+
+    def get_multiple_by_ids(self, category_ids: List[int]) -> List[Category]:
+        if not category_ids:
+            return []
+        return list(self.db.execute(select(Category).where(Category.id.in_(category_ids))).scalars().all())
+
     def get_by_slug(self, slug: str) -> Optional[Category]:
-        return self.db.query(Category).filter(Category.slug == slug).first()
-    
+        return self.db.execute(select(Category).where(Category.slug == slug).limit(1)).scalars().first()
+
     def create(self, category_data: CategoryCreate) -> Category:
         db_category = Category(**category_data.model_dump())
         self.db.add(db_category)
+        self.db.flush()  # id нужен журналу изменений
+        CatalogStateRepository(self.db).bump()
+        ChangeLogRepository(self.db).record(ChangeEntity.category, [db_category.id])
         self.db.commit()
         self.db.refresh(db_category)
-        return db_category
\ No newline at end of file
+        return db_category
+
+class AsyncCategoryRepository:
+    """Read side of CategoryRepository for db_mode=async."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_all(self) -> List[Category]:
+        return list((await self.db.execute(_ALL)).scalars().all())
+
+    async def get_all_rows(self) -> List[Row]:
+        return list((await self.db.execute(_ALL_ROWS)).all())
+
+    async def get_by_id(self, category_id: int) -> Optional[Category]:
+        return (await self.db.execute(select(Category).where(Category.id == category_id).limit(1))).scalars().first()
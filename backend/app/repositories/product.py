@@ -1,42 +1,289 @@
+from datetime import datetime
+from sqlalchemy import Select, String, TextClause, func, or_, select, text, tuple_, type_coerce
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
-from ..models.product import Product
+from typing import Any, Iterable, List, Optional, Set, Tuple
+from ..models.category import Category
+from ..models.product import CREATED_AT_FORMAT, Product
+from ..pagination import ProductSort, prefix_upper_bound
+from ..projection import ProductProjection
+from ..search import BM25_WEIGHTS, FTS_TABLE, build_match_expression, index_transliterations, search_index_ready
+from .catalog_changes import ChangeLogRepository
+from .catalog_state import CatalogStateRepository
+from ..schemas.catalog import ChangeEntity
 from ..schemas.product import ProductCreate
 
+# Колонки быстрого пути чтения: кортежи вместо ORM-объектов (без identity map и ленивых связей)
+ROW_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.description,
+    Product.category_id,
+    Product.image_url,
+    Product.created_at,
+    Category.name.label("category_name"),
+    Category.slug.label("category_slug"),
+)
+
+def projection_columns(projection: ProductProjection, sort: ProductSort) -> tuple:
+    """Columns for a sparse listing: the requested fields plus what paging and the category need."""
+    names = [field.value for field in projection.fields]
+    # Поле сортировки нужно курсору, category_id — вложенной категории, даже если их не просили
+    for name in (sort.field, "category_id") if projection.category else (sort.field,):
+        if name not in names:
+            names.append(name)
+    columns = tuple(getattr(Product, name) for name in names)
+    if projection.category:
+        columns += (Category.name.label("category_name"), Category.slug.label("category_slug"))
+    return columns
+
+def _filtered(statement: Select, category_id: Optional[int], name_prefix: Optional[str]) -> Select:
+    if category_id is not None:
+        statement = statement.where(Product.category_id == category_id)
+    if name_prefix:
+        statement = statement.where(Product.name >= name_prefix, Product.name < prefix_upper_bound(name_prefix))
+    return statement
+
+def _page_statement(
+    sort: ProductSort,
+    after: Optional[Tuple[Any, int]],
+    category_id: Optional[int],
+    name_prefix: Optional[str],
+    columns: Optional[tuple] = None,
+    join_category: bool = True,
+) -> Select:
+    column = getattr(Product, sort.field)
+    if columns is not None:
+        statement = select(*columns)
+        if join_category:
+            statement = statement.join(Category, Category.id == Product.category_id)
+    else:
+        statement = select(Product).options(joinedload(Product.category))
+    statement = _filtered(statement, category_id, name_prefix)
+
+    if after is not None:
+        value, last_id = after
+        if isinstance(value, datetime):
+            # SQLite хранит DateTime строкой: сравниваем в точности в том виде, в каком она записана
+            column = type_coerce(column, String)
+            value = value.strftime(CREATED_AT_FORMAT)
+        if sort.field == "id":
+            position = Product.id < last_id if sort.descending else Product.id > last_id
+        else:
+            key = tuple_(column, Product.id)
+            position = key < tuple_(value, last_id) if sort.descending else key > tuple_(value, last_id)
+        statement = statement.where(position)
+
+    if sort.field == "id":
+        order_by = (Product.id.desc(),) if sort.descending else (Product.id.asc(),)
+    elif sort.descending:
+        order_by = (column.desc(), Product.id.desc())
+    else:
+        order_by = (column.asc(), Product.id.asc())
+
+    return statement.order_by(*order_by)
+
+def _count_statement(category_id: Optional[int], name_prefix: Optional[str], cap: Optional[int]) -> Select:
+    matching = _filtered(select(Product.id), category_id, name_prefix)
+    if cap is not None:
+        matching = matching.limit(cap)
+    return select(func.count()).select_from(matching.subquery())
+
+def _by_ids_statement(product_ids: Iterable[int]) -> Select:
+    return select(Product).options(joinedload(Product.category)).where(Product.id.in_(product_ids))
+
+def _fts_statement(tokens: List[str], limit: int, offset: int) -> TextClause:
+    return text(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match "
+        f"ORDER BY bm25({FTS_TABLE}, {BM25_WEIGHTS}) LIMIT :limit OFFSET :offset"
+    ).bindparams(match=build_match_expression(tokens), limit=limit, offset=offset)
+
+def _like_statement(tokens: List[str], limit: int, offset: int) -> Select:
+    # translit() приводит обе стороны к латинице в нижнем регистре, SQLite lower() кириллицу не понимает
+    statement = select(Product).options(joinedload(Product.category))
+    for token in tokens:
+        pattern = "%" + token.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        statement = statement.where(or_(
+            func.translit(Product.name).like(func.translit(pattern), escape="\\"),
+            func.translit(func.coalesce(Product.description, "")).like(func.translit(pattern), escape="\\"),
+        ))
+    return statement.order_by(Product.id).limit(limit).offset(offset)
+
+def _in_id_order(product_ids: List[int], products: Iterable[Product]) -> List[Product]:
+    by_id = {product.id: product for product in products}
+    return [by_id[product_id] for product_id in product_ids if product_id in by_id]
+
 class ProductRepository:
+    """Sync repository; the statements are shared with AsyncProductRepository."""
+
     def __init__(self, db: Session):
         self.db = db
-        
-    def get_all(self) -> List[Product]:
-        return self.db.query(Product).options(joinedload(Product.category)).all()
+
+    def get_page(
+        self,
+        limit: int,
+        sort: ProductSort = ProductSort.id,
+        after: Optional[Tuple[Any, int]] = None,
+        category_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+    ) -> List[Product]:
+        """Return up to `limit` products strictly after the `(sort value, id)` keyset position."""
+        statement = _page_statement(sort, after, category_id, name_prefix).limit(limit)
+        return list(self.db.execute(statement).scalars().all())
+
+    def get_page_rows(
+        self,
+        limit: int,
+        sort: ProductSort = ProductSort.id,
+        after: Optional[Tuple[Any, int]] = None,
+        category_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+    ) -> List[Row]:
+        """Same page as get_page() but as plain ROW_COLUMNS tuples."""
+        statement = _page_statement(sort, after, category_id, name_prefix, columns=ROW_COLUMNS).limit(limit)
+        return list(self.db.execute(statement).all())
+
+    def get_page_projection(
+        self,
+        limit: int,
+        projection: ProductProjection,
+        sort: ProductSort = ProductSort.id,
+        after: Optional[Tuple[Any, int]] = None,
+        category_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+    ) -> List[Row]:
+        """Same page selecting only projection_columns(); categories are joined only when embedded."""
+        statement = _page_statement(
+            sort, after, category_id, name_prefix,
+            columns=projection_columns(projection, sort), join_category=projection.category,
+        ).limit(limit)
+        return list(self.db.execute(statement).all())
+
+    def count(
+        self,
+        category_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+        cap: Optional[int] = None,
+    ) -> int:
+        """Count matching products; with `cap` the scan stops after `cap` rows."""
+        return self.db.execute(_count_statement(category_id, name_prefix, cap)).scalar()
+
+    def estimate_total(self) -> int:
+        """O(log n) estimate of the table size: the highest id handed out so far."""
+        return self.db.execute(select(func.max(Product.id))).scalar() or 0
     
     def get_by_id(self, product_id: int) -> Optional[Product]:
-        return (
-            self.db.query(Product)
-            .options(joinedload(Product.category))
-            .filter(Product.id == product_id)
-            .first()
-        )
-
-    def get_by_category(self, category_id: int) -> List[Product]:
-        return (
-            self.db.query(Product)
-            .options(joinedload(Product.category))
-            .filter(Product.category_id == category_id)
-            .all()
-        )
+        return self.db.execute(_by_ids_statement([product_id]).limit(1)).scalars().first()
+
+    def search(self, tokens: List[str], limit: int, offset: int = 0) -> List[Product]:
+        """Full-text search ranked by BM25; falls back to a LIKE scan when FTS5 is unavailable."""
+        if not search_index_ready(self.db.connection()):
+            return list(self.db.execute(_like_statement(tokens, limit, offset)).scalars().all())
+
+        product_ids = list(self.db.execute(_fts_statement(tokens, limit, offset)).scalars().all())
+        return _in_id_order(product_ids, self.get_multiple_by_ids(product_ids))
+
+    def get_by_category(
+        self,
+        category_id: int,
+        limit: int,
+        sort: ProductSort = ProductSort.id,
+        after: Optional[Tuple[Any, int]] = None,
+        name_prefix: Optional[str] = None,
+    ) -> List[Product]:
+        return self.get_page(limit, sort=sort, after=after, category_id=category_id, name_prefix=name_prefix)
         
     def  create(self, product_data: ProductCreate) -> Product:
         db_product = Product(**product_data.model_dump())
         self.db.add(db_product)
-        self.db.commit()
+        try:
+            self.db.flush()  # id нужен журналу изменений
+            index_transliterations(self.db, Product.id == db_product.id)
+            CatalogStateRepository(self.db).bump()
+            ChangeLogRepository(self.db).record(ChangeEntity.product, [db_product.id])
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            raise
         self.db.refresh(db_product)
         return db_product
     
     def get_multiple_by_ids(self, product_ids: List[int]) -> List[Product]:
-        return (
-            self.db.query(Product)
-            .options(joinedload(Product.category))
-            .filter(Product.id.in_(product_ids))
-            .all()
-        )
\ No newline at end of file
+        return list(self.db.execute(_by_ids_statement(product_ids)).scalars().all())
+
+    def get_existing_ids(self, product_ids: Iterable[int]) -> Set[int]:
+        """Which of `product_ids` exist, reading only the primary key index."""
+        product_ids = set(product_ids)
+        if not product_ids:
+            return set()
+        return set(self.db.execute(select(Product.id).where(Product.id.in_(product_ids))).scalars())
+
+class AsyncProductRepository:
+    """Read side of ProductRepository for db_mode=async: the same statements awaited on an AsyncSession."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_page(
+        self,
+        limit: int,
+        sort: ProductSort = ProductSort.id,
+        after: Optional[Tuple[Any, int]] = None,
+        category_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+    ) -> List[Product]:
+        statement = _page_statement(sort, after, category_id, name_prefix).limit(limit)
+        return list((await self.db.execute(statement)).scalars().all())
+
+    async def get_page_rows(
+        self,
+        limit: int,
+        sort: ProductSort = ProductSort.id,
+        after: Optional[Tuple[Any, int]] = None,
+        category_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+    ) -> List[Row]:
+        statement = _page_statement(sort, after, category_id, name_prefix, columns=ROW_COLUMNS).limit(limit)
+        return list((await self.db.execute(statement)).all())
+
+    async def get_page_projection(
+        self,
+        limit: int,
+        projection: ProductProjection,
+        sort: ProductSort = ProductSort.id,
+        after: Optional[Tuple[Any, int]] = None,
+        category_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+    ) -> List[Row]:
+        statement = _page_statement(
+            sort, after, category_id, name_prefix,
+            columns=projection_columns(projection, sort), join_category=projection.category,
+        ).limit(limit)
+        return list((await self.db.execute(statement)).all())
+
+    async def count(
+        self,
+        category_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+        cap: Optional[int] = None,
+    ) -> int:
+        return (await self.db.execute(_count_statement(category_id, name_prefix, cap))).scalar()
+
+    async def estimate_total(self) -> int:
+        return (await self.db.execute(select(func.max(Product.id)))).scalar() or 0
+
+    async def get_by_id(self, product_id: int) -> Optional[Product]:
+        return (await self.db.execute(_by_ids_statement([product_id]).limit(1))).scalars().first()
+
+    async def search(self, tokens: List[str], limit: int, offset: int = 0) -> List[Product]:
+        connection = await self.db.connection()
+        if not await connection.run_sync(search_index_ready):
+            return list((await self.db.execute(_like_statement(tokens, limit, offset))).scalars().all())
+
+        product_ids = list((await self.db.execute(_fts_statement(tokens, limit, offset))).scalars().all())
+        return _in_id_order(product_ids, await self.get_multiple_by_ids(product_ids))
+
+    async def get_multiple_by_ids(self, product_ids: List[int]) -> List[Product]:
+        return list((await self.db.execute(_by_ids_statement(product_ids))).scalars().all())
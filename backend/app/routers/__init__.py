@@ -1,5 +1,8 @@
 from .products import router as products_router
 from .categories import router as categories_router
 from .cart import router as cart_router
+from .admin import router as admin_router
+from .catalog import router as catalog_router
+from .events import router as events_router
 
-__all__ = ["products_router", "categories_router", "cart_router"]
\ No newline at end of file
+__all__ = ["products_router", "categories_router", "cart_router", "admin_router", "catalog_router", "events_router"]
\ No newline at end of file
@@ -0,0 +1,77 @@
+import hmac
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from starlette.concurrency import run_in_threadpool
+
+from ..catalog_import import FORMATS, detect_format, import_file
+from ..query_budget import query_budget
+from ..config import settings
+from ..schemas.catalog_import import ImportReport
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not settings.admin_token:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Admin API is disabled"
+        )
+    # Сравнение за постоянное время: по задержке ответа токен не подобрать посимвольно
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), settings.admin_token.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin token"
+        )
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"Import body exceeds {settings.import_max_bytes} bytes"
+    )
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin_token)],
+)
+
+# Бюджет на чанк сценария: категории, upsert, транслитерация для поиска (SELECT + UPDATE), версия, журнал
+@router.post("/import", response_model=ImportReport, status_code=status.HTTP_200_OK, openapi_extra=query_budget(6))
+async def import_catalog(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(" + "|".join(FORMATS) + ")$"),
+    chunk_size: Optional[int] = Query(None, ge=1, le=50_000),
+):
+    """Import a CSV or NDJSON catalog sent as the raw request body.
+
+    The body is spooled to a temporary file chunk by chunk and then imported
+    off the event loop, so memory use does not depend on the upload size.
+    Bodies over import_max_bytes are refused with 413.
+    """
+    try:
+        fmt = format or detect_format("", request.headers.get("content-type"))
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(exc)
+        )
+
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > settings.import_max_bytes:
+        raise _too_large()
+
+    fd, tmp_name = tempfile.mkstemp(suffix=f".{fmt}")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            received = 0
+            # Content-Length может отсутствовать (chunked) или врать: считаем фактически принятые байты
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > settings.import_max_bytes:
+                    raise _too_large()
+                tmp.write(chunk)
+        return await run_in_threadpool(import_file, Path(tmp_name), fmt, chunk_size)
+    finally:
+        os.unlink(tmp_name)
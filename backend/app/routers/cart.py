@@ -1,50 +1,77 @@
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
-from typing import Dict
-from ..database import get_db
+from fastapi import APIRouter, Depends, Header, Response, status
+from typing import Optional
 from ..services.cart import CartService
-from ..schemas.cart import CartItemCreate, CartItemUpdate, CartResponse
-from pydantic import BaseModel
+from ..query_budget import query_budget
+from ..services.runner import ThreadpoolServiceRunner, service_dependency
+from ..schemas.cart import CartItemCreate, CartItemUpdate, CartResponse, CartChangeResponse, CartBatchRequest
+from pydantic import BaseModel, Field
+
+CART_TOKEN_HEADER = "X-Cart-Token"
 
 router = APIRouter(
     prefix="/api/cart",
     tags=["Cart"]
 )
 
+# Корзины пишут в carts/cart_items (cart_backend=sqlite), поэтому все их роуты идут через писателя
+get_cart_service = service_dependency(CartService, write=True)
+
+# Те же ограничения, что у CartItemCreate/CartItemUpdate и у операций пакета: иначе 0 попадал
+# в корзину, а отрицательное значение роняло сборку CartItemCreate в обработчике с 500
 class AddToCartRequest(BaseModel):
     product_id: int
-    review: int
-    cart: Dict[int,int] = {}
+    review: int = Field(..., ge=1)
     
 class UpdateCartRequest(BaseModel):
     product_id: int
-    review: int
-    cart: Dict[int,int] = {}
-    
-class RemoveFromCartRequest(BaseModel):
-    cart: Dict[int,int] = {}
+    review: int = Field(..., ge=1)
 
-@router.get("", response_model=CartResponse, status_code=status.HTTP_200_OK)
-def get_cart(cart_data: Dict[int,int], db: Session = Depends(get_db)):
-    service = CartService(db)
-    return service.get_cart_details(cart_data)
+@router.get("", response_model=CartResponse, status_code=status.HTTP_200_OK, openapi_extra=query_budget(2))
+async def get_cart(x_cart_token: Optional[str] = Header(None), service: ThreadpoolServiceRunner[CartService] = Depends(get_cart_service)):
+    return await service.call(CartService.get_cart_details, x_cart_token)
 
-@router.post("/add", status_code=status.HTTP_201_CREATED)
-def add_to_cart(request: AddToCartRequest, db: Session = Depends(get_db)):
-    services = CartService(db)
+@router.post("/add", response_model=CartChangeResponse, status_code=status.HTTP_201_CREATED, openapi_extra=query_budget(5))
+async def add_to_cart(
+    request: AddToCartRequest,
+    response: Response,
+    x_cart_token: Optional[str] = Header(None),
+    services: ThreadpoolServiceRunner[CartService] = Depends(get_cart_service),
+):
     item = CartItemCreate(product_id=request.product_id, review=request.review)
-    updated_cart = services.add_to_cart(request.cart, item)
-    return {"cart": updated_cart}
+    change = await services.call(CartService.add_to_cart, x_cart_token, item)
+    response.headers[CART_TOKEN_HEADER] = change.token
+    return change
 
-@router.put("/update", status_code=status.HTTP_200_OK)
-def update_cart_item(request: UpdateCartRequest, db: Session = Depends(get_db)):
-    services = CartService(db)
+@router.put("/update", response_model=CartChangeResponse, status_code=status.HTTP_200_OK, openapi_extra=query_budget(4))
+async def update_cart_item(
+    request: UpdateCartRequest,
+    response: Response,
+    x_cart_token: Optional[str] = Header(None),
+    services: ThreadpoolServiceRunner[CartService] = Depends(get_cart_service),
+):
     item = CartItemUpdate(product_id=request.product_id, review=request.review)
-    updated_cart = services.update_cart(request.cart, item)
-    return {"cart": updated_cart}
-
-@router.delete("/remove/{product_id}", status_code=status.HTTP_200_OK)
-def remove_from_cart(product_id: int, request: RemoveFromCartRequest, db: Session = Depends(get_db)):
-    service = CartService(db)
-    update_cart = service.remove_from_cart(request.cart, product_id)
-    return {"cart": update_cart}
\ No newline at end of file
+    change = await services.call(CartService.update_cart, x_cart_token, item)
+    response.headers[CART_TOKEN_HEADER] = change.token
+    return change
+
+@router.delete("/remove/{product_id}", response_model=CartChangeResponse, status_code=status.HTTP_200_OK, openapi_extra=query_budget(4))
+async def remove_from_cart(
+    product_id: int,
+    response: Response,
+    x_cart_token: Optional[str] = Header(None),
+    service: ThreadpoolServiceRunner[CartService] = Depends(get_cart_service),
+):
+    change = await service.call(CartService.remove_from_cart, x_cart_token, product_id)
+    response.headers[CART_TOKEN_HEADER] = change.token
+    return change
+
+@router.post("/batch", response_model=CartResponse, status_code=status.HTTP_200_OK, openapi_extra=query_budget(6))
+async def apply_cart_batch(
+    request: CartBatchRequest,
+    response: Response,
+    x_cart_token: Optional[str] = Header(None),
+    service: ThreadpoolServiceRunner[CartService] = Depends(get_cart_service),
+):
+    cart = await service.call(CartService.apply_batch, x_cart_token, request.operations)
+    response.headers[CART_TOKEN_HEADER] = cart.token
+    return cart
\ No newline at end of file
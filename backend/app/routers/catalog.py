@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, Query, Response, status
+from typing import Optional
+from ..coalescing import coalesce
+from ..config import settings
+from ..http_cache import CachePolicy, conditional_get
+from ..query_budget import query_budget
+from ..schemas.catalog import CatalogChangesResponse
+from ..services.catalog import CatalogService
+from ..services.runner import ThreadpoolServiceRunner, service_dependency
+
+router = APIRouter(
+    prefix="/api/catalog",
+    tags=["catalog"],
+    # ETag по версии каталога: опрос без новых изменений стоит одного чтения catalog_state и 304
+    dependencies=[Depends(conditional_get(CachePolicy(max_age=settings.changes_cache_max_age)))],
+)
+
+get_catalog_service = service_dependency(CatalogService)
+
+@router.get("/changes", response_model=CatalogChangesResponse, status_code=status.HTTP_200_OK, openapi_extra=query_budget(5))
+async def get_catalog_changes(
+    response: Response,
+    since: int = Query(0, ge=0, description="next_since from the previous response; 0 for a client that has nothing yet"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.changes_max_page_size),
+    services: ThreadpoolServiceRunner[CatalogService] = Depends(get_catalog_service),
+):
+    """Delta sync: catalog changes after `since`, oldest first, with the current state embedded.
+
+    When resync_required is true the changes after `since` are no longer retained:
+    download the catalog, then continue from next_since. Poll with If-None-Match to get 304 while the catalog is unchanged.
+    """
+    limit = limit or settings.changes_page_size
+    return await coalesce(
+        "catalog.changes", lambda: services.call(CatalogService.get_changes, since, limit),
+        etag=response.headers.get("etag"), since=since, limit=limit,
+    )
@@ -1,21 +1,34 @@
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Response, status
 from typing import List
-from ..database import get_db
-from ..services.category import CategoryService
+from ..coalescing import coalesce
+from ..config import settings
+from ..http_cache import CachePolicy, conditional_get, prebuilt_json
+from ..services.category import AsyncCategoryService, CategoryService
+from ..query_budget import query_budget
+from ..services.runner import service_dependency
 from ..schemas.category import CategoryResponse
 
 router = APIRouter(
     prefix="/api/categories",
-    tags=["ctegories"]
+    tags=["ctegories"],
+    dependencies=[Depends(conditional_get(CachePolicy(
+        max_age=settings.categories_cache_max_age,
+        stale_while_revalidate=settings.categories_cache_stale_while_revalidate,
+    )))],
 )
 
-@router.get("", response_model=List[CategoryResponse], status_code=status.HTTP_200_OK)
-def get_categories(db: Session = Depends(get_db)):
-    services = CategoryService(db)
-    return services.get_all_categories()
+get_category_service = service_dependency(CategoryService, async_service_cls=AsyncCategoryService)
 
-@router.get("/{category_id}", response_model=CategoryResponse, status_code=status.HTTP_200_OK)
-def get_category(category_id: int, db: Session = Depends(get_db)):
-    service = CategoryService(db)
-    return service.get_category_by_id(category_id)
+@router.get("", response_model=List[CategoryResponse], status_code=status.HTTP_200_OK, openapi_extra=query_budget(2))
+async def get_categories(response: Response, services: AsyncCategoryService = Depends(get_category_service)):
+    etag = response.headers.get("etag")
+    if settings.fast_read_path:
+        return prebuilt_json(await coalesce("categories.json", services.get_all_categories_json, etag=etag), response)
+    return await coalesce("categories", services.get_all_categories, etag=etag)
+
+@router.get("/{category_id}", response_model=CategoryResponse, status_code=status.HTTP_200_OK, openapi_extra=query_budget(2))
+async def get_category(category_id: int, response: Response, service: AsyncCategoryService = Depends(get_category_service)):
+    return await coalesce(
+        "categories.by_id", lambda: service.get_category_by_id(category_id),
+        etag=response.headers.get("etag"), category_id=category_id,
+    )
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Header, HTTPException, Query, status
+from typing import Optional
+from ..config import settings
+from ..events import EventStreamResponse, get_event_hub
+from ..query_budget import query_budget
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+EVENT_STREAM_DESCRIPTION = """Server-Sent Events stream of catalog invalidations.
+
+`invalidate` events carry `{"entity", "id", "op", "version"}` for every catalog write,
+with the change log seq as the event id. `resync` means that changes were missed (the
+client was too slow or Last-Event-ID is too old): reload the catalog. Comment lines
+are heartbeats. The server ends the stream after a while; EventSource reconnects and
+resumes from Last-Event-ID.
+"""
+
+@router.get(
+    "",
+    response_class=EventStreamResponse,
+    status_code=status.HTTP_200_OK,
+    description=EVENT_STREAM_DESCRIPTION,
+    responses={200: {"content": {"text/event-stream": {}}, "description": "Endless event stream"}},
+    openapi_extra=query_budget(3),
+)
+async def catalog_events(
+    since: Optional[int] = Query(None, ge=0, description="Resume after this seq (next_since of /api/catalog/changes)"),
+    last_event_id: Optional[int] = Header(None, ge=0, description="Set by EventSource on reconnect"),
+):
+    hub = get_event_hub()
+    if hub.connections >= settings.events_max_connections:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many event streams, retry later",
+            headers={"Retry-After": str(settings.admission_retry_after)},
+        )
+    return EventStreamResponse(hub, last_event_id if last_event_id is not None else since)
@@ -1,25 +1,210 @@
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
-from ..database import get_db
-from ..services.product import ProductService
-from ..schemas.product import ProductResponse, ProductListResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from ..coalescing import coalesce
+from ..config import settings
+from ..pagination import CountStrategy, ProductSort
+from ..projection import InvalidProjectionError, ProductField, ProductProjection
+from ..http_cache import NDJSON_MEDIA_TYPE, CachePolicy, conditional_get, prebuilt_json, wants_ndjson
+from ..services.product import AsyncProductService, ProductService
+from ..services.product_stream import ProductStreamService
+from ..query_budget import query_budget
+from ..services.runner import service_dependency
+from ..schemas.product import (
+    ProductBatchRequest, ProductBatchResponse, ProductResponse, ProductListResponse, ProductSearchResponse,
+    SparseProductListResponse,
+)
 
 router = APIRouter(
     prefix="/api/products",
-    tags=["products"]
+    tags=["products"],
+    dependencies=[Depends(conditional_get(CachePolicy(
+        max_age=settings.products_cache_max_age,
+        stale_while_revalidate=settings.products_cache_stale_while_revalidate,
+    )))],
+)
+
+get_product_service = service_dependency(ProductService, async_service_cls=AsyncProductService)
+
+STREAM_DESCRIPTION = "Stream every matching product instead of one page (also implied by Accept: application/x-ndjson)"
+IDS_DESCRIPTION = (
+    "Comma-separated product IDs (at most %d): return exactly these products in this order, "
+    "with not-found markers. Use POST /api/products/batch for long lists" % settings.products_batch_max_ids
 )
 
-@router.get("", response_model=ProductListResponse, status_code=status.HTTP_200_OK)
-def get_products(db: Session = Depends(get_db)):
-    services = ProductService(db)
-    return services.get_all_products()
+FIELDS_DESCRIPTION = (
+    "Comma-separated fields to return (%s); id is always included. Only these columns are read, "
+    "and the category is omitted unless include=category" % ", ".join(field.value for field in ProductField)
+)
+INCLUDE_DESCRIPTION = "category: embed the category (joined only when requested)"
+
+def _projection(fields: str, include: Optional[str]) -> ProductProjection:
+    try:
+        return ProductProjection.parse(fields, include)
+    except InvalidProjectionError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+def _parse_ids(ids: str) -> List[int]:
+    try:
+        return ProductBatchRequest(ids=[int(part) for part in ids.split(",") if part.strip()]).ids
+    except ValueError:  # ValidationError тоже наследует ValueError
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"ids must be 1 to {settings.products_batch_max_ids} comma-separated integers",
+        )
+
+def _page_params(limit: Optional[int], count: Optional[CountStrategy], **params) -> dict:
+    # Одинаковые параллельные запросы ждут одно вычисление; параметры по умолчанию подставлены до ключа
+    return dict(
+        limit=limit or settings.products_page_size,
+        count=count or CountStrategy(settings.products_count_strategy),
+        **params,
+    )
+
+async def _stream_products(request: Request, response: Response, **params) -> StreamingResponse:
+    ndjson = wants_ndjson(request)
+    chunks = await run_in_threadpool(ProductStreamService().open, ndjson=ndjson, **params)
+    # Заголовки, выставленные зависимостями (ETag, Cache-Control), сами на StreamingResponse не переносятся
+    return StreamingResponse(
+        chunks,
+        media_type=NDJSON_MEDIA_TYPE if ndjson else "application/json",
+        headers=dict(response.headers),
+    )
+
+# У каждого маршрута одна модель ответа: мульти-гет и выборка полей живут на своих путях,
+# а не переключают форму ответа GET /api/products параметрами (anyOf без дискриминатора в OpenAPI)
+@router.get("", response_model=ProductListResponse, status_code=status.HTTP_200_OK, openapi_extra=query_budget(3))
+async def get_products(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=settings.products_max_page_size),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    sort: ProductSort = ProductSort.id,
+    category_id: Optional[int] = None,
+    name_prefix: Optional[str] = Query(None, min_length=1, max_length=100),
+    count: Optional[CountStrategy] = None,
+    stream: bool = Query(False, description=STREAM_DESCRIPTION),
+    services: AsyncProductService = Depends(get_product_service),
+):
+    if stream or wants_ndjson(request):
+        return await _stream_products(
+            request, response, cursor=cursor, sort=sort, category_id=category_id, name_prefix=name_prefix, limit=limit
+        )
+    params = _page_params(limit, count, cursor=cursor, sort=sort, category_id=category_id, name_prefix=name_prefix)
+    etag = response.headers.get("etag")
+    if settings.fast_read_path:
+        return prebuilt_json(await coalesce(
+            "products.json", lambda: services.get_all_products_json(**params), etag=etag, **params,
+        ), response)
+    return await coalesce("products", lambda: services.get_all_products(**params), etag=etag, **params)
+
+@router.get("/sparse", response_model=SparseProductListResponse, status_code=status.HTTP_200_OK, openapi_extra=query_budget(3))
+async def get_sparse_products(
+    response: Response,
+    fields: str = Query(..., description=FIELDS_DESCRIPTION, examples=["name"]),
+    include: Optional[str] = Query(None, description=INCLUDE_DESCRIPTION, examples=["category"]),
+    limit: Optional[int] = Query(None, ge=1, le=settings.products_max_page_size),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    sort: ProductSort = ProductSort.id,
+    category_id: Optional[int] = None,
+    name_prefix: Optional[str] = Query(None, min_length=1, max_length=100),
+    count: Optional[CountStrategy] = None,
+    services: AsyncProductService = Depends(get_product_service),
+):
+    """Page of GET /api/products with only the requested columns; built in SQL on the fast read path."""
+    projection = _projection(fields, include)
+    params = _page_params(limit, count, cursor=cursor, sort=sort, category_id=category_id, name_prefix=name_prefix)
+    return prebuilt_json(await coalesce(
+        "products.json", lambda: services.get_all_products_json(projection=projection, **params),
+        etag=response.headers.get("etag"), projection=projection, **params,
+    ), response)
+
+@router.get("/batch", response_model=ProductBatchResponse, status_code=status.HTTP_200_OK, openapi_extra=query_budget(2))
+async def get_products_by_ids(
+    response: Response,
+    ids: str = Query(..., description=IDS_DESCRIPTION, examples=["3,1,2"]),
+    services: AsyncProductService = Depends(get_product_service),
+):
+    product_ids = _parse_ids(ids)
+    return await coalesce(
+        "products.by_ids", lambda: services.get_products_by_ids(product_ids),
+        etag=response.headers.get("etag"), ids=tuple(product_ids),
+    )
+
+@router.get("/search", response_model=ProductSearchResponse, status_code=status.HTTP_200_OK, openapi_extra=query_budget(3))
+async def search_products(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100, description="Search text, Cyrillic or Latin"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.products_max_page_size),
+    offset: int = Query(0, ge=0, le=settings.search_max_offset),
+    services: AsyncProductService = Depends(get_product_service),
+):
+    limit = limit or settings.products_page_size
+    return await coalesce(
+        "products.search", lambda: services.search_products(q, limit=limit, offset=offset),
+        etag=response.headers.get("etag"), q=q, limit=limit, offset=offset,
+    )
+
+@router.post("/batch", response_model=ProductBatchResponse, status_code=status.HTTP_200_OK, openapi_extra=query_budget(1))
+async def get_products_batch(payload: ProductBatchRequest, services: AsyncProductService = Depends(get_product_service)):
+    """Multi-get for lists too long for a query string; same response as GET /api/products/batch."""
+    return await services.get_products_by_ids(payload.ids)
+
+@router.get("/{product_id}", response_model=ProductResponse, status_code=status.HTTP_200_OK, openapi_extra=query_budget(2))
+async def get_product(product_id: int, response: Response, services: AsyncProductService = Depends(get_product_service)):
+    return await coalesce(
+        "products.by_id", lambda: services.get_product_by_id(product_id),
+        etag=response.headers.get("etag"), product_id=product_id,
+    )
 
-@router.get("/{product_id}", response_model=ProductResponse, status_code=status.HTTP_200_OK)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    services = ProductService(db)
-    return services.get_product_by_id(product_id)
+@router.get("/category/{category_id}", response_model=ProductListResponse, status_code=status.HTTP_200_OK, openapi_extra=query_budget(4))
+async def get_products_by_category(
+    category_id: int,
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=settings.products_max_page_size),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    sort: ProductSort = ProductSort.id,
+    name_prefix: Optional[str] = Query(None, min_length=1, max_length=100),
+    count: Optional[CountStrategy] = None,
+    stream: bool = Query(False, description=STREAM_DESCRIPTION),
+    services: AsyncProductService = Depends(get_product_service),
+):
+    if stream or wants_ndjson(request):
+        return await _stream_products(
+            request, response, cursor=cursor, sort=sort, category_id=category_id, name_prefix=name_prefix,
+            limit=limit, require_category=True,
+        )
+    params = _page_params(limit, count, cursor=cursor, sort=sort, name_prefix=name_prefix)
+    etag = response.headers.get("etag")
+    if settings.fast_read_path:
+        return prebuilt_json(await coalesce(
+            "products.by_category.json", lambda: services.get_products_by_category_json(category_id, **params),
+            etag=etag, category_id=category_id, **params,
+        ), response)
+    return await coalesce(
+        "products.by_category", lambda: services.get_products_by_category(category_id, **params),
+        etag=etag, category_id=category_id, **params,
+    )
 
-@router.get("/category/{product_id}", response_model=ProductListResponse, status_code=status.HTTP_200_OK)
-def get_products_by_category(category_id: int, db: Session = Depends(get_db)):
-    services = ProductService(db)
-    return services.get_products_by_category(category_id)
+@router.get("/category/{category_id}/sparse", response_model=SparseProductListResponse, status_code=status.HTTP_200_OK, openapi_extra=query_budget(4))
+async def get_sparse_products_by_category(
+    category_id: int,
+    response: Response,
+    fields: str = Query(..., description=FIELDS_DESCRIPTION, examples=["name"]),
+    include: Optional[str] = Query(None, description=INCLUDE_DESCRIPTION, examples=["category"]),
+    limit: Optional[int] = Query(None, ge=1, le=settings.products_max_page_size),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    sort: ProductSort = ProductSort.id,
+    name_prefix: Optional[str] = Query(None, min_length=1, max_length=100),
+    count: Optional[CountStrategy] = None,
+    services: AsyncProductService = Depends(get_product_service),
+):
+    projection = _projection(fields, include)
+    params = _page_params(limit, count, cursor=cursor, sort=sort, name_prefix=name_prefix)
+    return prebuilt_json(await coalesce(
+        "products.by_category.json",
+        lambda: services.get_products_by_category_json(category_id, projection=projection, **params),
+        etag=response.headers.get("etag"), category_id=category_id, projection=projection, **params,
+    ), response)
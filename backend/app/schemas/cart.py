@@ -1,16 +1,16 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Literal, Optional
 
 class CartItemBase(BaseModel):
     product_id: int = Field(..., description="The ID of the product")
-    review: int = Field(..., ge=0, description="The review of the product")
+    review: int = Field(..., ge=1, description="The review of the product")
     
 class CartItemCreate(CartItemBase):
     pass
 
 class CartItemUpdate(BaseModel):
     product_id: int = Field(..., description="The ID of the product")
-    review: int = Field(..., ge=0, description="The review of the product")
+    review: int = Field(..., ge=1, description="The review of the product")
     
 class CartItem(BaseModel):
     product_id: int
@@ -19,5 +19,26 @@ class CartItem(BaseModel):
     image_url: Optional[str] = Field(None, description="The image URL of the product")
     
 class CartResponse(BaseModel):
-    itmes: list[CartItem] = Field(..., description="The items in the cart")
-    items_count: int = Field(..., description="The number of items in the cart")
\ No newline at end of file
+    token: Optional[str] = Field(None, description="Cart token, null if the cart does not exist")
+    items: list[CartItem] = Field(..., description="The items in the cart")
+    items_count: int = Field(..., description="The number of items in the cart")
+
+class CartChangeResponse(BaseModel):
+    token: str = Field(..., description="Cart token to send back in X-Cart-Token")
+    product_id: int = Field(..., description="The ID of the changed product")
+    review: Optional[int] = Field(None, description="New value for the product, null if it was removed")
+    items_count: int = Field(..., description="The number of items in the cart")
+
+class CartOperation(BaseModel):
+    op: Literal["add", "update", "remove"] = Field(..., description="add increments, update overwrites, remove deletes")
+    product_id: int = Field(..., description="The ID of the product")
+    review: Optional[int] = Field(None, ge=1, description="Amount for add/update, ignored for remove")
+
+    @model_validator(mode="after")
+    def check_review(self) -> "CartOperation":
+        if self.op != "remove" and self.review is None:
+            raise ValueError(f"review is required for {self.op}")
+        return self
+
+class CartBatchRequest(BaseModel):
+    operations: list[CartOperation] = Field(..., min_length=1, max_length=100, description="Applied in order, all or nothing")
\ No newline at end of file
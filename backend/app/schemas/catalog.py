@@ -0,0 +1,35 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+from .category import CategoryResponse
+from .product import ProductResponse
+
+class CatalogVersion(BaseModel):
+    version: int = Field(..., description="Monotonic catalog change stamp")
+    updated_at: Optional[datetime] = Field(None, description="Time of the last catalog write (UTC)")
+class ChangeEntity(str, Enum):
+    product = "product"
+    category = "category"
+
+class ChangeOp(str, Enum):
+    upsert = "upsert"
+    delete = "delete"
+
+class CatalogChangeItem(BaseModel):
+    seq: int = Field(..., description="Position in the change log")
+    entity: ChangeEntity = Field(..., description="Kind of the changed entity")
+    id: int = Field(..., description="ID of the changed entity")
+    op: ChangeOp = Field(..., description="upsert: create or update, the current state is embedded; delete: gone")
+    changed_at: datetime = Field(..., description="Time of the change (UTC)")
+    product: Optional[ProductResponse] = Field(None, description="Current product for product upserts")
+    category: Optional[CategoryResponse] = Field(None, description="Current category for category upserts")
+
+class CatalogChangesResponse(BaseModel):
+    changes: list[CatalogChangeItem] = Field(..., description="Changes after `since`, oldest first, latest entry per entity")
+    next_since: int = Field(..., description="Pass as `since` on the next request")
+    has_more: bool = Field(..., description="More changes are available right away")
+    resync_required: bool = Field(
+        False,
+        description="`since` is older than the retained log: download the full catalog, then continue from next_since",
+    )
@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional
+
+class ImportRow(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100, description="Product name, the upsert key")
+    description: Optional[str] = Field(None, max_length=200, description="Product description")
+    category: Optional[str] = Field(None, min_length=1, max_length=100, description="Category name, created if missing")
+    category_slug: Optional[str] = Field(None, min_length=1, max_length=100, description="Slug of an existing category")
+    image_url: Optional[str] = Field(None, description="Product image URL")
+
+    @model_validator(mode="after")
+    def check_category(self) -> "ImportRow":
+        if not self.category and not self.category_slug:
+            raise ValueError("either category or category_slug is required")
+        if not self.description:
+            self.description = None
+        return self
+
+class ImportRowError(BaseModel):
+    chunk: int = Field(..., description="1-based chunk number")
+    row: Optional[int] = Field(None, description="1-based data row number, null for chunk-level failures")
+    message: str = Field(..., description="What went wrong")
+
+class ImportReport(BaseModel):
+    rows_read: int = Field(0, description="Data rows read from the source")
+    rows_upserted: int = Field(0, description="Rows inserted or updated")
+    rows_failed: int = Field(0, description="Rows rejected by validation or a failed chunk")
+    categories_created: int = Field(0, description="Categories created on the fly")
+    chunks: int = Field(0, description="Committed or failed chunks")
+    elapsed_seconds: float = Field(0.0, description="Wall time of the import")
+    rows_per_second: float = Field(0.0, description="rows_read / elapsed_seconds")
+    errors: list[ImportRowError] = Field(default_factory=list, description="First errors, capped")
+    errors_truncated: bool = Field(False, description="True when more errors occurred than are listed")
\ No newline at end of file
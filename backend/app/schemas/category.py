@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field
+from typing import TypedDict
 
 class CategoryBase(BaseModel):
     name: str = Field(..., min_length=3, max_length=100, description="Category name")
@@ -11,4 +12,10 @@ class CategoryResponse(CategoryBase):
     id: int = Field(..., description="Category ID")
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CategoryRow(TypedDict):
+    """Wire shape of CategoryResponse for the fast read path (serialized without validation)."""
+    name: str
+    slug: str
+    id: int
\ No newline at end of file
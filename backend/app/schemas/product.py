@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_serializer
 from datetime import datetime
-from typing import Optional
-from .category import CategoryResponse
+from typing import Optional, TypedDict
+from ..config import settings
+from .category import CategoryResponse, CategoryRow
+from ..static_assets import asset_url
 
 class ProductBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=100, description="Product name")
@@ -17,10 +19,76 @@ class ProductResponse(ProductBase):
     created_at: datetime = Field(..., description="Product creation date")
     
     category: CategoryResponse = Field(..., description="Product category")
+
+    @field_serializer("image_url")
+    def _fingerprinted_image_url(self, image_url: Optional[str]) -> Optional[str]:
+        return asset_url(image_url)
     
     class Config:
         from_attributes = True
         
 class ProductListResponse(BaseModel):
     products: list[ProductResponse] = Field(..., description="List of products")
-    total: int = Field(..., description="Total number of products")
+    total: Optional[int] = Field(None, description="Total number of matching products (omitted with count=none, capped with count=estimated)")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, null on the last page")
+
+class ProductRow(TypedDict):
+    """Wire shape of ProductResponse for the fast read path; field order matches the model."""
+    name: str
+    description: Optional[str]
+    category_id: int
+    image_url: Optional[str]
+    id: int
+    created_at: datetime
+    category: CategoryRow
+
+class ProductListRows(TypedDict):
+    products: list[ProductRow]
+    total: Optional[int]
+    next_cursor: Optional[str]
+
+class SparseProductResponse(BaseModel):
+    """Product with only the fields requested by `fields=` (and the category with `include=category`)."""
+    id: int = Field(..., description="Product ID, always present")
+    name: Optional[str] = Field(None, description="Present when requested")
+    description: Optional[str] = Field(None, description="Present when requested")
+    category_id: Optional[int] = Field(None, description="Present when requested")
+    image_url: Optional[str] = Field(None, description="Present when requested")
+    created_at: Optional[datetime] = Field(None, description="Present when requested")
+    category: Optional[CategoryResponse] = Field(None, description="Present with include=category")
+
+class SparseProductListResponse(BaseModel):
+    products: list[SparseProductResponse] = Field(..., description="List of products, requested fields only")
+    total: Optional[int] = Field(None, description="Total number of matching products (omitted with count=none, capped with count=estimated)")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, null on the last page")
+
+class SparseProductRow(TypedDict, total=False):
+    """Wire shape of SparseProductResponse: absent keys were not requested."""
+    id: int
+    name: str
+    description: Optional[str]
+    category_id: int
+    image_url: Optional[str]
+    created_at: datetime
+    category: CategoryRow
+
+class SparseProductListRows(TypedDict):
+    products: list[SparseProductRow]
+    total: Optional[int]
+    next_cursor: Optional[str]
+
+class ProductSearchResponse(BaseModel):
+    products: list[ProductResponse] = Field(..., description="Matching products, best match first")
+    next_offset: Optional[int] = Field(None, description="Offset of the next page, null on the last page")
+
+class ProductBatchRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=settings.products_batch_max_ids, description="Product IDs, duplicates allowed")
+
+class ProductBatchItem(BaseModel):
+    id: int = Field(..., description="Requested product ID")
+    found: bool = Field(..., description="False if no product has this ID")
+    product: Optional[ProductResponse] = Field(None, description="The product, null when not found")
+
+class ProductBatchResponse(BaseModel):
+    items: list[ProductBatchItem] = Field(..., description="One item per requested ID, in request order")
+    missing: list[int] = Field(..., description="Requested IDs that do not exist")
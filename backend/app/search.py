@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Union
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+
+from .translit import TRANSLIT_MAP
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "products_fts"
+
+# name и description индексируются как есть и в транслитерации, поэтому
+# запрос «печь» и запрос «pech» находят одни и те же товары.
+# Триггеры обходятся встроенными функциями SQLite: в products может писать любой клиент
+# (sqlite3, скрипты), а не только соединения приложения. Транслитерацию считает Python:
+# пути записи приложения дописывают её через index_transliterations() в той же транзакции.
+_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, name_lat, description_lat,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description, name_lat, description_lat)
+        VALUES (new.id, new.name, coalesce(new.description, ''), '', '');
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, name, description, name_lat, description_lat)
+        VALUES (new.id, new.name, coalesce(new.description, ''), '', '');
+    END
+    """,
+]
+
+_FTS_TRIGGERS = ("products_fts_ai", "products_fts_ad", "products_fts_au")
+
+# Пересборка идёт в обход SQLAlchemy: executemany кортежей без обработки параметров по строкам
+_FTS_INSERT = (
+    f"INSERT INTO {FTS_TABLE}(rowid, name, description, name_lat, description_lat) VALUES (?, ?, ?, ?, ?)"
+)
+_FTS_SET_LATIN = text(
+    f"UPDATE {FTS_TABLE} SET name_lat = :name_lat, description_lat = :description_lat WHERE rowid = :id"
+)
+REBUILD_BATCH = 5000
+# Настройки FTS5 на время пересборки: крупный буфер терминов (реже сброс сегментов на диск)
+# и без попутных слияний сегментов; после пересборки возвращаются значения по умолчанию
+REBUILD_FTS_OPTIONS = {"hashsize": 64 * 1024 * 1024, "automerge": 0}
+DEFAULT_FTS_OPTIONS = {"hashsize": 1024 * 1024, "automerge": 4}
+
+# Веса bm25 по колонкам: совпадение в названии важнее совпадения в описании
+BM25_WEIGHTS = "10.0, 1.0, 10.0, 1.0"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_fts_ready: Optional[bool] = None
+
+# transliterate() вызывается на каждую строку при пересборке индекса: словарь каталога невелик,
+# поэтому слова транслитерируются один раз и дальше берутся из кэша
+_TRANSLIT_TABLE = str.maketrans(TRANSLIT_MAP)
+
+
+@lru_cache(maxsize=65536)
+def _transliterate_word(word: str) -> str:
+    return word.translate(_TRANSLIT_TABLE)
+
+
+def transliterate(value: Optional[str]) -> str:
+    """Lower-case Cyrillic to Latin using the same table as slugify()."""
+    if not value:
+        return ""
+    return " ".join(map(_transliterate_word, value.lower().split(" ")))
+
+
+def register_sqlite_functions(dbapi_connection: Any) -> None:
+    """Register `translit()` for the LIKE fallback of product search (app connections only)."""
+    dbapi_connection.create_function("translit", 1, transliterate, deterministic=True)
+
+
+def fts5_available(connection: Connection) -> bool:
+    try:
+        connection.exec_driver_sql("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        connection.exec_driver_sql("DROP TABLE temp.fts5_probe")
+    except Exception:
+        return False
+    return True
+
+
+def ensure_search_index(engine: Engine) -> bool:
+    """Create the FTS5 table and its triggers, backfilling it if products predate the index.
+
+    Returns False (and search falls back to LIKE) when SQLite is built without FTS5.
+    """
+    with engine.begin() as connection:
+        return create_search_index(connection)
+
+
+def create_search_index(connection: Connection) -> bool:
+    """ensure_search_index() inside the caller's transaction (bulk loads)."""
+    global _fts_ready
+    if not fts5_available(connection):
+        logger.warning("SQLite FTS5 is unavailable, product search falls back to LIKE")
+        _fts_ready = False
+        return False
+
+    # Триггеры пересоздаются: в базах до SCHEMA_VERSION 4 они вызывали translit()
+    for trigger in _FTS_TRIGGERS:
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+    for statement in _FTS_DDL:
+        connection.exec_driver_sql(statement)
+
+    index_empty = connection.execute(text(f"SELECT 1 FROM {FTS_TABLE} LIMIT 1")).first() is None
+    has_products = connection.execute(text("SELECT 1 FROM products LIMIT 1")).first() is not None
+    if index_empty and has_products:
+        rebuild_search_index(connection, optimize=False)
+
+    _fts_ready = True
+    return True
+
+
+def drop_search_index(connection: Connection) -> None:
+    """Drop the FTS table and its triggers before a bulk load; ensure_search_index() rebuilds both.
+
+    Dropping is much cheaper than DELETE FROM on a large FTS5 table, and without the
+    triggers inserts do not tokenize row by row.
+    """
+    for trigger in _FTS_TRIGGERS:
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def _fts_row(row: Any) -> dict:
+    description = row.description or ""
+    return {
+        "id": row.id,
+        "name": row.name,
+        "description": description,
+        "name_lat": transliterate(row.name),
+        "description_lat": transliterate(description),
+    }
+
+
+class _Transliterations(Dict[str, str]):
+    """transliterate() memoized per value: catalog descriptions repeat across many products."""
+
+    def __missing__(self, value: str) -> str:
+        latin = self[value] = transliterate(value)
+        return latin
+
+
+def _set_fts_options(connection: Connection, options: Dict[str, int]) -> None:
+    for name, value in options.items():
+        connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('{name}', {int(value)})")
+
+
+def rebuild_search_index(connection: Connection, optimize: bool = True) -> None:
+    """Refill the FTS table from products.
+
+    `optimize` merges the index into a single b-tree afterwards. A fresh bulk build is
+    written in a few large segments (REBUILD_FTS_OPTIONS) and skips that pass; later
+    writes merge them incrementally (automerge).
+    """
+    connection.exec_driver_sql(f"DELETE FROM {FTS_TABLE}")
+    _set_fts_options(connection, REBUILD_FTS_OPTIONS)
+    descriptions = _Transliterations()
+    rows = connection.exec_driver_sql("SELECT id, name, coalesce(description, '') FROM products")
+    while True:
+        batch = rows.fetchmany(REBUILD_BATCH)
+        if not batch:
+            break
+        connection.exec_driver_sql(_FTS_INSERT, [
+            (product_id, name, description, transliterate(name), descriptions[description])
+            for product_id, name, description in batch
+        ])
+    # Настройки хранятся в самой таблице: обычные записи приложения работают со значениями по умолчанию
+    _set_fts_options(connection, DEFAULT_FTS_OPTIONS)
+    if optimize:
+        connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def index_transliterations(db: Union[Session, Connection], condition: ColumnElement) -> None:
+    """Fill the Latin columns of the FTS rows of products matching `condition`.
+
+    The triggers index name and description only; every application write path calls
+    this after its INSERT/UPDATE of products, in the same transaction. Rows written by
+    other clients are searchable in Cyrillic until the next rebuild (`python -m app.search`).
+    """
+    connection = db.connection() if isinstance(db, Session) else db
+    if not search_index_ready(connection):
+        return
+    # Модель импортируется здесь: app.database подключает этот модуль до объявления моделей
+    from .models.product import Product
+
+    rows = connection.execute(select(Product.id, Product.name, Product.description).where(condition)).all()
+    if rows:
+        connection.execute(_FTS_SET_LATIN, [_fts_row(row) for row in rows])
+
+
+def search_index_ready(connection: Connection) -> bool:
+    global _fts_ready
+    if _fts_ready is None:
+        _fts_ready = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE},
+        ).first() is not None
+    return _fts_ready
+
+
+def query_tokens(query: str) -> List[str]:
+    return [token.lower() for token in _TOKEN_RE.findall(query)]
+
+
+def build_match_expression(tokens: List[str]) -> str:
+    """Build an FTS5 MATCH expression: every token as a prefix, in either script."""
+    terms = []
+    for token in tokens:
+        variants = {token, transliterate(token)}
+        quoted = " OR ".join(f'"{variant.replace(chr(34), chr(34) * 2)}"*' for variant in sorted(variants) if variant)
+        terms.append(f"({quoted})")
+    return " AND ".join(terms)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild the product full-text search index.")
+    parser.parse_args(argv)
+
+    from .database import engine
+
+    with engine.begin() as connection:
+        if not search_index_ready(connection):
+            raise SystemExit("the search index does not exist (SQLite without FTS5?)")
+        rebuild_search_index(connection)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional
 
 from sqlalchemy.orm import Session
 
-from .database import Base, SessionLocal, engine
+from .database import SessionLocal, ensure_schema
 from .models.category import Category
 from .models.product import Product
+from .repositories.catalog_changes import ChangeLogRepository
+from .repositories.catalog_state import CatalogStateRepository
+from .schemas.catalog import ChangeEntity
+from .search import index_transliterations
+from .translit import slugify
 
 
 @dataclass(frozen=True)
@@ -191,59 +196,20 @@ FURNACES: List[FurnacePayload] = [
 ]
 
 
-TRANSLIT_MAP: Dict[str, str] = {
-    "а": "a",
-    "б": "b",
-    "в": "v",
-    "г": "g",
-    "д": "d",
-    "е": "e",
-    "ё": "e",
-    "ж": "zh",
-    "з": "z",
-    "и": "i",
-    "й": "y",
-    "к": "k",
-    "л": "l",
-    "м": "m",
-    "н": "n",
-    "о": "o",
-    "п": "p",
-    "р": "r",
-    "с": "s",
-    "т": "t",
-    "у": "u",
-    "ф": "f",
-    "х": "kh",
-    "ц": "ts",
-    "ч": "ch",
-    "ш": "sh",
-    "щ": "shch",
-    "ъ": "",
-    "ы": "y",
-    "ь": "",
-    "э": "e",
-    "ю": "yu",
-    "я": "ya",
-}
-
-
-def slugify(value: str) -> str:
-    """Convert Cyrillic text to a simple ASCII slug."""
-    value = value.strip().lower()
-    transliterated = "".join(TRANSLIT_MAP.get(char, char) for char in value)
-    safe = []
-    for char in transliterated:
-        if char.isalnum():
-            safe.append(char)
-        elif char in {" ", "-", "_"}:
-            safe.append("-")
-    slug = "".join(safe).strip("-")
-    return slug or "category"
-
-
-def ensure_categories(session: Session, furnace_rows: Iterable[FurnacePayload]) -> Dict[str, Category]:
+def ensure_categories(
+    session: Session,
+    furnace_rows: Iterable[FurnacePayload],
+    created: Optional[List[Category]] = None,
+) -> Dict[str, Category]:
     """Create missing categories derived from furnace types."""
+    furnace_rows = list(furnace_rows)
+    slugs = {slugify(payload.furnace_type.strip()) for payload in furnace_rows}
+    # Одним запросом вместо SELECT на каждую строку
+    existing_by_slug = {
+        category.slug: category
+        for category in session.query(Category).filter(Category.slug.in_(slugs))
+    }
+
     categories: Dict[str, Category] = {}
     for payload in furnace_rows:
         raw_name = payload.furnace_type.strip()
@@ -253,7 +219,7 @@ def ensure_categories(session: Session, furnace_rows: Iterable[FurnacePayload])
         if category_name in categories:
             continue
 
-        existing = session.query(Category).filter_by(slug=slug).first()
+        existing = existing_by_slug.get(slug)
         if existing:
             categories[category_name] = existing
             continue
@@ -262,15 +228,27 @@ def ensure_categories(session: Session, furnace_rows: Iterable[FurnacePayload])
         session.add(category)
         session.flush()
         categories[category_name] = category
+        if created is not None:
+            created.append(category)
 
     return categories
 
 
-def ensure_products(session: Session, furnace_rows: Iterable[FurnacePayload], categories: Dict[str, Category]) -> None:
-    """Insert furnaces as products linked to the seeded categories."""
+def ensure_products(
+    session: Session,
+    furnace_rows: Iterable[FurnacePayload],
+    categories: Dict[str, Category],
+) -> List[Product]:
+    """Insert furnaces as products linked to the seeded categories; returns the products added."""
+    furnace_rows = list(furnace_rows)
+    names = [payload.furnace_name for payload in furnace_rows]
+    existing_names = {name for (name,) in session.query(Product.name).filter(Product.name.in_(names))}
+    added: List[Product] = []
+
     for payload in furnace_rows:
-        if session.query(Product).filter_by(name=payload.furnace_name).first():
+        if payload.furnace_name in existing_names:
             continue
+        existing_names.add(payload.furnace_name)
 
         category_key = payload.furnace_type.strip().capitalize()
         category = categories[category_key]
@@ -281,16 +259,28 @@ def ensure_products(session: Session, furnace_rows: Iterable[FurnacePayload], ca
             image_url=f"/static/images/{payload.image_res}.jpg",
         )
         session.add(product)
+        added.append(product)
+    return added
 
 
 def seed() -> None:
-    """Populate the database with initial categories and products."""
-    Base.metadata.create_all(bind=engine)
+    """Populate the database with initial categories and products (`python -m app.seed_data`)."""
+    ensure_schema()
 
     session: Session = SessionLocal()
     try:
-        categories = ensure_categories(session, FURNACES)
-        ensure_products(session, FURNACES, categories)
+        created: List[Category] = []
+        categories = ensure_categories(session, FURNACES, created)
+        products = ensure_products(session, FURNACES, categories)
+        session.flush()
+        if products:
+            index_transliterations(session, Product.id.in_([product.id for product in products]))
+        # Повторный сид ничего не вставил: версия каталога та же, кэши и ETag остаются в силе
+        if created or products:
+            CatalogStateRepository(session).bump()
+            changes = ChangeLogRepository(session)
+            changes.record(ChangeEntity.category, [category.id for category in created])
+            changes.record(ChangeEntity.product, [product.id for product in products])
         session.commit()
     except Exception:
         session.rollback()
@@ -0,0 +1,190 @@
+"""Production launcher: load the app once, then fork uvicorn workers sharing one socket.
+
+    python run.py --prod --workers 4
+
+The master imports app.main, runs the boot work (schema check, static manifest) and
+builds the OpenAPI schema, then forks; workers start with all of it already in memory.
+SQLAlchemy pools inherited across the fork are dropped by app.database, so each worker
+opens its own SQLite connections. A worker exits gracefully after server_max_requests
+(plus jitter, so workers do not recycle in lockstep) and the master forks a replacement.
+SIGTERM/SIGINT stop the workers gracefully, and any worker still running after
+server_graceful_timeout is killed.
+
+Per-process state stays per process. Each worker has its own catalog cache, kept
+coherent by catalog version: a write in one worker reaches the others' caches as soon as
+they read the new version (at once through the event hub poll, at the latest after
+catalog_version_ttl), and they drop the older entries then. The in-memory cart store
+cannot be shared, so more than one worker needs CART_BACKEND=sqlite.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import signal
+import socket
+import time
+from typing import Dict, List, Optional
+
+from .config import settings
+from .startup import logger
+
+# Воркер, умерший быстрее этого, считается упавшим при старте: пауза перед новым fork
+CRASH_BACKOFF_SECONDS = 1.0
+MIN_WORKER_LIFETIME = 5.0
+
+
+def worker_count(requested: Optional[int] = None) -> int:
+    count = settings.server_workers if requested is None else requested
+    return count if count > 0 else os.cpu_count() or 1
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(sock: socket.socket, max_requests: Optional[int]) -> int:
+    import uvicorn
+
+    from .main import app, startup
+
+    # Обработчики мастера не должны срабатывать в воркере; сигналы перехватывает uvicorn
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(sig, signal.SIG_DFL)
+    startup.forked()
+
+    config = uvicorn.Config(
+        app,
+        loop=settings.server_loop,
+        http=settings.server_http,
+        backlog=settings.server_backlog,
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=int(settings.server_graceful_timeout),
+        log_level="info",
+    )
+    # SSE-потоки закрывает само приложение по сигналу выхода (app.events.close_streams_on_signals)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+    return 0 if server.started else 1
+
+
+class Master:
+    """Forks `workers` processes and keeps that many alive until told to stop."""
+
+    def __init__(self, sock: socket.socket, workers: int):
+        self.sock = sock
+        self.workers = workers
+        self.children: Dict[int, float] = {}  # pid -> время запуска
+        self.stop_deadline: Optional[float] = None
+
+    def _max_requests(self) -> Optional[int]:
+        if settings.server_max_requests <= 0:
+            return None
+        return settings.server_max_requests + random.randint(0, max(settings.server_max_requests_jitter, 0))
+
+    def spawn(self) -> None:
+        max_requests = self._max_requests()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = _run_worker(self.sock, max_requests)
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        logger.info("Started worker %s", pid)
+
+    def stop(self, signum: int, frame: object) -> None:
+        if self.stop_deadline is None:
+            logger.info("Shutting down %s workers", len(self.children))
+            self.stop_deadline = time.monotonic() + settings.server_graceful_timeout + 5
+            self._signal_children(signal.SIGTERM)
+
+    def _signal_children(self, signum: int) -> None:
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                self.children.pop(pid, None)
+
+    def _reap(self) -> None:
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                break
+            if pid == 0:
+                break
+            started = self.children.pop(pid, None)
+            if started is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if self.stop_deadline is None:
+                if code == 0:
+                    logger.info("Worker %s exited, starting a replacement", pid)
+                else:
+                    logger.warning("Worker %s exited with code %s", pid, code)
+                    if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                        time.sleep(CRASH_BACKOFF_SECONDS)
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while True:
+            self._reap()
+            if self.stop_deadline is None:
+                while len(self.children) < self.workers:
+                    self.spawn()
+            elif not self.children:
+                return 0
+            elif time.monotonic() > self.stop_deadline:
+                logger.warning("Killing %s workers after the graceful timeout", len(self.children))
+                self._signal_children(signal.SIGKILL)
+                self.stop_deadline = float("inf")
+            time.sleep(0.1)
+
+
+def serve(host: Optional[str] = None, port: Optional[int] = None, workers: Optional[int] = None) -> int:
+    workers = worker_count(workers)
+    if workers > 1 and settings.cart_backend == "memory":
+        raise SystemExit("cart_backend=memory keeps carts inside one process; use CART_BACKEND=sqlite with several workers")
+
+    import logging.config
+
+    from uvicorn.config import LOGGING_CONFIG
+
+    logging.config.dictConfig(LOGGING_CONFIG)
+
+    # Предзагрузка в мастере: импорт, схема, манифест статики и OpenAPI достаются воркерам через fork
+    from .main import app, prepare, startup
+
+    prepare()
+    app.openapi()
+    logger.info(startup.finish())
+
+    sock = bind_socket(host or settings.server_host, port or settings.server_port, settings.server_backlog)
+    logger.info("Listening on %s:%s with %s workers", *sock.getsockname()[:2], workers)
+    try:
+        return Master(sock, workers).run()
+    finally:
+        sock.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the API with preloaded, forked uvicorn workers.")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to Settings.server_workers (0: CPU count)")
+    args = parser.parse_args(argv)
+    return serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,52 +1,93 @@
 from sqlalchemy.orm import Session
-from typing import Dict
+from typing import Dict, Optional
+from ..cart_store import CartOperationError, CartStore, get_cart_store
 from ..repositories.product import ProductRepository
-from ..schemas.cart import CartResponse, CartItem, CartItemCreate, CartItemUpdate
+from ..static_assets import asset_url
+from ..schemas.cart import CartResponse, CartItem, CartItemCreate, CartItemUpdate, CartChangeResponse, CartOperation
 
 from fastapi import HTTPException, status
 
 class CartService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, store: Optional[CartStore] = None):
         self. product_repository = ProductRepository(db)
+        self.store = store if store is not None else get_cart_store(db)
+
+    def _require_cart(self, token: Optional[str]) -> str:
+        if not token or not self.store.exists(token):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Cart not found"
+            )
+        return token
         
-    def add_to_cart(self, cart_data:Dict[int,int], item: CartItemCreate) -> Dict[int,int]:
-        product = self.product_repository.get_by_id(item.product_id)
-        if not product:
+    def add_to_cart(self, token: Optional[str], item: CartItemCreate) -> CartChangeResponse:
+        if not self.product_repository.get_existing_ids([item.product_id]):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Product with id {item.product_id} not found"
             )
-        
-        if item.product_id in cart_data:
-            cart_data[item.product_id] += item.review
-        else:
-            cart_data[item.product_id] = item.review
-            
-        return cart_data
+
+        # Без токена (или с истёкшим) стор сам заводит новую корзину
+        token, review = self.store.add(token, item.product_id, item.review)
+        return CartChangeResponse(
+            token=token, product_id=item.product_id, review=review, items_count=self.store.count(token)
+        )
     
-    def update_cart(self, cart_data:Dict[int,int], item: CartItem) -> Dict[int,int]:
-        if item.product_id not in cart_data:
+    def update_cart(self, token: Optional[str], item: CartItemUpdate) -> CartChangeResponse:
+        token = self._require_cart(token)
+        if not self.store.set(token, item.product_id, item.review):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Product with id {item.product_id} not found"
             )
             
-        cart_data[item.product_id] = item.review
-        return cart_data
+        return CartChangeResponse(
+            token=token, product_id=item.product_id, review=item.review, items_count=self.store.count(token)
+        )
     
-    def remove_from_cart(self, cart_data:Dict[int,int], product_id: int) -> Dict[int,int]:
-        if product_id not in cart_data:
+    def remove_from_cart(self, token: Optional[str], product_id: int) -> CartChangeResponse:
+        token = self._require_cart(token)
+        if not self.store.remove(token, product_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Product with id {product_id} not found"
             )
             
-        del cart_data[product_id]
-        return cart_data
+        return CartChangeResponse(
+            token=token, product_id=product_id, review=None, items_count=self.store.count(token)
+        )
     
-    def get_cart_details(self, cart_data:Dict[int,int]) -> CartResponse:
+    def apply_batch(self, token: Optional[str], operations: list[CartOperation]) -> CartResponse:
+        add_ids = {operation.product_id for operation in operations if operation.op == "add"}
+        missing = sorted(add_ids - self.product_repository.get_existing_ids(add_ids))
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Products with ids {missing} not found"
+            )
+
+        try:
+            # Неизвестный токен: операции проверяются на пустой корзине, новая заводится только при успехе
+            token, cart_data = self.store.apply(
+                token, [(operation.op, operation.product_id, operation.review) for operation in operations]
+            )
+        except CartOperationError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Operation {exc.index}: {exc.message}"
+            )
+
+        return self._build_response(token, cart_data)
+    
+    def get_cart_details(self, token: Optional[str]) -> CartResponse:
+        cart_data = self.store.get(token) if token else None
+        if cart_data is None:
+            return CartResponse(token=None, items=[], items_count=0)
+        return self._build_response(token, cart_data)
+
+    def _build_response(self, token: str, cart_data: Dict[int, int]) -> CartResponse:
         if not cart_data:
-            return CartResponse(items=[], items_count=0)
+            return CartResponse(token=token, items=[], items_count=0)
         
         product_ids = list(cart_data.keys())
         products = self.product_repository.get_multiple_by_ids(product_ids)
@@ -60,9 +101,9 @@ class CartService:
                 product = product_dict[product_id]
                 
                 cart_item = CartItem(product_id=product_id, name=product.name,
-                                     review=product.review, image_url=product.image_url)
+                                     review=review, image_url=asset_url(product.image_url))
                 
                 cart_items.append(cart_item)
                 total_items += 1
         
-        return CartResponse(items=cart_items, items_count=total_items)
\ No newline at end of file
+        return CartResponse(token=token, items=cart_items, items_count=total_items)
\ No newline at end of file
@@ -0,0 +1,66 @@
+from sqlalchemy.orm import Session
+from typing import Dict, List, Tuple
+from ..cache import NullCache
+from ..repositories.catalog_changes import ChangeLogRepository
+from ..repositories.catalog_state import CatalogStateRepository
+from ..repositories.category import CategoryRepository
+from ..repositories.product import ProductRepository
+from ..schemas.catalog import CatalogChangeItem, CatalogChangesResponse, CatalogVersion, ChangeEntity, ChangeOp
+from ..schemas.category import CategoryResponse
+from .product_loader import ProductLoader
+
+class CatalogService:
+    def __init__(self, db: Session):
+        self.state_repository = CatalogStateRepository(db)
+        self.change_repository = ChangeLogRepository(db)
+        self.category_repository = CategoryRepository(db)
+        # Лента изменений отдаёт текущие строки из БД, в одном снимке с журналом: кэш каталога
+        # другого воркера может ещё держать старые товары, а клиент после дельты в них не вернётся
+        self.loader = ProductLoader(ProductRepository(db), NullCache())
+
+    def get_version(self) -> CatalogVersion:
+        return self.state_repository.get()
+
+    def get_changes(self, since: int, limit: int) -> CatalogChangesResponse:
+        """Changes after `since` with the current state of every changed entity embedded."""
+        floor, head = self.change_repository.bounds()
+        # since из будущего означает, что базу подменили (генератор, восстановление): тоже полная пересинхронизация
+        if since < floor or since > head:
+            return CatalogChangesResponse(changes=[], next_since=head, has_more=False, resync_required=True)
+
+        rows = self.change_repository.read(since, limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        # Внутри страницы достаточно последней записи по каждой сущности
+        latest: Dict[Tuple[str, int], object] = {}
+        for row in rows:
+            latest.pop((row.entity, row.entity_id), None)
+            latest[(row.entity, row.entity_id)] = row
+        entries = list(latest.values())
+
+        upserted = {entity: [row.entity_id for row in entries if row.entity == entity.value and row.op == ChangeOp.upsert.value]
+                    for entity in ChangeEntity}
+        products = dict(zip(upserted[ChangeEntity.product], self.loader.load_many(upserted[ChangeEntity.product])))
+        categories = {
+            category.id: CategoryResponse.model_validate(category)
+            for category in self.category_repository.get_multiple_by_ids(upserted[ChangeEntity.category])
+        }
+
+        changes: List[CatalogChangeItem] = []
+        for row in entries:
+            item = CatalogChangeItem(seq=row.seq, entity=row.entity, id=row.entity_id, op=row.op, changed_at=row.changed_at)
+            if item.op is ChangeOp.upsert:
+                if item.entity is ChangeEntity.product:
+                    item.product = products.get(row.entity_id)
+                else:
+                    item.category = categories.get(row.entity_id)
+                # Сущность удалили после этой записи, а удаление ещё не в журнале: отдаём как delete
+                if item.product is None and item.category is None:
+                    item.op = ChangeOp.delete
+            changes.append(item)
+
+        return CatalogChangesResponse(
+            changes=changes,
+            next_since=rows[-1].seq if rows else since,
+            has_more=has_more,
+        )
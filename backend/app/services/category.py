@@ -1,27 +1,104 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from ..repositories.category import CategoryRepository
-from ..schemas.category import CategoryResponse, CategoryCreate
+from typing import List, Optional
+from pydantic import TypeAdapter
+from ..cache import get_catalog_cache
+from ..events import notify_catalog_changed
+from ..repositories.category import AsyncCategoryRepository, CategoryRepository
+from ..schemas.category import CategoryResponse, CategoryCreate, CategoryRow
 from fastapi import HTTPException, status
 
+_CATEGORY_ROWS = TypeAdapter(list[CategoryRow])
+
+def _category_rows_json(rows) -> bytes:
+    return _CATEGORY_ROWS.dump_json([{"name": row.name, "slug": row.slug, "id": row.id} for row in rows])
+
+def _category_not_found(category_id: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Category with id {category_id} not found"
+    )
+
 class CategoryService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, cache=None):
         self.repository = CategoryRepository(db)
+        self.cache = cache if cache is not None else get_catalog_cache()
 
     def get_all_categories(self) -> List[CategoryResponse]:
+        cached: Optional[List[CategoryResponse]] = self.cache.get(("categories",))
+        if cached is not None:
+            return cached
+
         catigories = self.repository.get_all()
-        return [CategoryResponse.model_validate(category) for category in catigories]
+        response = [CategoryResponse.model_validate(category) for category in catigories]
+        self.cache.set(("categories",), response)
+        return response
+    
+    def get_all_categories_json(self) -> bytes:
+        """Fast read path: the category list as ready JSON bytes, built from column tuples."""
+        cached: Optional[bytes] = self.cache.get(("categories", "json"))
+        if cached is not None:
+            return cached
+
+        response = _category_rows_json(self.repository.get_all_rows())
+        self.cache.set(("categories", "json"), response)
+        return response
     
     def get_category_by_id(self, category_id: int) -> CategoryResponse:
+        cached: Optional[CategoryResponse] = self.cache.get(("category", category_id))
+        if cached is not None:
+            return cached
+
         category = self.repository.get_by_id(category_id)
         if not category:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Category with id {category_id} not found"
-            )
-            
-        return CategoryResponse.model_validate(category)
+            raise _category_not_found(category_id)
+
+        response = CategoryResponse.model_validate(category)
+        self.cache.set(("category", category_id), response)
+        return response
     
     def create_category(self, category_data: CategoryCreate) -> CategoryResponse:
         category = self.repository.create(category_data)
-        return CategoryResponse.model_validate(category)
\ No newline at end of file
+        # Новая категория меняет только общий список; закэшированные категории по id остаются верными
+        self.cache.invalidate_prefix(("categories",))
+        notify_catalog_changed()
+        return CategoryResponse.model_validate(category)
+
+
+class AsyncCategoryService:
+    """Read API of CategoryService for db_mode=async, on AsyncCategoryRepository."""
+
+    def __init__(self, db: AsyncSession, cache=None):
+        self.repository = AsyncCategoryRepository(db)
+        self.cache = cache if cache is not None else get_catalog_cache()
+
+    async def get_all_categories(self) -> List[CategoryResponse]:
+        cached: Optional[List[CategoryResponse]] = self.cache.get(("categories",))
+        if cached is not None:
+            return cached
+
+        response = [CategoryResponse.model_validate(category) for category in await self.repository.get_all()]
+        self.cache.set(("categories",), response)
+        return response
+
+    async def get_all_categories_json(self) -> bytes:
+        cached: Optional[bytes] = self.cache.get(("categories", "json"))
+        if cached is not None:
+            return cached
+
+        response = _category_rows_json(await self.repository.get_all_rows())
+        self.cache.set(("categories", "json"), response)
+        return response
+
+    async def get_category_by_id(self, category_id: int) -> CategoryResponse:
+        cached: Optional[CategoryResponse] = self.cache.get(("category", category_id))
+        if cached is not None:
+            return cached
+
+        category = await self.repository.get_by_id(category_id)
+        if not category:
+            raise _category_not_found(category_id)
+
+        response = CategoryResponse.model_validate(category)
+        self.cache.set(("category", category_id), response)
+        return response
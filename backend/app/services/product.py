@@ -1,49 +1,410 @@
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from ..repositories.product import ProductRepository
-from ..repositories.category import CategoryRepository
-from ..schemas.product import ProductResponse, ProductListResponse, ProductCreate
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+from pydantic import TypeAdapter
+from ..cache import get_catalog_cache
+from ..config import settings
+from ..events import notify_catalog_changed
+from ..pagination import CountStrategy, InvalidCursorError, ProductSort, decode_cursor, encode_cursor
+from ..projection import ProductProjection
+from ..repositories.product import AsyncProductRepository, ProductRepository
+from ..repositories.category import AsyncCategoryRepository, CategoryRepository
+from ..schemas.product import (
+    ProductBatchItem, ProductBatchResponse, ProductResponse, ProductListResponse, ProductListRows, ProductRow,
+    ProductCreate, ProductSearchResponse, SparseProductListRows, SparseProductRow,
+)
+from ..search import query_tokens
+from .product_loader import AsyncProductLoader, ProductLoader
+from ..static_assets import get_asset_manifest
 from fastapi import HTTPException, status
 
+_PRODUCT_LIST_ROWS = TypeAdapter(ProductListRows)
+_SPARSE_PRODUCT_LIST_ROWS = TypeAdapter(SparseProductListRows)
+
+def _product_rows(rows) -> List[ProductRow]:
+    image = get_asset_manifest().url
+    # Распаковка кортежа заметно дешевле доступа к полям Row по имени
+    return [
+        {
+            "name": name,
+            "description": description,
+            "category_id": category_id,
+            "image_url": image(image_url),
+            "id": id_,
+            "created_at": created_at,
+            "category": {"name": category_name, "slug": category_slug, "id": category_id},
+        }
+        for id_, name, description, category_id, image_url, created_at, category_name, category_slug in rows
+    ]
+
+def _sparse_product_rows(rows, projection: ProductProjection) -> List[SparseProductRow]:
+    image = get_asset_manifest().url
+    names = [field.value for field in projection.fields]
+    products = []
+    for row in rows:
+        values = row._mapping
+        product = {name: values[name] for name in names}
+        if "image_url" in product:
+            product["image_url"] = image(product["image_url"])
+        if projection.category:
+            product["category"] = {"name": values["category_name"], "slug": values["category_slug"], "id": values["category_id"]}
+        products.append(product)
+    return products
+
+def _page_args(limit: Optional[int], cursor: Optional[str], sort: ProductSort) -> Tuple[int, Optional[Tuple[Any, int]]]:
+    limit = min(limit or settings.products_page_size, settings.products_max_page_size)
+    if not cursor:
+        return limit, None
+    try:
+        return limit, decode_cursor(cursor, sort)
+    except InvalidCursorError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+
+def _trim_page(items: list, limit: int, sort: ProductSort) -> Tuple[list, Optional[str]]:
+    # Запрос берёт limit + 1 строк: лишняя строка означает, что есть следующая страница
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor(sort, getattr(last, sort.field), last.id)
+
+def _count_plan(count: Optional[CountStrategy], category_id: Optional[int], name_prefix: Optional[str]) -> Optional[str]:
+    """How to compute `total`: None (omit), "estimate" (max id) or "count" (with the cap in _count_cap)."""
+    count = count or CountStrategy(settings.products_count_strategy)
+    if count is CountStrategy.none:
+        return None
+    if count is CountStrategy.estimated and category_id is None and not name_prefix:
+        return "estimate"
+    return "count"
+
+def _count_cap(count: Optional[CountStrategy]) -> Optional[int]:
+    count = count or CountStrategy(settings.products_count_strategy)
+    return None if count is CountStrategy.exact else settings.products_count_estimate_cap
+
+def _list_json(rows, projection: Optional[ProductProjection], total: Optional[int], next_cursor: Optional[str]) -> bytes:
+    if projection is not None:
+        return _SPARSE_PRODUCT_LIST_ROWS.dump_json({
+            "products": _sparse_product_rows(rows, projection),
+            "total": total,
+            "next_cursor": next_cursor,
+        })
+    return _PRODUCT_LIST_ROWS.dump_json({
+        "products": _product_rows(rows),
+        "total": total,
+        "next_cursor": next_cursor,
+    })
+
+def _category_key(build: str, category_id: int, params: dict) -> tuple:
+    return (
+        "products_by_category", category_id, build,
+        params["limit"], params["cursor"], params["sort"].value, params["name_prefix"],
+        params["count"] and params["count"].value,
+        params.get("projection") and params["projection"].key,
+    )
+
+def _batch_response(product_ids: List[int], products: List[Optional[ProductResponse]]) -> ProductBatchResponse:
+    return ProductBatchResponse(
+        items=[
+            ProductBatchItem(id=product_id, found=product is not None, product=product)
+            for product_id, product in zip(product_ids, products)
+        ],
+        missing=list(dict.fromkeys(
+            product_id for product_id, product in zip(product_ids, products) if product is None
+        )),
+    )
+
+def _product_not_found(product_id: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Product with id {product_id} not found"
+    )
+
+def _category_not_found(category_id: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Category with id {category_id} not found"
+    )
+
 class ProductService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, cache=None):
         self.product_repository = ProductRepository(db)
         self.category_repository = CategoryRepository(db)
+        self.cache = cache if cache is not None else get_catalog_cache()
+        # Сервис создаётся на запрос, значит и загрузчик живёт ровно один запрос
+        self.loader = ProductLoader(self.product_repository, self.cache)
         
-    def get_all_products(self) -> ProductListResponse:
-        products = self.product_repository.get_all()
+    def get_all_products(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        sort: ProductSort = ProductSort.id,
+        category_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+        count: Optional[CountStrategy] = None,
+    ) -> ProductListResponse:
+        limit, after = _page_args(limit, cursor, sort)
+        products = self.product_repository.get_page(
+            limit + 1, sort=sort, after=after, category_id=category_id, name_prefix=name_prefix
+        )
+        products, next_cursor = _trim_page(products, limit, sort)
+
         products_response = [ProductResponse.model_validate(product) for product in products]
-        return ProductListResponse(products=products_response, total=len(products_response))
+        return ProductListResponse(
+            products=products_response,
+            total=self._count(count, category_id, name_prefix),
+            next_cursor=next_cursor,
+        )
+
+    def get_all_products_json(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        sort: ProductSort = ProductSort.id,
+        category_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+        count: Optional[CountStrategy] = None,
+        projection: Optional[ProductProjection] = None,
+    ) -> bytes:
+        """Fast read path: same JSON as get_all_products, built from column tuples without validation.
+
+        With a projection only its columns are selected (SparseProductListResponse shape).
+        """
+        limit, after = _page_args(limit, cursor, sort)
+        if projection is not None:
+            rows = self.product_repository.get_page_projection(
+                limit + 1, projection, sort=sort, after=after, category_id=category_id, name_prefix=name_prefix
+            )
+        else:
+            rows = self.product_repository.get_page_rows(
+                limit + 1, sort=sort, after=after, category_id=category_id, name_prefix=name_prefix
+            )
+        rows, next_cursor = _trim_page(rows, limit, sort)
+        return _list_json(rows, projection, self._count(count, category_id, name_prefix), next_cursor)
+
+    def _count(self, count: Optional[CountStrategy], category_id: Optional[int], name_prefix: Optional[str]) -> Optional[int]:
+        plan = _count_plan(count, category_id, name_prefix)
+        if plan is None:
+            return None
+        if plan == "estimate":
+            return self.product_repository.estimate_total()
+        return self.product_repository.count(category_id=category_id, name_prefix=name_prefix, cap=_count_cap(count))
+    
+    def search_products(self, q: str, limit: Optional[int] = None, offset: int = 0) -> ProductSearchResponse:
+        tokens = query_tokens(q)
+        if not tokens:
+            return ProductSearchResponse(products=[], next_offset=None)
+
+        limit = min(limit or settings.products_page_size, settings.products_max_page_size)
+        products = self.product_repository.search(tokens, limit + 1, offset)
+        next_offset = None
+        if len(products) > limit:
+            products = products[:limit]
+            next_offset = offset + limit
+
+        return ProductSearchResponse(
+            products=[ProductResponse.model_validate(product) for product in products],
+            next_offset=next_offset,
+        )
     
     def get_product_by_id(self, product_id: int) -> ProductResponse:
-        product = self.product_repository.get_by_id(product_id)
+        product = self.loader.load(product_id)
         if not product:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Product with id {product_id} not found"
-            )
-        
-        return ProductResponse.model_validate(product)
+            raise _product_not_found(product_id)
+        return product
+
+    def get_products_by_ids(self, product_ids: List[int]) -> ProductBatchResponse:
+        """Multi-get: one IN query for every id not cached, results in request order."""
+        return _batch_response(product_ids, self.loader.load_many(product_ids))
     
-    def get_products_by_category(self, category_id: int) -> ProductListResponse:
-        category = self.category_repository.get_by_id(category_id)
-        if not category:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Category with id {category_id} not found"
-            )
-        
-        products = self.product_repository.get_by_category(category_id)
-        products_response = [ProductResponse.model_validate(product) for product in products]
-        return ProductListResponse(products=products_response, total=len(products_response))
+    def get_products_by_category(
+        self,
+        category_id: int,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        sort: ProductSort = ProductSort.id,
+        name_prefix: Optional[str] = None,
+        count: Optional[CountStrategy] = None,
+    ) -> ProductListResponse:
+        return self._category_page(
+            self.get_all_products, category_id,
+            limit=limit, cursor=cursor, sort=sort, name_prefix=name_prefix, count=count,
+        )
+
+    def get_products_by_category_json(
+        self,
+        category_id: int,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        sort: ProductSort = ProductSort.id,
+        name_prefix: Optional[str] = None,
+        count: Optional[CountStrategy] = None,
+        projection: Optional[ProductProjection] = None,
+    ) -> bytes:
+        return self._category_page(
+            self.get_all_products_json, category_id,
+            limit=limit, cursor=cursor, sort=sort, name_prefix=name_prefix, count=count, projection=projection,
+        )
+
+    def _category_page(self, build: Callable[..., Any], category_id: int, **params: Any) -> Any:
+        key = _category_key(build.__name__, category_id, params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        if not self.category_repository.get_by_id(category_id):
+            raise _category_not_found(category_id)
+
+        response = build(category_id=category_id, **params)
+        self.cache.set(key, response)
+        return response
     
     def create_product(self, product_data: ProductCreate) -> ProductResponse:
-        category = self.category_repository.get_by_id(product_data.category_id)
-        if not category:
+        if not self.category_repository.get_by_id(product_data.category_id):
+            raise _category_not_found(product_data.category_id)
+
+        try:
+            product = self.product_repository.create(product_data)
+        except IntegrityError:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Category with id {product_data.category_id} not found"
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Product with name {product_data.name!r} already exists"
             )
-        
-        product = self.product_repository.create(product_data)
+        # Новый товар меняет только страницы своей категории
+        self.cache.invalidate_prefix(("products_by_category", product.category_id))
+        notify_catalog_changed()
         return ProductResponse.model_validate(product)
+
+
+class AsyncProductService:
+    """Read API of ProductService for db_mode=async, on AsyncProductRepository.
+
+    Methods and results match ProductService one for one; helpers that do no I/O are shared.
+    """
+
+    def __init__(self, db: AsyncSession, cache=None):
+        self.product_repository = AsyncProductRepository(db)
+        self.category_repository = AsyncCategoryRepository(db)
+        self.cache = cache if cache is not None else get_catalog_cache()
+        self.loader = AsyncProductLoader(self.product_repository, self.cache)
+
+    async def get_all_products(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        sort: ProductSort = ProductSort.id,
+        category_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+        count: Optional[CountStrategy] = None,
+    ) -> ProductListResponse:
+        limit, after = _page_args(limit, cursor, sort)
+        products = await self.product_repository.get_page(
+            limit + 1, sort=sort, after=after, category_id=category_id, name_prefix=name_prefix
+        )
+        products, next_cursor = _trim_page(products, limit, sort)
+        return ProductListResponse(
+            products=[ProductResponse.model_validate(product) for product in products],
+            total=await self._count(count, category_id, name_prefix),
+            next_cursor=next_cursor,
+        )
+
+    async def get_all_products_json(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        sort: ProductSort = ProductSort.id,
+        category_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+        count: Optional[CountStrategy] = None,
+        projection: Optional[ProductProjection] = None,
+    ) -> bytes:
+        limit, after = _page_args(limit, cursor, sort)
+        if projection is not None:
+            rows = await self.product_repository.get_page_projection(
+                limit + 1, projection, sort=sort, after=after, category_id=category_id, name_prefix=name_prefix
+            )
+        else:
+            rows = await self.product_repository.get_page_rows(
+                limit + 1, sort=sort, after=after, category_id=category_id, name_prefix=name_prefix
+            )
+        rows, next_cursor = _trim_page(rows, limit, sort)
+        return _list_json(rows, projection, await self._count(count, category_id, name_prefix), next_cursor)
+
+    async def _count(self, count: Optional[CountStrategy], category_id: Optional[int], name_prefix: Optional[str]) -> Optional[int]:
+        plan = _count_plan(count, category_id, name_prefix)
+        if plan is None:
+            return None
+        if plan == "estimate":
+            return await self.product_repository.estimate_total()
+        return await self.product_repository.count(category_id=category_id, name_prefix=name_prefix, cap=_count_cap(count))
+
+    async def search_products(self, q: str, limit: Optional[int] = None, offset: int = 0) -> ProductSearchResponse:
+        tokens = query_tokens(q)
+        if not tokens:
+            return ProductSearchResponse(products=[], next_offset=None)
+
+        limit = min(limit or settings.products_page_size, settings.products_max_page_size)
+        products = await self.product_repository.search(tokens, limit + 1, offset)
+        next_offset = None
+        if len(products) > limit:
+            products = products[:limit]
+            next_offset = offset + limit
+
+        return ProductSearchResponse(
+            products=[ProductResponse.model_validate(product) for product in products],
+            next_offset=next_offset,
+        )
+
+    async def get_product_by_id(self, product_id: int) -> ProductResponse:
+        product = await self.loader.load(product_id)
+        if not product:
+            raise _product_not_found(product_id)
+        return product
+
+    async def get_products_by_ids(self, product_ids: List[int]) -> ProductBatchResponse:
+        return _batch_response(product_ids, await self.loader.load_many(product_ids))
+
+    async def get_products_by_category(
+        self,
+        category_id: int,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        sort: ProductSort = ProductSort.id,
+        name_prefix: Optional[str] = None,
+        count: Optional[CountStrategy] = None,
+    ) -> ProductListResponse:
+        return await self._category_page(
+            self.get_all_products, category_id,
+            limit=limit, cursor=cursor, sort=sort, name_prefix=name_prefix, count=count,
+        )
+
+    async def get_products_by_category_json(
+        self,
+        category_id: int,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        sort: ProductSort = ProductSort.id,
+        name_prefix: Optional[str] = None,
+        count: Optional[CountStrategy] = None,
+        projection: Optional[ProductProjection] = None,
+    ) -> bytes:
+        return await self._category_page(
+            self.get_all_products_json, category_id,
+            limit=limit, cursor=cursor, sort=sort, name_prefix=name_prefix, count=count, projection=projection,
+        )
+
+    async def _category_page(self, build: Callable[..., Awaitable[Any]], category_id: int, **params: Any) -> Any:
+        key = _category_key(build.__name__, category_id, params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        if not await self.category_repository.get_by_id(category_id):
+            raise _category_not_found(category_id)
+
+        response = await build(category_id=category_id, **params)
+        self.cache.set(key, response)
+        return response
@@ -0,0 +1,91 @@
+from typing import Dict, Iterable, List, Optional
+from ..repositories.product import AsyncProductRepository, ProductRepository
+from ..schemas.category import CategoryResponse
+from ..schemas.product import ProductResponse
+
+
+class _LoaderState:
+    """Bookkeeping shared by the sync and async loaders: pending ids, loaded products, cache lookups."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._pending: Dict[int, None] = {}  # упорядоченное множество id до следующего запроса
+        self._loaded: Dict[int, Optional[ProductResponse]] = {}
+        self._categories: Dict[int, CategoryResponse] = {}
+        self.batches = 0
+
+    def prime(self, product_ids: Iterable[int]) -> None:
+        for product_id in product_ids:
+            if product_id not in self._loaded:
+                self._pending[product_id] = None
+
+    def _take_missing(self) -> List[int]:
+        """Pending ids that the catalog cache does not hold; those go to the database."""
+        product_ids, self._pending = list(self._pending), {}
+        missing = []
+        for product_id in product_ids:
+            cached: Optional[ProductResponse] = self.cache.get(("product", product_id))
+            if cached is not None:
+                self._loaded[product_id] = cached
+            else:
+                missing.append(product_id)
+        if missing:
+            self.batches += 1
+        return missing
+
+    def _store(self, missing: List[int], products) -> None:
+        for product in products:
+            response = ProductResponse.model_validate(product)
+            response.category = self._categories.setdefault(response.category.id, response.category)
+            self._loaded[product.id] = response
+            self.cache.set(("product", product.id), response)
+        for product_id in missing:
+            self._loaded.setdefault(product_id, None)
+
+    def _results(self, product_ids: List[int]) -> List[Optional[ProductResponse]]:
+        return [self._loaded[product_id] for product_id in product_ids]
+
+
+class ProductLoader(_LoaderState):
+    """Request-scoped, DataLoader-style batcher over ProductRepository.get_multiple_by_ids.
+
+    Ids queued with prime() are fetched together on the next load()/load_many(), in a
+    single IN query; ids already loaded in this request, or held in the catalog cache
+    under the same ("product", id) key as get_product_by_id, are not queried again.
+    Products of one category share a single CategoryResponse instance.
+    """
+
+    def __init__(self, repository: ProductRepository, cache):
+        super().__init__(cache)
+        self.repository = repository
+
+    def load(self, product_id: int) -> Optional[ProductResponse]:
+        return self.load_many([product_id])[0]
+
+    def load_many(self, product_ids: List[int]) -> List[Optional[ProductResponse]]:
+        """Products in the order of `product_ids` (duplicates included), None where an id does not exist."""
+        self.prime(product_ids)
+        if self._pending:
+            missing = self._take_missing()
+            if missing:
+                self._store(missing, self.repository.get_multiple_by_ids(missing))
+        return self._results(product_ids)
+
+
+class AsyncProductLoader(_LoaderState):
+    """ProductLoader over AsyncProductRepository (db_mode=async)."""
+
+    def __init__(self, repository: AsyncProductRepository, cache):
+        super().__init__(cache)
+        self.repository = repository
+
+    async def load(self, product_id: int) -> Optional[ProductResponse]:
+        return (await self.load_many([product_id]))[0]
+
+    async def load_many(self, product_ids: List[int]) -> List[Optional[ProductResponse]]:
+        self.prime(product_ids)
+        if self._pending:
+            missing = self._take_missing()
+            if missing:
+                self._store(missing, await self.repository.get_multiple_by_ids(missing))
+        return self._results(product_ids)
@@ -0,0 +1,94 @@
+from sqlalchemy.orm import sessionmaker
+from typing import Any, Iterator, Optional, Tuple
+from pydantic import TypeAdapter
+from ..config import settings
+from ..database import ReadSessionLocal
+from ..pagination import InvalidCursorError, ProductSort, decode_cursor
+from ..repositories.category import CategoryRepository
+from ..repositories.product import ProductRepository
+from ..schemas.product import ProductResponse
+from fastapi import HTTPException, status
+
+_PRODUCTS_ADAPTER = TypeAdapter(list[ProductResponse])
+
+class ProductStreamService:
+    """Incremental JSON/NDJSON serialization of product listings.
+
+    The stream reads keyset pages of stream_batch_size products, each in its own short
+    Session: a reader connection is checked out only while a batch is fetched, never
+    while the client downloads, so slow clients cannot drain the reader pool. Batches
+    are separate reads, so a product changed mid-stream may show its new values; the
+    keyset keeps the order and never repeats an id. One batch is held in memory.
+    """
+
+    def __init__(self, session_factory: sessionmaker = ReadSessionLocal):
+        self.session_factory = session_factory
+
+    def open(
+        self,
+        ndjson: bool = False,
+        cursor: Optional[str] = None,
+        sort: ProductSort = ProductSort.id,
+        category_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+        limit: Optional[int] = None,
+        require_category: bool = False,
+    ) -> Iterator[bytes]:
+        """Validate eagerly (so errors are still proper 4xx responses) and return the body iterator."""
+        try:
+            after = decode_cursor(cursor, sort) if cursor else None
+        except InvalidCursorError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(exc)
+            )
+
+        if require_category:
+            with self.session_factory() as db:
+                if not CategoryRepository(db).get_by_id(category_id):
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Category with id {category_id} not found"
+                    )
+
+        batches = self._batches(sort, after, category_id, name_prefix, limit)
+        return self._ndjson(batches) if ndjson else self._json(batches)
+
+    def _batches(
+        self,
+        sort: ProductSort,
+        after: Optional[Tuple[Any, int]],
+        category_id: Optional[int],
+        name_prefix: Optional[str],
+        limit: Optional[int],
+    ) -> Iterator[list[ProductResponse]]:
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = settings.stream_batch_size if remaining is None else min(settings.stream_batch_size, remaining)
+            with self.session_factory() as db:
+                products = ProductRepository(db).get_page(
+                    size, sort=sort, after=after, category_id=category_id, name_prefix=name_prefix
+                )
+                batch = [ProductResponse.model_validate(product) for product in products]
+                if products:
+                    after = (getattr(products[-1], sort.field), products[-1].id)
+            if batch:
+                yield batch
+            if len(batch) < size:
+                return
+            if remaining is not None:
+                remaining -= len(batch)
+
+    def _json(self, batches: Iterator[list[ProductResponse]]) -> Iterator[bytes]:
+        yield b'{"products":['
+        first = True
+        for batch in batches:
+            # dump_json всего батча и срез скобок: одна сериализация на батч, а не на строку
+            body = _PRODUCTS_ADAPTER.dump_json(batch)[1:-1]
+            yield body if first else b"," + body
+            first = False
+        yield b'],"total":null,"next_cursor":null}'
+
+    def _ndjson(self, batches: Iterator[list[ProductResponse]]) -> Iterator[bytes]:
+        for batch in batches:
+            yield b"".join(product.model_dump_json().encode() + b"\n" for product in batch)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Concatenate, Generic, Optional, ParamSpec, Type, TypeVar
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ..config import settings
+from ..database import get_async_read_db, get_db, get_read_db
+
+S = TypeVar("S")
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+class ThreadpoolServiceRunner(Generic[S]):
+    """Runs calls of a sync service on a worker thread with a regular Session.
+
+    Query execution, ORM hydration and Pydantic validation all happen off the event loop.
+    With `release_session` (reader sessions) the read transaction ends after every call,
+    so the connection goes back to the pool instead of staying checked out until the
+    response is sent.
+    """
+
+    def __init__(self, service: S, release_session: Optional[Session] = None):
+        self._service = service
+        self._release_session = release_session
+
+    async def call(self, method: Callable[Concatenate[S, P], R], *args: P.args, **kwargs: P.kwargs) -> R:
+        """`await runner.call(Service.method, ...)`: the typed way to call the service."""
+        def invoke() -> R:
+            try:
+                return method(self._service, *args, **kwargs)
+            finally:
+                if self._release_session is not None:
+                    self._release_session.commit()
+
+        return await run_in_threadpool(invoke)
+
+    def __getattr__(self, name: str) -> Callable[..., Awaitable[Any]]:
+        # Фасад с интерфейсом async-сервиса: service.method(...) -> корутина, см. service_dependency
+        method = getattr(type(self._service), name)
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await self.call(method, *args, **kwargs)
+
+        return call
+
+
+def _public_methods(cls: Type[Any]) -> set:
+    return {name for name in vars(cls) if not name.startswith("_") and callable(getattr(cls, name))}
+
+
+def service_dependency(
+    service_cls: Type[S],
+    write: bool = False,
+    async_service_cls: Optional[Type[Any]] = None,
+) -> Callable[..., Any]:
+    """FastAPI dependency that yields a service for the configured db_mode.
+
+    Read-only routes get a session from the query_only reader pool; pass `write=True`
+    for routes that modify data so they go through the serialized writer.
+
+    Without `async_service_cls` the dependency yields ThreadpoolServiceRunner[service_cls];
+    call it with `await runner.call(Service.method, ...)`. With `async_service_cls` (the
+    native async read API of the same service) it yields an object with that class's
+    interface: the class itself on an AsyncSession under db_mode=async, otherwise the
+    runner's facade, whose methods return coroutines that run the sync methods of the
+    same names on a worker thread. Annotate the parameter with `async_service_cls`.
+
+    Reader connections are returned to the pool after each threadpool call: a request that
+    holds one while waiting (for a coalesced leader, for a threadpool slot) would otherwise
+    starve the requests that need it, and past db_read_pool_size concurrent requests the
+    process stalls until db_pool_timeout. An AsyncSession checks a connection out only at
+    its first query and never waits for a thread while holding it.
+    """
+    if async_service_cls is not None:
+        missing = _public_methods(async_service_cls) - _public_methods(service_cls)
+        assert not missing, f"{service_cls.__name__} lacks {sorted(missing)} of {async_service_cls.__name__}"
+
+    get_session = get_db if write else get_read_db
+
+    if async_service_cls is not None and settings.db_mode == "async" and not write:
+        async def get_service(db: AsyncSession = Depends(get_async_read_db)) -> Any:
+            return async_service_cls(db)
+    else:
+        async def get_service(db: Session = Depends(get_session)) -> ThreadpoolServiceRunner[S]:
+            return ThreadpoolServiceRunner(service_cls(db), release_session=None if write else db)
+
+    get_service.__name__ = f"get_{service_cls.__name__}{'_writer' if write else ''}"
+    return get_service
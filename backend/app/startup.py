@@ -0,0 +1,105 @@
+"""Boot-time bookkeeping: per-phase startup timings and the on-disk OpenAPI schema cache."""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+# Логгер uvicorn: сообщение о времени старта выводится рядом с «Application startup complete»
+logger = logging.getLogger("uvicorn.error")
+
+APP_DIR = Path(__file__).resolve().parent
+
+
+class StartupTimer:
+    """Wall-clock time of named startup phases, measured from `started`."""
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = time.perf_counter() if started is None else started
+        self.phases: Dict[str, float] = {}
+        self.total: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        phase_started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - phase_started
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = seconds
+
+    def forked(self) -> None:
+        """Restart timing in a prefork worker; the master's phases were already reported by the master."""
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.total = None
+
+    def finish(self) -> str:
+        """Fix the total boot time and return a one-line report."""
+        self.total = time.perf_counter() - self.started
+        phases = ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in self.phases.items())
+        return f"Startup took {self.total * 1000:.1f} ms" + (f" ({phases})" if phases else "")
+
+    def gauges(self) -> Iterable[Tuple[Dict[str, str], float]]:
+        for name, seconds in self.phases.items():
+            yield {"phase": name}, seconds
+        if self.total is not None:
+            yield {"phase": "total"}, self.total
+
+
+def _openapi_key(app: Any) -> str:
+    # Схема — функция кода приложения, настроек (лимиты в Query, описания, подключённые роутеры)
+    # и версий FastAPI/pydantic; исходники читаются за пару миллисекунд
+    import fastapi
+    import pydantic
+
+    from .config import settings
+
+    digest = hashlib.sha256()
+    digest.update(f"{fastapi.__version__}|{pydantic.__version__}|{app.title}|{app.version}|{app.openapi_url}".encode())
+    digest.update(settings.model_dump_json().encode())
+    for path in sorted(APP_DIR.rglob("*.py")):
+        digest.update(path.relative_to(APP_DIR).as_posix().encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def cached_openapi(app: Any, cache_file: Path) -> Callable[[], Dict[str, Any]]:
+    """Replacement for `app.openapi` that reuses a schema generated by an earlier process.
+
+    The cache is keyed by a hash of the application sources and settings, so any code or
+    config change regenerates it; an unreadable or stale file is simply rebuilt.
+    """
+    generate = app.openapi
+
+    def openapi() -> Dict[str, Any]:
+        if app.openapi_schema is not None:
+            return app.openapi_schema
+        key = _openapi_key(app)
+        try:
+            cached = json.loads(cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            cached = None
+        if isinstance(cached, dict) and cached.get("key") == key:
+            app.openapi_schema = cached["schema"]
+            return app.openapi_schema
+
+        schema = generate()
+        # Запись через временный файл: параллельно стартующие воркеры не увидят половину JSON
+        partial = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        try:
+            partial.write_text(json.dumps({"key": key, "schema": schema}, ensure_ascii=False), encoding="utf-8")
+            partial.replace(cache_file)
+        except OSError:
+            logger.warning("Could not write the OpenAPI cache to %s", cache_file)
+            partial.unlink(missing_ok=True)
+        return schema
+
+    return openapi
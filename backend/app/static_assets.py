@@ -0,0 +1,254 @@
+"""Fingerprinted, precompressed static assets.
+
+`build_manifest()` hashes every file under the static directory, writes `.gz` siblings for
+compressible ones and stores the result in `manifest.json`. URLs in API responses are
+rewritten to `name.<digest>.ext`; those paths never change content, so `AssetFiles` serves
+them with `Cache-Control: immutable`. Plain paths keep working and are revalidated.
+
+    uv run python -m app.static_assets   # build step, e.g. in the image build
+
+The app only reads the manifest at startup. Without one, URLs stay plain until the build
+step runs (or static_manifest_rebuild is set, for development).
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import stat
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+DIGEST_LENGTH = 12
+COMPRESSIBLE_SUFFIXES = frozenset({
+    ".css", ".csv", ".html", ".js", ".json", ".map", ".mjs", ".svg", ".txt", ".wasm", ".xml",
+})
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"
+
+_FINGERPRINT_RE = re.compile(rf"^(?P<stem>.+)\.(?P<digest>[0-9a-f]{{{DIGEST_LENGTH}}})(?P<suffix>\.[^./]+)$")
+
+
+@dataclass(frozen=True)
+class Asset:
+    path: str
+    fingerprinted: str
+    digest: str
+    size: int
+    gzip: bool = False
+
+
+class AssetManifest:
+    """Logical path -> fingerprinted path map for files under one static directory."""
+
+    def __init__(self, assets: Optional[Dict[str, Asset]] = None, url_prefix: str = "/static"):
+        self.assets = assets or {}
+        self.url_prefix = url_prefix.rstrip("/") + "/"
+        self.by_fingerprint = {asset.fingerprinted: asset for asset in self.assets.values()}
+        combined = hashlib.sha256()
+        for path in sorted(self.assets):
+            combined.update(f"{path}:{self.assets[path].digest};".encode())
+        # Меняется при замене любого файла; участвует в ETag ответов со ссылками на ассеты
+        self.digest = combined.hexdigest()[:8] if self.assets else ""
+
+    def url(self, url: Optional[str]) -> Optional[str]:
+        """Rewrite `/static/<path>` to its fingerprinted URL; unknown URLs are returned unchanged."""
+        if not url or not url.startswith(self.url_prefix):
+            return url
+        asset = self.assets.get(url[len(self.url_prefix):])
+        return self.url_prefix + asset.fingerprinted if asset is not None else url
+
+    def dump(self, path: Path) -> None:
+        payload = {"assets": [asdict(asset) for asset in sorted(self.assets.values(), key=lambda a: a.path)]}
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(payload, indent=1, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path, url_prefix: str = "/static") -> "AssetManifest":
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        return cls({item["path"]: Asset(**item) for item in payload["assets"]}, url_prefix)
+
+
+def _fingerprint(path: str, digest: str) -> str:
+    stem, dot, suffix = path.rpartition(".")
+    if not dot or "/" in suffix:
+        return f"{path}.{digest}"
+    return f"{stem}.{digest}.{suffix}"
+
+
+def _precompress(source: Path, min_size: int, level: int) -> bool:
+    """Keep `source.gz` in sync with `source`; False when compression is not worth it."""
+    target = source.with_name(source.name + ".gz")
+    size = source.stat().st_size
+    if source.suffix.lower() not in COMPRESSIBLE_SUFFIXES or size < min_size:
+        target.unlink(missing_ok=True)
+        return False
+    if not target.exists() or target.stat().st_mtime < source.stat().st_mtime:
+        # mtime=0: одинаковое содержимое даёт побайтно одинаковый .gz
+        target.write_bytes(gzip.compress(source.read_bytes(), compresslevel=level, mtime=0))
+    if target.stat().st_size >= size * 0.9:
+        target.unlink()
+        return False
+    return True
+
+
+def build_manifest(
+    static_dir: Path,
+    url_prefix: str = "/static",
+    gzip_min_size: Optional[int] = None,
+    gzip_level: Optional[int] = None,
+) -> AssetManifest:
+    """Hash and precompress every file under `static_dir` and write `manifest.json` there."""
+    gzip_min_size = settings.static_gzip_min_size if gzip_min_size is None else gzip_min_size
+    gzip_level = settings.static_gzip_level if gzip_level is None else gzip_level
+
+    assets: Dict[str, Asset] = {}
+    for source in sorted(static_dir.rglob("*")):
+        relative = source.relative_to(static_dir).as_posix()
+        if (
+            not source.is_file()
+            or source.name.startswith(".")
+            or source.suffix == ".gz"
+            or relative == MANIFEST_NAME
+        ):
+            continue
+        with source.open("rb") as fh:
+            digest = hashlib.file_digest(fh, "sha256").hexdigest()[:DIGEST_LENGTH]
+        assets[relative] = Asset(
+            path=relative,
+            fingerprinted=_fingerprint(relative, digest),
+            digest=digest,
+            size=source.stat().st_size,
+            gzip=_precompress(source, gzip_min_size, gzip_level),
+        )
+
+    manifest = AssetManifest(assets, url_prefix)
+    manifest.dump(static_dir / MANIFEST_NAME)
+    return manifest
+
+
+def load_manifest(static_dir: Path, url_prefix: str = "/static", rebuild: Optional[bool] = None) -> AssetManifest:
+    """Startup hook: reuse the manifest produced at build time, or rebuild it when asked to."""
+    rebuild = settings.static_manifest_rebuild if rebuild is None else rebuild
+    if rebuild:
+        return build_manifest(static_dir, url_prefix)
+    manifest_path = static_dir / MANIFEST_NAME
+    if not manifest_path.exists():
+        # Старт не пишет в каталог статики: без манифеста ссылки остаются обычными и ревалидируются
+        logger.warning("No %s in %s, static URLs are not fingerprinted (run python -m app.static_assets)", MANIFEST_NAME, static_dir)
+        return AssetManifest(url_prefix=url_prefix)
+    return AssetManifest.load(manifest_path, url_prefix)
+
+
+_manifest = AssetManifest()
+
+
+def get_asset_manifest() -> AssetManifest:
+    return _manifest
+
+
+def set_asset_manifest(manifest: AssetManifest) -> None:
+    global _manifest
+    _manifest = manifest
+
+
+def asset_url(url: Optional[str]) -> Optional[str]:
+    return _manifest.url(url)
+
+
+def _accepts_gzip(headers: Headers) -> bool:
+    for coding in headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*") and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            return True
+    return False
+
+
+class AssetFiles(StaticFiles):
+    """StaticFiles that understands fingerprinted paths and precompressed `.gz` siblings.
+
+    Range requests and the ASGI `pathsend` extension (zero-copy delivery on servers that
+    support it) come from Starlette's FileResponse; ranges are always served from the
+    identity file so byte offsets stay meaningful.
+    """
+
+    def __init__(self, *args, manifest: Optional[AssetManifest] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._manifest = manifest
+
+    @property
+    def manifest(self) -> AssetManifest:
+        return self._manifest if self._manifest is not None else get_asset_manifest()
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405, headers={"Allow": "GET, HEAD"})
+
+        relative = path.replace(os.sep, "/")
+        asset = self.manifest.by_fingerprint.get(relative)
+        cache_control = IMMUTABLE
+        if asset is None:
+            cache_control = REVALIDATE
+            match = _FINGERPRINT_RE.match(relative)
+            # Устаревший отпечаток: отдаём текущий файл, но без immutable
+            logical = f"{match['stem']}{match['suffix']}" if match else relative
+            asset = self.manifest.assets.get(logical)
+            if asset is None:
+                response = await super().get_response(path, scope)
+                response.headers.setdefault("cache-control", REVALIDATE)
+                return response
+
+        full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, asset.path)
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            raise HTTPException(status_code=404)
+
+        request_headers = Headers(scope=scope)
+        headers = {"Cache-Control": cache_control}
+        media_type = mimetypes.guess_type(asset.path)[0] or "text/plain"
+        if asset.gzip:
+            headers["Vary"] = "Accept-Encoding"
+            if _accepts_gzip(request_headers) and "range" not in request_headers:
+                gz_path, gz_stat = await anyio.to_thread.run_sync(self.lookup_path, asset.path + ".gz")
+                if gz_stat is not None:
+                    full_path, stat_result = gz_path, gz_stat
+                    headers["Content-Encoding"] = "gzip"
+
+        response = FileResponse(full_path, stat_result=stat_result, media_type=media_type, headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress static assets.")
+    parser.add_argument("static_dir", type=Path, nargs="?", default=None)
+    args = parser.parse_args(argv)
+
+    static_dir = args.static_dir or Path(__file__).resolve().parent / settings.static_dir
+    manifest = build_manifest(static_dir)
+    compressed = sum(asset.gzip for asset in manifest.assets.values())
+    print(f"{len(manifest.assets)} assets, {compressed} precompressed, manifest {manifest.digest or '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,53 @@
+"""Cyrillic to Latin transliteration shared by category slugs and product search."""
+from typing import Dict
+
+
+TRANSLIT_MAP: Dict[str, str] = {
+    "а": "a",
+    "б": "b",
+    "в": "v",
+    "г": "g",
+    "д": "d",
+    "е": "e",
+    "ё": "e",
+    "ж": "zh",
+    "з": "z",
+    "и": "i",
+    "й": "y",
+    "к": "k",
+    "л": "l",
+    "м": "m",
+    "н": "n",
+    "о": "o",
+    "п": "p",
+    "р": "r",
+    "с": "s",
+    "т": "t",
+    "у": "u",
+    "ф": "f",
+    "х": "kh",
+    "ц": "ts",
+    "ч": "ch",
+    "ш": "sh",
+    "щ": "shch",
+    "ъ": "",
+    "ы": "y",
+    "ь": "",
+    "э": "e",
+    "ю": "yu",
+    "я": "ya",
+}
+
+
+def slugify(value: str) -> str:
+    """Convert Cyrillic text to a simple ASCII slug."""
+    value = value.strip().lower()
+    transliterated = "".join(TRANSLIT_MAP.get(char, char) for char in value)
+    safe = []
+    for char in transliterated:
+        if char.isalnum():
+            safe.append(char)
+        elif char in {" ", "-", "_"}:
+            safe.append("-")
+    slug = "".join(safe).strip("-")
+    return slug or "category"
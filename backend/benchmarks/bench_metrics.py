@@ -0,0 +1,36 @@
+"""Cost of recording one observation in app.metrics.
+
+    uv run python -m benchmarks.bench_metrics
+"""
+from __future__ import annotations
+
+import argparse
+import timeit
+
+from app.metrics import LATENCY_BUCKETS, Histogram, MetricsRegistry, RequestStats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    histogram = Histogram(LATENCY_BUCKETS)
+    registry = MetricsRegistry()
+    stats = RequestStats()
+    stats.queries, stats.db_seconds = 3, 0.0004
+
+    cases = {
+        # Одно наблюдение и полная запись запроса (три гистограммы и счётчик статусов)
+        "histogram.observe": (lambda: histogram.observe(0.0123), "observation"),
+        "registry.record": (lambda: registry.record("/api/products/{product_id}", "GET", 200, 0.0123, stats), "request"),
+    }
+    baseline = min(timeit.repeat(lambda: None, number=args.number, repeat=5))
+    for label, (case, unit) in cases.items():
+        best = min(timeit.repeat(case, number=args.number, repeat=5))
+        # Вычитаем стоимость вызова пустой lambda, чтобы мерить только запись
+        print(f"{label:<20} {(best - baseline) / args.number * 1e9:6.0f} ns/{unit}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Per-row cost of a catalog list page: ORM + double validation vs. column tuples + one TypeAdapter.
+
+    uv run python -m benchmarks.bench_read_path --products 5000 --page-size 200
+
+The baseline reproduces what FastAPI does with a response_model: the service builds
+ProductResponse objects via from_attributes, then the route dumps and re-validates the
+ProductListResponse before serializing it. The fast path is ProductService.get_all_products_json.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.cache import NullCache
+from app.database import Base
+from app.models.category import Category
+from app.models.product import Product
+from app.schemas.product import ProductListResponse
+from app.services.product import ProductService
+
+RESPONSE_ADAPTER = TypeAdapter(ProductListResponse)
+
+
+def build_session(products: int):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    started = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(insert(Category), [
+            {"id": i, "name": f"Категория {i}", "slug": f"category-{i}"} for i in range(1, 11)
+        ])
+        connection.execute(insert(Product), [
+            {
+                "name": f"Печь {i:07d}",
+                "description": "Плавильная печь для бенчмарка " * 3,
+                "category_id": i % 10 + 1,
+                "image_url": f"/images/img_{i % 50}.png",
+                "created_at": started + timedelta(seconds=i),
+            }
+            for i in range(1, products + 1)
+        ])
+    return sessionmaker(bind=engine)()
+
+
+def orm_path(service: ProductService, page_size: int) -> bytes:
+    response = service.get_all_products(limit=page_size)
+    # Так FastAPI обрабатывает response_model: dump -> повторная валидация -> сериализация
+    return RESPONSE_ADAPTER.dump_json(RESPONSE_ADAPTER.validate_python(response.model_dump()))
+
+
+def fast_path(service: ProductService, page_size: int) -> bytes:
+    return service.get_all_products_json(limit=page_size)
+
+
+def measure(label: str, run: Callable[[], bytes], rows: int, repeat: int) -> float:
+    run()
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    per_row = best / rows * 1e6
+    print(f"{label:<10} {best * 1e3:8.2f} ms/page  {per_row:6.2f} us/row")
+    return per_row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    session = build_session(args.products)
+    service = ProductService(session, cache=NullCache())
+    rows = min(args.page_size, args.products)
+
+    assert orm_path(service, rows) == fast_path(service, rows), "fast path output differs"
+
+    def fresh(path: Callable[[ProductService, int], bytes]) -> Callable[[], bytes]:
+        # Каждый запрос получает новую сессию: identity map не должен переживать прогон
+        def run() -> bytes:
+            session.expunge_all()
+            return path(service, rows)
+        return run
+
+    baseline = measure("orm", fresh(orm_path), rows, args.repeat)
+    fast = measure("fast", fresh(fast_path), rows, args.repeat)
+    print(f"speedup    {baseline / fast:.1f}x per row")
+
+
+if __name__ == "__main__":
+    main()
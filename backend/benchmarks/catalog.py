@@ -0,0 +1,41 @@
+"""Deterministic benchmark catalogs.
+
+Catalogs come from app.catalog_generator, so the same (size, seed) always produces the
+same SQLite file. Files are cached under benchmarks/.data, so the 1M-product catalog is
+only built once per machine.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+
+DATA_DIR = Path(__file__).resolve().parent / ".data"
+CATEGORIES = 20
+
+
+def catalog_path(products: int, seed: int) -> Path:
+    return DATA_DIR / f"catalog-{products}-{seed}.db"
+
+
+def build_catalog(products: int, seed: int = 42) -> Path:
+    """Create (or reuse) the catalog file and return its path."""
+    path = catalog_path(products, seed)
+    if path.exists():
+        return path
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".partial")
+    partial.unlink(missing_ok=True)
+
+    from app.catalog_generator import generate_catalog
+    from app.database import Base
+    from app.search import register_sqlite_functions
+
+    # Собственный движок на файл каталога: движки приложения смотрят на DATABASE_URL процесса
+    engine = create_engine(f"sqlite:///{partial}")
+    event.listen(engine, "connect", lambda dbapi_connection, _: register_sqlite_functions(dbapi_connection))
+    Base.metadata.create_all(bind=engine)
+    generate_catalog(engine, CATEGORIES, products, seed=seed)
+    engine.dispose()
+    partial.rename(path)
+    return path
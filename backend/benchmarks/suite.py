@@ -0,0 +1,295 @@
+"""In-process ASGI benchmark of every API endpoint.
+
+    uv run python -m benchmarks.suite --sizes 100,10000 --concurrency 1,16
+    uv run python -m benchmarks.suite --sizes 100,10000,1000000 --save-baseline
+    uv run python -m benchmarks.suite --sizes 100,10000          # compares to baseline.json
+
+Each catalog size runs in its own worker process: settings are read at import time, and
+peak RSS is only meaningful per process. Workers copy a deterministic catalog from
+benchmarks/catalog.py and drive `app.main:app` through httpx's ASGITransport, so no
+sockets or server loop are involved. Request parameters come from a seeded RNG.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+RESULTS_DIR = BENCH_DIR / "results"
+
+RequestSpec = Tuple[str, str, Dict[str, Any]]
+
+
+@dataclass
+class Context:
+    products: int
+    categories: int
+    cart_token: str
+
+
+# Сценарии: имя -> генератор запроса (method, url, kwargs) по seeded RNG и контексту каталога
+SCENARIOS: Dict[str, Callable[[random.Random, Context], RequestSpec]] = {
+    "products_page": lambda rng, ctx: ("GET", "/api/products", {"params": {"limit": 50}}),
+    "products_newest": lambda rng, ctx: ("GET", "/api/products", {"params": {"limit": 50, "sort": "-created_at"}}),
+    "products_prefix": lambda rng, ctx: (
+        "GET", "/api/products", {"params": {"limit": 50, "name_prefix": rng.choice(("Доменная", "Индукционная", "Вакуумная"))}}
+    ),
+    "product_by_id": lambda rng, ctx: ("GET", f"/api/products/{rng.randint(1, ctx.products)}", {}),
+    "products_by_category": lambda rng, ctx: (
+        "GET", f"/api/products/category/{rng.randint(1, ctx.categories)}", {"params": {"limit": 50}}
+    ),
+    "search": lambda rng, ctx: ("GET", "/api/products/search", {"params": {"q": rng.choice(("печь", "domen", "вакуум"))}}),
+    "categories": lambda rng, ctx: ("GET", "/api/categories", {}),
+    "category_by_id": lambda rng, ctx: ("GET", f"/api/categories/{rng.randint(1, ctx.categories)}", {}),
+    "cart_add": lambda rng, ctx: (
+        "POST", "/api/cart/add",
+        {"json": {"product_id": rng.randint(1, ctx.products), "review": 1}, "headers": {"X-Cart-Token": ctx.cart_token}},
+    ),
+    "cart_get": lambda rng, ctx: ("GET", "/api/cart", {"headers": {"X-Cart-Token": ctx.cart_token}}),
+}
+
+
+@dataclass
+class Result:
+    size: int
+    scenario: str
+    concurrency: int
+    requests: int
+    errors: int
+    throughput_rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.size}/{self.scenario}/c{self.concurrency}"
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def _run_scenario(client: Any, name: str, ctx: Context, concurrency: int, total: int, seed: int) -> Result:
+    build = SCENARIOS[name]
+    rng = random.Random(f"{seed}/{name}/{concurrency}")
+    specs = [build(rng, ctx) for _ in range(total)]
+    latencies: List[float] = []
+    errors = 0
+    position = 0
+
+    async def worker() -> None:
+        nonlocal errors, position
+        while position < len(specs):
+            method, url, kwargs = specs[position]
+            position += 1
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    # Прогрев: кэши, подготовленные запросы, пулы соединений
+    for method, url, kwargs in specs[: min(20, total)]:
+        await client.request(method, url, **kwargs)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return Result(
+        size=ctx.products,
+        scenario=name,
+        concurrency=concurrency,
+        requests=len(latencies),
+        errors=errors,
+        throughput_rps=round(len(latencies) / elapsed, 1),
+        p50_ms=round(_percentile(latencies, 0.50) * 1e3, 3),
+        p95_ms=round(_percentile(latencies, 0.95) * 1e3, 3),
+        p99_ms=round(_percentile(latencies, 0.99) * 1e3, 3),
+    )
+
+
+async def _worker_main(size: int, scenarios: List[str], concurrency: List[int], total: int, seed: int) -> Dict[str, Any]:
+    import httpx
+
+    from app.main import app
+    from benchmarks.catalog import CATEGORIES
+
+    results: List[Result] = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.post("/api/cart/add", json={"product_id": 1, "review": 1})
+            ctx = Context(products=size, categories=CATEGORIES, cart_token=response.headers["X-Cart-Token"])
+            for name in scenarios:
+                for level in concurrency:
+                    result = await _run_scenario(client, name, ctx, level, total, seed)
+                    print(
+                        f"{result.key:<40} {result.throughput_rps:>9.1f} rps  "
+                        f"p50 {result.p50_ms:>8.2f}  p95 {result.p95_ms:>8.2f}  p99 {result.p99_ms:>8.2f} ms"
+                        + (f"  errors {result.errors}" if result.errors else ""),
+                        file=sys.stderr,
+                    )
+                    results.append(result)
+
+    # ru_maxrss в Linux в КиБ, в macOS в байтах
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    return {"size": size, "peak_rss_mb": round(peak_mb, 1), "results": [asdict(result) for result in results]}
+
+
+def _spawn_worker(size: int, args: argparse.Namespace) -> Dict[str, Any]:
+    from benchmarks.catalog import build_catalog
+
+    started = time.perf_counter()
+    catalog = build_catalog(size, args.seed)
+    setup_seconds = time.perf_counter() - started
+
+    workdir = Path(tempfile.mkdtemp(prefix=f"bench-{size}-"))
+    try:
+        # Каждый прогон пишет (корзины) в свою копию: эталонный файл каталога не меняется
+        database = workdir / "catalog.db"
+        shutil.copyfile(catalog, database)
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(filter(None, [str(BENCH_DIR.parent), os.environ.get("PYTHONPATH")])),
+            "DATABASE_URL": f"sqlite:///{database}",
+            "DEBUG": "false",
+            "CACHE_ENABLED": "false" if args.no_cache else "true",
+        }
+        command = [
+            sys.executable, "-m", "benchmarks.suite", "--worker", str(size),
+            "--scenarios", ",".join(args.scenarios), "--concurrency", ",".join(map(str, args.concurrency)),
+            "--requests", str(args.requests), "--seed", str(args.seed),
+        ]
+        completed = subprocess.run(command, env=env, cwd=workdir, check=True, stdout=subprocess.PIPE, text=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = json.loads(completed.stdout)
+    report["setup_seconds"] = round(setup_seconds, 2)
+    return report
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Regressions beyond `threshold` (fraction) in throughput or p95 latency against the baseline."""
+
+    def index(report: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        return {
+            f"{row['size']}/{row['scenario']}/c{row['concurrency']}": row
+            for run in report["runs"]
+            for row in run["results"]
+        }
+
+    regressions = []
+    before = index(baseline)
+    for key, row in index(current).items():
+        old = before.get(key)
+        if old is None:
+            continue
+        if row["throughput_rps"] < old["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{key}: throughput {old['throughput_rps']} -> {row['throughput_rps']} rps")
+        if row["p95_ms"] > old["p95_ms"] * (1 + threshold):
+            regressions.append(f"{key}: p95 {old['p95_ms']} -> {row['p95_ms']} ms")
+    peak_before = {run["size"]: run["peak_rss_mb"] for run in baseline["runs"]}
+    for run in current["runs"]:
+        old_peak = peak_before.get(run["size"])
+        if old_peak and run["peak_rss_mb"] > old_peak * (1 + threshold):
+            regressions.append(f"{run['size']}: peak RSS {old_peak} -> {run['peak_rss_mb']} MB")
+    return regressions
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item.replace("_", "")) for item in value.split(",") if item]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="In-process ASGI benchmark of the API endpoints.")
+    parser.add_argument("--sizes", type=_int_list, default=[100, 10_000])
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 16])
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario and concurrency level")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-cache", action="store_true", help="run with the catalog cache disabled")
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative regression")
+    parser.add_argument("--worker", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    if args.worker is not None:
+        report = asyncio.run(_worker_main(args.worker, args.scenarios, args.concurrency, args.requests, args.seed))
+        print(json.dumps(report))
+        return 0
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "requests": args.requests, "seed": args.seed, "cache": not args.no_cache,
+            "concurrency": args.concurrency, "scenarios": args.scenarios,
+        },
+        "runs": [_spawn_worker(size, args) for size in args.sizes],
+    }
+    for run in report["runs"]:
+        print(f"size {run['size']}: peak RSS {run['peak_rss_mb']} MB, catalog setup {run['setup_seconds']} s")
+
+    output = args.output or RESULTS_DIR / f"{report['created_at'].replace(':', '')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=1, ensure_ascii=False), encoding="utf-8")
+    print(f"results: {output}")
+
+    if args.save_baseline:
+        shutil.copyfile(output, args.baseline)
+        print(f"baseline updated: {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print("no baseline to compare against (use --save-baseline)")
+        return 0
+
+    regressions = compare(report, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"no regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
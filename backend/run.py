@@ -1,11 +1,21 @@
+import sys
+
 import uvicorn
 from app.config import settings
 
 if __name__ == "__main__":
+    # python run.py --prod [--workers N]: предзагрузка приложения и fork воркеров (app/server.py)
+    if "--prod" in sys.argv[1:]:
+        from app.server import main
+
+        raise SystemExit(main([arg for arg in sys.argv[1:] if arg != "--prod"]))
+
     uvicorn.run(
         app="app.main:app",
         host="0.0.0.0",
         port=8000,
         reload=settings.debug,
         log_level="info",
-    )
\ No newline at end of file
+        # Ответы, не завершившиеся за это время после сигнала выхода, прерываются
+        timeout_graceful_shutdown=int(settings.server_graceful_timeout),
+    )
@@ -0,0 +1,40 @@
+"""Shared test setup.
+
+Settings are read when app.config is imported, so the environment of the test run (a
+throwaway database, server-side carts in SQLite, an admin token) is set here, before
+any test module imports the app. All tests share that database.
+"""
+import os
+import tempfile
+from typing import Iterator
+
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix="furnace-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_workdir}/test.db",
+    "CART_BACKEND": "sqlite",
+    "ADMIN_TOKEN": "test-admin",
+    "SEED_ON_STARTUP": "true",
+    "OPENAPI_CACHE_FILE": "",
+})
+
+from app.query_budget import QueryCounter, count_queries  # noqa: E402
+
+ADMIN_HEADERS = {"X-Admin-Token": "test-admin"}
+
+
+@pytest.fixture
+def query_counter() -> Iterator[QueryCounter]:
+    with count_queries() as counter:
+        yield counter
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,70 @@
+"""Admission limits against the reader pool, streamed responses and the pool timeout response."""
+import asyncio
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.admission import READ, AdmissionMiddleware, ConcurrencyLimiter, read_limit
+from app.config import settings
+from app.services.category import AsyncCategoryService, CategoryService
+
+
+def test_read_limit_never_exceeds_reader_pool(monkeypatch):
+    monkeypatch.setattr(settings, "db_read_pool_size", 8)
+    monkeypatch.setattr(settings, "db_read_max_overflow", 2)
+
+    monkeypatch.setattr(settings, "admission_read_limit", None)
+    assert read_limit() == 10
+    monkeypatch.setattr(settings, "admission_read_limit", 64)
+    assert read_limit() == 10
+    monkeypatch.setattr(settings, "admission_read_limit", 4)
+    assert read_limit() == 4
+
+
+def test_pool_timeout_is_503_with_retry_after(client, monkeypatch):
+    def exhausted(self, category_id):
+        raise PoolTimeoutError("QueuePool limit of size 8 overflow 0 reached")
+
+    async def exhausted_async(self, category_id):
+        exhausted(self, category_id)
+
+    # db_mode=async читает через AsyncCategoryService, sync — через CategoryService в потоке
+    monkeypatch.setattr(CategoryService, "get_category_by_id", exhausted)
+    monkeypatch.setattr(AsyncCategoryService, "get_category_by_id", exhausted_async)
+    response = client.get("/api/categories/987654")
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(settings.admission_retry_after)
+
+
+def test_held_open_stream_does_not_block_plain_reads():
+    async def scenario():
+        client_reading = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            if scope["path"] == "/api/products":  # поток: первая пачка ушла, клиент читает медленно
+                await send({"type": "http.response.body", "body": b"[", "more_body": True})
+                await client_reading.wait()
+            await send({"type": "http.response.body", "body": b"]"})
+
+        limiter = ConcurrencyLimiter(limit=1, queue_size=0, timeout=0.1)
+        middleware = AdmissionMiddleware(app, limiters={READ: limiter})
+        statuses = []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        def request(path):
+            return middleware({"type": "http", "method": "GET", "path": path}, None, send)
+
+        stream = asyncio.ensure_future(request("/api/products"))
+        await asyncio.sleep(0.01)
+        await request("/api/categories")
+        client_reading.set()
+        await stream
+        return statuses, limiter.active
+
+    statuses, active = asyncio.run(scenario())
+    assert statuses == [200, 200]
+    assert active == 0
@@ -0,0 +1,65 @@
+"""The async read services (db_mode=async) return the same results as the sync ones."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.cache import NullCache
+from app.database import AsyncReadSessionLocal, ReadSessionLocal, async_read_engine
+from app.pagination import CountStrategy, ProductSort
+from app.projection import ProductProjection
+from app.services.category import AsyncCategoryService, CategoryService
+from app.services.product import AsyncProductService, ProductService
+
+CALLS = [
+    ("get_all_products", (), {"limit": 5}),
+    ("get_all_products", (), {"limit": 5, "sort": ProductSort.created_at, "count": CountStrategy.exact}),
+    ("get_all_products_json", (), {"limit": 5, "name_prefix": "Н"}),
+    ("get_all_products_json", (), {"limit": 3, "projection": ProductProjection.parse("name", "category")}),
+    ("search_products", ("печь",), {"limit": 3}),
+    ("search_products", ("pech",), {"limit": 2, "offset": 1}),
+    ("get_product_by_id", (1,), {}),
+    ("get_products_by_ids", ([2, 1, 999999, 2],), {}),
+    ("get_products_by_category", (1,), {"limit": 4}),
+    ("get_products_by_category_json", (1,), {"limit": 4, "count": CountStrategy.none}),
+]
+
+
+def _run_async(service_cls, method: str, *args, **kwargs):
+    async def run():
+        async with AsyncReadSessionLocal() as db:
+            return await getattr(service_cls(db, cache=NullCache()), method)(*args, **kwargs)
+
+    async def run_and_dispose():
+        try:
+            return await run()
+        finally:
+            # Каждый asyncio.run создаёт свой цикл: соединения aiosqlite к нему привязаны
+            await async_read_engine.dispose()
+
+    return asyncio.run(run_and_dispose())
+
+
+def _run_sync(service_cls, method: str, *args, **kwargs):
+    with ReadSessionLocal() as db:
+        return getattr(service_cls(db, cache=NullCache()), method)(*args, **kwargs)
+
+
+@pytest.mark.parametrize("method,args,kwargs", CALLS, ids=[call[0] for call in CALLS])
+def test_async_product_service_matches_sync(client, method, args, kwargs):
+    assert _run_async(AsyncProductService, method, *args, **kwargs) == _run_sync(ProductService, method, *args, **kwargs)
+
+
+@pytest.mark.parametrize("method,args", [
+    ("get_all_categories", ()), ("get_all_categories_json", ()), ("get_category_by_id", (1,)),
+])
+def test_async_category_service_matches_sync(client, method, args):
+    assert _run_async(AsyncCategoryService, method, *args) == _run_sync(CategoryService, method, *args)
+
+
+def test_async_not_found_matches_sync(client):
+    with pytest.raises(HTTPException) as async_error:
+        _run_async(AsyncProductService, "get_products_by_category", 999999)
+    with pytest.raises(HTTPException) as sync_error:
+        _run_sync(ProductService, "get_products_by_category", 999999)
+    assert (async_error.value.status_code, async_error.value.detail) == (sync_error.value.status_code, sync_error.value.detail)
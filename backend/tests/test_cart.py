@@ -0,0 +1,108 @@
+"""Server-side carts: the stores and the /api/cart routes."""
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.cart_store import MemoryCartStore, SqliteCartStore
+from app.database import SessionLocal
+from app.models.cart import Cart
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_memory_add_restarts_expired_cart():
+    clock = _Clock()
+    store = MemoryCartStore(max_carts=10, ttl_seconds=60, clock=clock)
+    token, quantity = store.add(None, 1, 2)
+    assert store.add(token, 1, 3) == (token, 5)
+
+    # Корзина истекла между проверкой в сервисе и записью: раньше здесь был KeyError
+    clock.now += 61
+    new_token, quantity = store.add(token, 1, 1)
+    assert new_token != token
+    assert quantity == 1
+    assert store.get(token) is None
+    assert store.get(new_token) == {1: 1}
+
+
+def test_sqlite_add_restarts_expired_cart(client):
+    with SessionLocal() as db:
+        store = SqliteCartStore(db, ttl_seconds=60)
+        token, _ = store.add(None, 1, 2)
+        db.execute(update(Cart).where(Cart.token == token).values(updated_at=store._now() - timedelta(seconds=61)))
+        db.commit()
+
+        new_token, quantity = store.add(token, 1, 1)
+        assert new_token != token
+        assert quantity == 1
+        assert store.get(new_token) == {1: 1}
+        assert store.get(token) is None
+
+
+@pytest.mark.parametrize("token", [None, "unknown-token"])
+def test_add_without_a_live_cart_starts_one(client, token):
+    headers = {"X-Cart-Token": token} if token else {}
+    response = client.post("/api/cart/add", json={"product_id": 1, "review": 2}, headers=headers)
+    assert response.status_code == 201
+    new_token = response.headers["X-Cart-Token"]
+    assert new_token != token
+    assert client.get("/api/cart", headers={"X-Cart-Token": new_token}).json()["items_count"] == 1
+
+
+@pytest.mark.parametrize("operation", [
+    {"op": "add", "product_id": 1},
+    {"op": "update", "product_id": 1, "review": 0},
+    {"op": "add", "product_id": 1, "review": 0},
+])
+def test_batch_requires_review_for_add_and_update(client, operation):
+    assert client.post("/api/cart/batch", json={"operations": [operation]}).status_code == 422
+
+
+@pytest.mark.parametrize("method, path", [("post", "/api/cart/add"), ("put", "/api/cart/update")])
+@pytest.mark.parametrize("review", [0, -1])
+def test_single_item_routes_require_positive_review(client, method, path, review):
+    token = client.post("/api/cart/add", json={"product_id": 1, "review": 1}).headers["X-Cart-Token"]
+    response = client.request(method, path, json={"product_id": 1, "review": review}, headers={"X-Cart-Token": token})
+    assert response.status_code == 422
+
+
+def test_batch_remove_needs_no_review(client):
+    token = client.post("/api/cart/add", json={"product_id": 1, "review": 1}).headers["X-Cart-Token"]
+    response = client.post("/api/cart/batch", json={"operations": [{"op": "remove", "product_id": 1}]}, headers={"X-Cart-Token": token})
+    assert response.status_code == 200
+    assert response.json()["items_count"] == 0
+
+
+@pytest.mark.parametrize("store_factory", ["memory", "sqlite"])
+def test_rejected_batch_on_unknown_token_creates_no_cart(client, store_factory):
+    from app.cart_store import CartOperationError
+
+    with SessionLocal() as db:
+        store = MemoryCartStore(10, 60) if store_factory == "memory" else SqliteCartStore(db, 60)
+        carts_before = db.query(Cart).count()
+        with pytest.raises(CartOperationError):
+            store.apply("unknown-token", [("add", 1, 1), ("update", 2, 3)])
+        assert db.query(Cart).count() == carts_before
+        if store_factory == "memory":
+            assert not store._carts
+
+        token, lines = store.apply("unknown-token", [("add", 1, 1), ("update", 1, 3)])
+        assert token != "unknown-token"
+        assert lines == {1: 3}
+
+
+def test_batch_conflict_on_unknown_token_returns_409(client):
+    response = client.post(
+        "/api/cart/batch",
+        json={"operations": [{"op": "update", "product_id": 1, "review": 2}]},
+        headers={"X-Cart-Token": "unknown-token"},
+    )
+    assert response.status_code == 409
+    assert "X-Cart-Token" not in response.headers
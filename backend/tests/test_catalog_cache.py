@@ -0,0 +1,74 @@
+"""Catalog cache coherence across worker processes (versioned entries)."""
+import pytest
+from sqlalchemy import text
+
+from app.cache import TTLCache, VersionedCache, get_catalog_cache, get_catalog_version_memo, set_catalog_cache
+from app.database import engine
+from app.services.category import CategoryService
+from app.database import ReadSessionLocal
+
+
+def test_newer_version_drops_older_entries():
+    cache = TTLCache(max_entries=10, ttl_seconds=60)
+    cache.set("a", 1, version=5)
+    assert cache.get("a", version=5) == 1
+
+    # Запрос со старой версией не видит и не пишет записи нового поколения
+    cache.set("b", 2, version=4)
+    assert cache.get("a", version=4) is None
+    assert cache.get("b", version=5) is None
+
+    assert cache.get("a", version=6) is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["generations"] == 1
+
+
+def test_cache_is_bypassed_without_request_version(client):
+    cache = VersionedCache(TTLCache(max_entries=10, ttl_seconds=60))
+    with ReadSessionLocal() as db:
+        CategoryService(db, cache=cache).get_category_by_id(1)
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.fixture
+def versioned_cache():
+    set_catalog_cache(None)
+    yield get_catalog_cache()
+    set_catalog_cache(None)
+
+
+def test_write_in_another_worker_is_not_served_from_cache(client, versioned_cache):
+    get_catalog_version_memo().invalidate()
+    first = client.get("/api/categories/2")
+    assert versioned_cache.stats()["entries"] > 0
+
+    # Другой воркер переименовал категорию: его кэш сброшен, а кэш этого процесса — нет
+    with engine.begin() as connection:
+        name = connection.execute(text("SELECT name FROM categories WHERE id = 2")).scalar_one()
+        connection.execute(text("UPDATE categories SET name = :name WHERE id = 2"), {"name": name + " (новое имя)"})
+        connection.execute(text("UPDATE catalog_state SET version = version + 1"))
+    try:
+        # Пока версия не перечитана, ответ старый, но и ETag старый
+        assert client.get("/api/categories/2").headers["etag"] == first.headers["etag"]
+
+        get_catalog_version_memo().invalidate()  # так делает опрос хаба событий или истечение catalog_version_ttl
+        second = client.get("/api/categories/2")
+        assert second.headers["etag"] != first.headers["etag"]
+        assert second.json()["name"] == name + " (новое имя)"
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("UPDATE categories SET name = :name WHERE id = 2"), {"name": name})
+        get_catalog_version_memo().invalidate()
+
+
+def test_reseeding_a_seeded_catalog_keeps_its_version(client):
+    from app.seed_data import seed
+
+    def version():
+        with engine.connect() as connection:
+            return connection.execute(text("SELECT version FROM catalog_state WHERE id = 1")).scalar()
+
+    seed()  # база уже засеяна при старте приложения: вставлять нечего
+    before = version()
+    seed()
+    assert version() == before
@@ -0,0 +1,41 @@
+"""The change feed embeds rows read from the database, never from the catalog cache."""
+import pytest
+from sqlalchemy import text
+
+from app.cache import get_catalog_cache, get_catalog_version_memo, set_catalog_cache
+from app.database import SessionLocal, engine
+from app.repositories.catalog_changes import ChangeLogRepository
+from app.repositories.catalog_state import CatalogStateRepository
+from app.schemas.catalog import ChangeEntity
+
+
+@pytest.fixture
+def versioned_cache():
+    set_catalog_cache(None)
+    yield get_catalog_cache()
+    set_catalog_cache(None)
+
+
+def test_changes_embed_current_rows_despite_cached_product(client, versioned_cache):
+    get_catalog_version_memo().invalidate()
+    head = 0
+    while True:
+        page = client.get("/api/catalog/changes", params={"since": head, "limit": 500}).json()
+        head = page["next_since"]
+        if not page["has_more"]:
+            break
+    original = client.get("/api/products/1").json()["name"]  # товар 1 теперь в кэше этого воркера
+
+    # Товар переименовал другой воркер; версию этот процесс ещё не перечитал
+    with SessionLocal() as db:
+        db.execute(text("UPDATE products SET name = :name WHERE id = 1"), {"name": original + " (новое имя)"})
+        CatalogStateRepository(db).bump()
+        ChangeLogRepository(db).record(ChangeEntity.product, [1])
+        db.commit()
+    try:
+        changes = client.get("/api/catalog/changes", params={"since": head}).json()["changes"]
+        assert [change["product"]["name"] for change in changes if change["id"] == 1] == [original + " (новое имя)"]
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("UPDATE products SET name = :name WHERE id = 1"), {"name": original})
+        get_catalog_version_memo().invalidate()
@@ -0,0 +1,50 @@
+"""Synthetic catalog generator: deterministic rows, a searchable index and untouched pool connections."""
+from sqlalchemy import create_engine, text
+
+from app.catalog_generator import generate_catalog
+from app.database import Base
+from app.search import search_index_ready
+
+
+def _engine(path):
+    engine = create_engine(f"sqlite:///{path}", pool_size=1, max_overflow=0)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def _dump(engine):
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT * FROM products ORDER BY id")).all()
+
+
+def test_same_seed_gives_same_catalog(tmp_path):
+    first, second = _engine(tmp_path / "a.db"), _engine(tmp_path / "b.db")
+    report = generate_catalog(first, categories=5, products=500, seed=7)
+    generate_catalog(second, categories=5, products=500, seed=7)
+
+    assert report.products == 500
+    assert report.total_seconds >= report.load_seconds
+    assert _dump(first) == _dump(second)
+
+
+def test_generated_catalog_is_searchable_in_latin(tmp_path):
+    engine = _engine(tmp_path / "catalog.db")
+    generate_catalog(engine, categories=5, products=500, seed=7)
+
+    with engine.connect() as connection:
+        assert search_index_ready(connection)
+        matches = connection.execute(text("SELECT count(*) FROM products_fts WHERE products_fts MATCH 'pech*'")).scalar()
+        products = connection.execute(text("SELECT count(*) FROM products WHERE name LIKE '%печь%'")).scalar()
+    assert matches >= products > 0
+
+
+def test_relaxed_pragmas_do_not_leak_into_the_pool(tmp_path):
+    engine = _engine(tmp_path / "catalog.db")
+    with engine.connect() as connection:
+        before = connection.exec_driver_sql("PRAGMA synchronous").scalar()
+
+    generate_catalog(engine, categories=3, products=100, seed=1)
+
+    with engine.connect() as connection:  # pool_size=1: то же соединение, что и у загрузки
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == before
+        assert connection.exec_driver_sql("PRAGMA cache_size").scalar() != -262144
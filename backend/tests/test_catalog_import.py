@@ -0,0 +1,109 @@
+"""Chunked catalog import: CatalogImporter and POST /api/admin/import."""
+from typing import List
+
+import pytest
+
+from app import catalog_import
+from app.cache import TTLCache, set_catalog_cache
+from app.catalog_import import CatalogImporter
+from app.database import engine
+from app.schemas.catalog_import import ImportReport
+from conftest import ADMIN_HEADERS
+
+
+def _rows(*records: dict) -> List[tuple]:
+    return list(enumerate(records, start=1))
+
+
+@pytest.fixture
+def catalog_cache():
+    cache = TTLCache(max_entries=100, ttl_seconds=300)
+    set_catalog_cache(cache)
+    yield cache
+    set_catalog_cache(None)
+
+
+def test_cache_is_cleared_per_chunk_before_notify(client, catalog_cache, monkeypatch):
+    cached_at_notify: List[int] = []
+    monkeypatch.setattr(catalog_import, "notify_catalog_changed", lambda: cached_at_notify.append(catalog_cache.stats()["entries"]))
+
+    def refill(report: ImportReport) -> None:
+        # Читатель снова наполняет кэш между чанками
+        catalog_cache.set(("categories",), [])
+
+    refill(ImportReport())
+    report = CatalogImporter(engine, chunk_size=1).run(_rows(
+        {"name": "Чанковая печь 1", "category_slug": "chernaya"},
+        {"name": "Чанковая печь 2", "category_slug": "chernaya"},
+    ), on_chunk=refill)
+
+    assert report.rows_upserted == 2
+    assert cached_at_notify == [0, 0]
+
+
+def test_unique_name_index_reports_duplicates(tmp_path):
+    from sqlalchemy import create_engine, text
+
+    from app import database
+
+    legacy = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with legacy.begin() as connection:
+        connection.execute(text("CREATE TABLE categories (id INTEGER PRIMARY KEY, name VARCHAR, slug VARCHAR)"))
+        connection.execute(text(
+            "CREATE TABLE products (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, description TEXT, "
+            "category_id INTEGER, image_url VARCHAR, created_at DATETIME)"
+        ))
+        connection.execute(text("INSERT INTO categories VALUES (1, 'Черная', 'chernaya')"))
+        connection.execute(text(
+            "INSERT INTO products (name, category_id) VALUES ('Дубль', 1), ('Дубль', 1), ('Один', 1)"
+        ))
+
+    original = database.engine
+    database.engine = legacy
+    try:
+        with pytest.raises(database.DuplicateKeyError, match=r"uq_products_name.*'Дубль' x2"):
+            database.init_db()
+    finally:
+        database.engine = original
+    with legacy.connect() as connection:
+        names = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+    assert "uq_products_name" not in names
+
+
+def test_rolled_back_chunk_counts_each_row_once(client, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("disk I/O error")
+
+    monkeypatch.setattr(catalog_import, "index_transliterations", fail)
+    report = CatalogImporter(engine).run(_rows(
+        {"name": "Откат 1", "category_slug": "chernaya"},
+        {"name": "Откат 2", "category_slug": "no-such-category"},
+        {"name": "Откат 3", "category_slug": "chernaya"},
+        {"description": "без имени"},
+    ))
+
+    assert report.rows_read == 4
+    assert report.rows_upserted == 0
+    assert report.rows_failed == 4
+    assert [error.row for error in report.errors] == [4, 2, None]
+
+
+def test_admin_token_is_required(client):
+    body = {"content": '{"name": "Токен", "category_slug": "chernaya"}\n', "headers": {"content-type": "application/x-ndjson"}}
+    assert client.post("/api/admin/import", **body).status_code == 403
+    body["headers"]["X-Admin-Token"] = "test-admin-wrong"
+    assert client.post("/api/admin/import", **body).status_code == 403
+    body["headers"]["X-Admin-Token"] = ADMIN_HEADERS["X-Admin-Token"]
+    assert client.post("/api/admin/import", **body).json()["rows_upserted"] == 1
+
+
+def test_import_body_is_capped(client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "import_max_bytes", 100)
+    headers = {**ADMIN_HEADERS, "content-type": "application/x-ndjson"}
+    line = '{"name": "Слишком большой", "category_slug": "chernaya"}\n'
+    assert client.post("/api/admin/import", content=line * 3, headers=headers).status_code == 413
+    # Без Content-Length (chunked) лимит проверяется по принятым байтам
+    chunked = client.post("/api/admin/import", content=iter([line.encode()] * 3), headers=headers)
+    assert chunked.status_code == 413
@@ -0,0 +1,115 @@
+"""Single-flight coalescing: sharing, errors, timeouts and cancellation."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.coalescing import SingleFlight, request_key
+from app.pagination import ProductSort
+
+
+class SlowCall:
+    """A service call that blocks until released and counts its invocations."""
+
+    def __init__(self, result="leader", error=None):
+        self.release = asyncio.Event()
+        self.result = result
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_request_key_is_canonical():
+    assert request_key("products", limit=10, sort=ProductSort.id, cursor=None) == request_key(
+        "products", sort="id", limit=10
+    )
+    assert request_key("products", limit=10) != request_key("products.json", limit=10)
+
+
+def test_followers_share_the_leader_result():
+    async def scenario():
+        flight, call = SingleFlight(timeout=5), SlowCall(result=object())
+        tasks = [asyncio.ensure_future(flight.do("key", call)) for _ in range(4)]
+        await asyncio.sleep(0)
+        call.release.set()
+        return flight, call, await asyncio.gather(*tasks)
+
+    flight, call, results = asyncio.run(scenario())
+    assert call.calls == 1
+    assert all(result is call.result for result in results)
+    assert (flight.leaders, flight.followers, flight.in_flight) == (1, 3, 0)
+
+
+def test_leader_exception_reaches_followers():
+    async def scenario():
+        flight, call = SingleFlight(timeout=5), SlowCall(error=HTTPException(status_code=404))
+        tasks = [asyncio.ensure_future(flight.do("key", call)) for _ in range(3)]
+        await asyncio.sleep(0)
+        call.release.set()
+        return call, await asyncio.gather(*tasks, return_exceptions=True)
+
+    call, results = asyncio.run(scenario())
+    assert call.calls == 1
+    assert all(isinstance(result, HTTPException) and result.status_code == 404 for result in results)
+
+
+def test_follower_computes_itself_after_timeout():
+    async def scenario():
+        flight, slow = SingleFlight(timeout=0.05), SlowCall()
+
+        async def own():
+            return "follower"
+
+        leader = asyncio.ensure_future(flight.do("key", slow))
+        await asyncio.sleep(0)
+        follower = await flight.do("key", own)
+        assert not leader.done()  # таймаут ведомого не отменяет лидера
+        slow.release.set()
+        return flight, follower, await leader
+
+    flight, follower, leader = asyncio.run(scenario())
+    assert (follower, leader) == ("follower", "leader")
+    assert flight.timeouts == 1
+
+
+def test_follower_computes_itself_when_leader_is_cancelled():
+    async def scenario():
+        flight, slow = SingleFlight(timeout=5), SlowCall()
+
+        async def own():
+            return "follower"
+
+        leader = asyncio.ensure_future(flight.do("key", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", own))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return flight, await follower
+
+    flight, follower = asyncio.run(scenario())
+    assert follower == "follower"
+    assert flight.in_flight == 0
+
+
+def test_cancelled_follower_does_not_cancel_the_leader():
+    async def scenario():
+        flight, slow = SingleFlight(timeout=5), SlowCall()
+        leader = asyncio.ensure_future(flight.do("key", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", slow))
+        await asyncio.sleep(0)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        slow.release.set()
+        return slow, await leader
+
+    slow, leader = asyncio.run(scenario())
+    assert leader == "leader"
+    assert slow.calls == 1
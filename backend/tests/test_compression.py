@@ -0,0 +1,40 @@
+"""Compressed body cache of CompressionMiddleware."""
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.compression import CompressedBodyCache, CompressionMiddleware
+
+
+def test_same_etag_with_another_body_is_compressed_again():
+    bodies = [b'{"name": "old"}' * 200, b'{"name": "new"}' * 200]
+
+    async def endpoint(request):
+        # Тело и ETag прочитаны не в одном снимке: под тем же ETag уходит уже другое тело
+        return Response(bodies.pop(0), media_type="application/json", headers={"ETag": '"v1"'})
+
+    cache = CompressedBodyCache(1024 * 1024)
+    app = CompressionMiddleware(Starlette(routes=[Route("/", endpoint)]), cache=cache)
+    with TestClient(app) as client:
+        first = client.get("/", headers={"Accept-Encoding": "gzip"})
+        second = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.content == b'{"name": "old"}' * 200
+    assert second.content == b'{"name": "new"}' * 200
+    assert cache.stats()["entries"] == 2
+
+
+def test_repeated_body_is_served_from_cache():
+    async def endpoint(request):
+        return Response(b"x" * 4096, media_type="text/plain", headers={"ETag": '"v1"'})
+
+    cache = CompressedBodyCache(1024 * 1024)
+    app = CompressionMiddleware(Starlette(routes=[Route("/{path}", endpoint)]), cache=cache)
+    with TestClient(app) as client:
+        client.get("/a", headers={"Accept-Encoding": "gzip"})
+        response = client.get("/b", headers={"Accept-Encoding": "gzip"})
+
+    assert cache.hits == 1
+    assert response.content == b"x" * 4096
@@ -0,0 +1,86 @@
+"""Reader/writer routing (GET routes on the query_only reader pool, writes on the writer) and schema upkeep."""
+from contextlib import contextmanager
+from typing import Iterator, List
+
+import pytest
+from sqlalchemy import event, insert, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from app import database
+from app.cache import get_catalog_version_memo, set_catalog_cache
+from app.config import settings
+from app.models.category import Category
+
+
+def _sync_engines():
+    """Writer and reader engines used by the routes under the configured db_mode."""
+    if settings.db_mode == "async":
+        return database.async_engine.sync_engine, database.async_read_engine.sync_engine
+    return database.engine, database.read_engine
+
+
+@contextmanager
+def _statements(target: Engine) -> Iterator[List[str]]:
+    seen: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    event.listen(target, "before_cursor_execute", record)
+    try:
+        yield seen
+    finally:
+        event.remove(target, "before_cursor_execute", record)
+
+
+def test_write_on_reader_session_raises(client):
+    with database.ReadSessionLocal() as db:
+        assert db.execute(text("PRAGMA query_only")).scalar() == 1
+        with pytest.raises(OperationalError, match="readonly"):
+            db.execute(insert(Category).values(name="Читатель", slug="reader-write"))
+        db.rollback()
+
+    with database.SessionLocal() as db:
+        assert db.execute(text("PRAGMA query_only")).scalar() == 0
+        assert db.execute(text("SELECT count(*) FROM categories WHERE slug = 'reader-write'")).scalar() == 0
+
+
+def test_get_routes_read_through_reader_pool(client):
+    writer, reader = _sync_engines()
+    assert writer is not reader
+    set_catalog_cache(None)
+    get_catalog_version_memo().invalidate()
+    try:
+        with _statements(writer) as written, _statements(reader) as read:
+            for path in ("/api/categories", "/api/products/1", "/api/products/category/1", "/api/products/search?q=a"):
+                assert client.get(path).status_code == 200
+    finally:
+        set_catalog_cache(None)
+    assert read
+    assert written == []
+
+
+def test_cart_writes_go_through_writer(client):
+    # Записи в обоих режимах идут через синхронный писатель в потоке
+    _, reader = _sync_engines()
+    with _statements(database.engine) as written, _statements(reader) as read:
+        assert client.post("/api/cart/add", json={"product_id": 1, "review": 1}).status_code == 201
+    assert any(statement.lstrip().upper().startswith(("INSERT", "UPDATE")) for statement in written)
+    assert read == []
+
+
+def test_init_db_replaces_the_single_column_category_index(client):
+    with database.engine.begin() as connection:
+        connection.execute(text("CREATE INDEX IF NOT EXISTS ix_products_category_id ON products (category_id)"))
+    database.init_db()
+
+    with database.engine.connect() as connection:
+        indexes = {row[1] for row in connection.execute(text("PRAGMA index_list(products)"))}
+        plan = " ".join(row[-1] for row in connection.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM products WHERE category_id = 1 AND id > 5 ORDER BY id LIMIT 10"
+        )))
+    assert "ix_products_category_id" not in indexes
+    assert "ix_products_category_id_id" in indexes
+    # Листинг категории по id идёт по индексу без сортировки во временном B-дереве
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,47 @@
+"""SSE streams end as soon as the server is asked to exit."""
+import asyncio
+import signal
+
+from app.config import settings
+from app.events import EventHub, EventStreamResponse, close_streams_on_signals
+
+
+def test_exit_signal_closes_open_streams(client, monkeypatch):
+    monkeypatch.setattr(settings, "events_max_duration", 3600.0)
+    received = []
+
+    def server_handler(sig, frame):
+        received.append(sig)
+
+    async def scenario():
+        hub = EventHub(poll_interval=0.05)
+        await hub.start()
+        restore = close_streams_on_signals(hub)
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def receive():
+            await asyncio.Event().wait()  # клиент не отключается
+
+        stream = asyncio.ensure_future(EventStreamResponse(hub)({"type": "http"}, receive, send))
+        try:
+            await asyncio.sleep(0.1)
+            assert not stream.done()
+            signal.raise_signal(signal.SIGTERM)
+            await asyncio.wait_for(stream, 2)
+        finally:
+            restore()
+            await hub.stop()
+        return sent
+
+    previous = signal.signal(signal.SIGTERM, server_handler)
+    try:
+        sent = asyncio.run(scenario())
+        assert signal.getsignal(signal.SIGTERM) is server_handler
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+    assert received == [signal.SIGTERM]
+    assert sent[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
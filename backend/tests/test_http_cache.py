@@ -0,0 +1,56 @@
+"""Conditional GET: ETag validators, If-None-Match: * and the memoized catalog version."""
+import pytest
+from sqlalchemy import text
+
+from app.cache import get_catalog_version_memo
+from app.database import engine
+from app.events import notify_catalog_changed
+
+
+@pytest.fixture(autouse=True)
+def fresh_version():
+    notify_catalog_changed()
+    yield
+    notify_catalog_changed()
+
+
+def test_matching_etag_is_not_modified(client):
+    etag = client.get("/api/products/1").headers["etag"]
+    response = client.get("/api/products/1", headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+def test_star_matches_existing_representation(client):
+    etag = client.get("/api/products/1").headers["etag"]
+    for path in ("/api/products/1", "/api/products?limit=2", "/api/categories"):
+        response = client.get(path, headers={"If-None-Match": "*"})
+        assert response.status_code == 304, path
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+
+def test_star_does_not_match_missing_resource(client):
+    assert client.get("/api/products/999999", headers={"If-None-Match": "*"}).status_code == 404
+    assert client.get("/api/categories/999999", headers={"If-None-Match": "*"}).status_code == 404
+
+
+def test_version_is_read_once_per_ttl(client, query_counter):
+    client.get("/api/categories")
+    query_counter.reset()
+    response = client.get("/api/categories", headers={"If-None-Match": client.get("/api/categories").headers["etag"]})
+    assert response.status_code == 304
+    assert query_counter.count == 0
+
+
+def test_notify_refreshes_version(client):
+    etag = client.get("/api/categories").headers["etag"]
+    memo = get_catalog_version_memo()
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE catalog_state SET version = version + 1"))
+    # Запись в обход приложения (другой процесс): до сброса версия берётся из памяти
+    assert client.get("/api/categories").headers["etag"] == etag
+    notify_catalog_changed()
+    assert memo.get() is None
+    assert client.get("/api/categories").headers["etag"] != etag
+
@@ -0,0 +1,9 @@
+"""Startup import graph: modules the app must not load on a regular boot."""
+import subprocess
+import sys
+
+
+def test_app_does_not_import_seed_data():
+    code = "import sys, app.main; print('app.seed_data' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
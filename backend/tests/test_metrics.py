@@ -0,0 +1,36 @@
+"""Prometheus exposition on /metrics: request histograms, counters, pool gauges and admission bypass."""
+from app import admission
+from app.admission import READ, ConcurrencyLimiter, request_class
+
+
+def test_metrics_exposition_covers_routes_and_pools(client):
+    assert client.get("/api/products/1").status_code == 200
+    assert client.get("/api/products/999999").status_code == 404
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    route = 'route="/api/products/{product_id}"'
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert f'http_request_duration_seconds_bucket{{{route},le="+Inf"}}' in body
+    assert f"http_request_duration_seconds_count{{{route}}}" in body
+    assert f"http_request_db_queries_bucket{{{route}," in body
+    assert "# TYPE http_responses_total counter" in body
+    assert f'http_responses_total{{{route},method="GET",status="200"}}' in body
+    assert f'http_responses_total{{{route},method="GET",status="404"}}' in body
+    assert "# TYPE db_queries_total counter" in body
+    assert "# TYPE db_pool_connections gauge" in body
+    for pool in ("read", "write"):
+        assert f'db_pool_connections{{pool="{pool}",state="checked_out"}}' in body
+    assert "# TYPE admission gauge" in body
+
+
+def test_metrics_route_is_never_admission_controlled(client, monkeypatch):
+    assert request_class({"type": "http", "method": "GET", "path": "/metrics"}) is None
+
+    # Читатели упёрлись в лимит: API отвечает 503, а скрейп метрик проходит
+    monkeypatch.setitem(admission._limiters_by_class, READ, ConcurrencyLimiter(limit=0, queue_size=0, timeout=0.1))
+    assert client.get("/api/categories").status_code == 503
+    assert client.get("/metrics").status_code == 200
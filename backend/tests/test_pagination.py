@@ -0,0 +1,83 @@
+"""Keyset pagination of GET /api/products."""
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from app.database import _normalize_created_at, engine
+from app.models.category import Category
+from app.models.product import Product
+
+
+def _category_with_products(slug: str, created_at: list) -> int:
+    with engine.begin() as connection:
+        category_id = connection.execute(
+            insert(Category).values(name=f"Категория {slug}", slug=slug)
+        ).inserted_primary_key[0]
+        connection.execute(insert(Product), [
+            {"name": f"{slug} {number}", "category_id": category_id, "created_at": value}
+            for number, value in enumerate(created_at)
+        ])
+    return category_id
+
+
+def _walk(client, **params) -> list:
+    ids, cursor = [], None
+    for _ in range(50):  # сломанный курсор может ходить по кругу
+        page = client.get("/api/products", params={**params, "cursor": cursor} if cursor else params).json()
+        ids.extend(product["id"] for product in page["products"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+    raise AssertionError(f"cursor does not advance: {ids[:20]}")
+
+
+def test_created_at_pages_do_not_repeat_boundary_rows(client):
+    # Как у генератора каталога: целые секунды и по два товара на одну отметку времени
+    base = datetime(2024, 1, 1)
+    category_id = _category_with_products(
+        "keyset-seconds", [base + timedelta(seconds=37 * (number // 2)) for number in range(10)]
+    )
+
+    for sort in ("created_at", "-created_at"):
+        ids = _walk(client, category_id=category_id, sort=sort, limit=2, count="none")
+        assert len(ids) == 10 and len(set(ids)) == 10, (sort, ids)
+        assert ids == sorted(ids, reverse=sort.startswith("-")), (sort, ids)
+
+
+def test_created_at_pages_with_microseconds(client):
+    base = datetime(2024, 2, 1, 12, 0, 0, 250_000)
+    category_id = _category_with_products(
+        "keyset-micro", [base + timedelta(microseconds=number // 3) for number in range(9)]
+    )
+    ids = _walk(client, category_id=category_id, sort="created_at", limit=2, count="none")
+    assert len(ids) == 9 and len(set(ids)) == 9
+
+
+def test_default_created_at_uses_the_cursor_format():
+    with engine.begin() as connection:
+        category_id = connection.execute(
+            insert(Category).values(name="Категория keyset-default", slug="keyset-default")
+        ).inserted_primary_key[0]
+        connection.execute(insert(Product), [{"name": "keyset-default 1", "category_id": category_id}])
+        stored = connection.execute(
+            text("SELECT created_at FROM products WHERE name = 'keyset-default 1'")
+        ).scalar()
+    assert datetime.strptime(stored, "%Y-%m-%d %H:%M:%S.%f")
+
+
+def test_schema_upgrade_normalizes_current_timestamp_rows():
+    with engine.begin() as connection:
+        category_id = connection.execute(
+            insert(Category).values(name="Категория keyset-legacy", slug="keyset-legacy")
+        ).inserted_primary_key[0]
+        # Так писал server_default (CURRENT_TIMESTAMP) до перехода на значение из приложения
+        connection.execute(
+            text("INSERT INTO products (name, category_id, created_at) VALUES ('keyset-legacy 1', :id, '2024-03-01 10:00:00')"),
+            {"id": category_id},
+        )
+    _normalize_created_at()
+    with engine.connect() as connection:
+        stored = connection.execute(
+            text("SELECT created_at FROM products WHERE name = 'keyset-legacy 1'")
+        ).scalar()
+    assert stored == "2024-03-01 10:00:00.000000"
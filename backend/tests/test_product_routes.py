@@ -0,0 +1,60 @@
+"""Each product route documents and returns exactly one response shape."""
+import pytest
+
+from app.cache import set_catalog_cache
+from app.config import settings
+from app.main import app
+
+
+def _response_schema(path, method="get"):
+    return app.openapi()["paths"][path][method]["responses"]["200"]["content"]["application/json"]["schema"]
+
+
+def test_product_routes_have_one_response_model():
+    for path, model in [
+        ("/api/products", "ProductListResponse"),
+        ("/api/products/sparse", "SparseProductListResponse"),
+        ("/api/products/batch", "ProductBatchResponse"),
+        ("/api/products/category/{category_id}", "ProductListResponse"),
+        ("/api/products/category/{category_id}/sparse", "SparseProductListResponse"),
+    ]:
+        assert _response_schema(path) == {"$ref": f"#/components/schemas/{model}"}, path
+
+
+def test_multi_get_route(client):
+    body = client.get("/api/products/batch", params={"ids": "2,1,999999"}).json()
+
+    assert [item["id"] for item in body["items"]] == [2, 1, 999999]
+    assert body["missing"] == [999999]
+    assert client.get("/api/products/batch", params={"ids": "x"}).status_code == 400
+
+
+def test_sparse_routes(client):
+    page = client.get("/api/products/sparse", params={"fields": "name", "limit": 3}).json()
+    assert [set(product) for product in page["products"]] == [{"id", "name"}] * 3
+
+    by_category = client.get("/api/products/category/1/sparse", params={"fields": "created_at", "include": "category"}).json()
+    assert all(set(product) == {"id", "created_at", "category"} for product in by_category["products"])
+
+    assert client.get("/api/products/sparse", params={"fields": "price"}).status_code == 400
+    assert client.get("/api/products/category/999999/sparse", params={"fields": "name"}).status_code == 404
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/api/products", {"limit": 5}),
+    ("/api/products", {"limit": 3, "sort": "name", "count": "exact"}),
+    ("/api/products/category/1", {"limit": 5}),
+    ("/api/products/batch", {"ids": "3,1,999999"}),
+    ("/api/products/1", {}),
+    ("/api/categories", {}),
+])
+def test_fast_read_path_is_byte_identical(client, monkeypatch, path, params):
+    bodies = []
+    for fast in (True, False):
+        monkeypatch.setattr(settings, "fast_read_path", fast)
+        set_catalog_cache(None)  # иначе второй проход отдаст ответ первого из кэша
+        response = client.get(path, params=params)
+        assert response.status_code == 200
+        bodies.append(response.content)
+    set_catalog_cache(None)
+    assert bodies[0] == bodies[1]
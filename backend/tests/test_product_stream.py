@@ -0,0 +1,60 @@
+"""Streamed product listings (?stream=true, Accept: application/x-ndjson)."""
+import json
+
+import pytest
+
+from app.config import settings
+from app.database import ReadSessionLocal
+from app.pagination import ProductSort
+from app.services.product_stream import ProductStreamService
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    monkeypatch.setattr(settings, "stream_batch_size", 3)
+
+
+def _paged_ids(client, **params) -> list:
+    ids, cursor = [], None
+    while True:
+        page = client.get("/api/products", params={**params, "limit": 7, **({"cursor": cursor} if cursor else {})}).json()
+        ids.extend(product["id"] for product in page["products"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("sort", ["id", "-name", "created_at"])
+def test_stream_matches_paged_listing(client, small_batches, sort):
+    streamed = client.get("/api/products", params={"stream": "true", "sort": sort}).json()["products"]
+    assert [product["id"] for product in streamed] == _paged_ids(client, sort=sort)
+
+
+def test_ndjson_stream_honours_limit_across_batches(client, small_batches):
+    response = client.get("/api/products", params={"limit": 8}, headers={"Accept": "application/x-ndjson"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [product["id"] for product in lines] == _paged_ids(client)[:8]
+
+
+def test_stream_holds_no_session_between_batches(client, small_batches):
+    open_sessions = []
+
+    def session_factory():
+        session = ReadSessionLocal()
+        open_sessions.append(session)
+        original_close = session.close
+
+        def close():
+            open_sessions.remove(session)
+            original_close()
+
+        session.close = close
+        return session
+
+    chunks = ProductStreamService(session_factory).open(ndjson=True, sort=ProductSort.id)
+    produced = 0
+    for _ in chunks:
+        produced += 1
+        # Клиент читает медленно: в это время соединение из пула читателей не занято
+        assert open_sessions == []
+    assert produced > 1
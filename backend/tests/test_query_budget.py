@@ -0,0 +1,30 @@
+"""Every route stays within its declared SQL query budget (see app.query_budget)."""
+from typing import Iterator
+
+import pytest
+
+from app import query_budget
+from app.main import app
+
+ROUTES = sorted(query_budget._budgets(app))
+
+
+@pytest.fixture(scope="module")
+def budget_run() -> Iterator[query_budget.BudgetRun]:
+    with query_budget.budget_run() as run:
+        yield run
+
+
+def test_seed_within_budget(budget_run):
+    assert not budget_run.seed_failures, "\n".join(budget_run.seed_failures)
+
+
+@pytest.mark.parametrize("method,path", ROUTES, ids=[f"{method} {path}" for method, path in ROUTES])
+def test_route_within_budget(budget_run, method, path):
+    failures = budget_run.check_route(method, path)
+    assert not failures, "\n".join(failures)
+
+
+def test_query_counter_fixture(client, query_counter):
+    assert client.get("/api/categories").status_code == 200
+    query_counter.assert_at_most(2, "GET /api/categories")
@@ -0,0 +1,44 @@
+"""Product search: the FTS index stays usable for writers without the app's SQL functions."""
+import sqlite3
+
+from sqlalchemy import insert
+from sqlalchemy.engine import make_url
+
+from app.database import engine
+from app.models.category import Category
+from app.search import main as rebuild_main
+from app.services.product import ProductService
+
+
+def _search(client, q: str) -> list:
+    return [product["name"] for product in client.get("/api/products/search", params={"q": q}).json()["products"]]
+
+
+def test_triggers_do_not_need_app_functions(client):
+    with engine.begin() as connection:
+        category_id = connection.execute(
+            insert(Category).values(name="Внешняя", slug="external-writer")
+        ).inserted_primary_key[0]
+
+    # Обычное соединение sqlite3 без translit(): так пишут sqlite3 CLI и сторонние скрипты
+    with sqlite3.connect(make_url(str(engine.url)).database) as raw:
+        raw.execute(
+            "INSERT INTO products (name, description, category_id) VALUES (?, ?, ?)",
+            ("Тигельная сталеплавильная", "Плавка в тигле", category_id),
+        )
+        raw.execute("UPDATE products SET description = ? WHERE name = ?", ("Плавка в графитовом тигле", "Тигельная сталеплавильная"))
+
+    assert _search(client, "тигельная") == ["Тигельная сталеплавильная"]
+    assert rebuild_main([]) == 0
+    assert _search(client, "tigelnaya") == ["Тигельная сталеплавильная"]
+
+
+def test_app_writes_fill_latin_terms(client):
+    from app.database import SessionLocal
+    from app.schemas.product import ProductCreate
+
+    with SessionLocal() as db:
+        ProductService(db).create_product(ProductCreate(name="Шахтная печь обжига", description="Обжиг извести", category_id=1))
+
+    assert _search(client, "shakhtnaya obzhiga") == ["Шахтная печь обжига"]
+    assert _search(client, "izvesti") == ["Шахтная печь обжига"]
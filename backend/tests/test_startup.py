@@ -0,0 +1,34 @@
+"""On-disk OpenAPI schema cache."""
+import json
+
+from fastapi import FastAPI
+
+from app.config import settings
+from app.startup import cached_openapi
+
+
+def _cached_app(cache_file, generated):
+    app = FastAPI()
+    generate = app.openapi
+
+    def counting():
+        generated.append(1)
+        return generate()
+
+    app.openapi = counting
+    return cached_openapi(app, cache_file)
+
+
+def test_settings_change_regenerates_cached_schema(tmp_path, monkeypatch):
+    cache_file = tmp_path / "openapi.json"
+    generated = []
+
+    _cached_app(cache_file, generated)()
+    _cached_app(cache_file, generated)()
+    assert len(generated) == 1  # второй процесс взял схему из файла
+    key = json.loads(cache_file.read_text(encoding="utf-8"))["key"]
+
+    monkeypatch.setattr(settings, "products_max_page_size", settings.products_max_page_size + 1)
+    _cached_app(cache_file, generated)()
+    assert len(generated) == 2
+    assert json.loads(cache_file.read_text(encoding="utf-8"))["key"] != key
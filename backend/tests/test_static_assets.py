@@ -0,0 +1,85 @@
+"""Fingerprinted, precompressed static assets."""
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from app.static_assets import IMMUTABLE, MANIFEST_NAME, REVALIDATE, AssetFiles, build_manifest, load_manifest
+
+STYLE = ("body { color: #333; margin: 0 auto; }\n" * 200).encode()
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "site.css").write_bytes(STYLE)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" + bytes(2000))
+    return tmp_path
+
+
+@pytest.fixture
+def assets(static_dir):
+    manifest = build_manifest(static_dir, gzip_min_size=1024, gzip_level=6)
+    app = Starlette(routes=[Mount("/static", AssetFiles(directory=str(static_dir), manifest=manifest))])
+    with TestClient(app) as client:
+        yield client, manifest
+
+
+def test_manifest_rewrites_known_urls(static_dir):
+    manifest = build_manifest(static_dir, gzip_min_size=1024, gzip_level=6)
+
+    css = manifest.assets["css/site.css"]
+    assert css.gzip and (static_dir / "css" / "site.css.gz").exists()
+    assert not manifest.assets["logo.png"].gzip  # png не сжимается
+    assert manifest.url("/static/css/site.css") == f"/static/css/site.{css.digest}.css"
+    assert manifest.url("/static/missing.js") == "/static/missing.js"
+    assert manifest.url("https://cdn.example/logo.png") == "https://cdn.example/logo.png"
+    assert load_manifest(static_dir, rebuild=False).assets == manifest.assets
+
+
+def test_startup_does_not_write_a_missing_manifest(static_dir):
+    manifest = load_manifest(static_dir, rebuild=False)
+
+    assert manifest.assets == {}
+    assert manifest.url("/static/css/site.css") == "/static/css/site.css"
+    assert not (static_dir / MANIFEST_NAME).exists()
+    assert not (static_dir / "css" / "site.css.gz").exists()
+
+
+def test_fingerprinted_path_is_immutable_and_plain_path_revalidates(assets):
+    client, manifest = assets
+    fingerprinted = client.get(manifest.url("/static/logo.png"))
+    plain = client.get("/static/logo.png")
+    stale = client.get("/static/logo.000000000000.png")
+
+    assert fingerprinted.status_code == plain.status_code == stale.status_code == 200
+    assert fingerprinted.headers["cache-control"] == IMMUTABLE
+    assert plain.headers["cache-control"] == REVALIDATE
+    assert stale.headers["cache-control"] == REVALIDATE
+
+
+def test_gzip_and_identity_are_separate_representations(assets):
+    client, manifest = assets
+    url = manifest.url("/static/css/site.css")
+    gzipped = client.get(url, headers={"Accept-Encoding": "gzip"})
+    identity = client.get(url, headers={"Accept-Encoding": "identity"})
+
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity.headers
+    assert gzipped.headers["vary"] == identity.headers["vary"] == "Accept-Encoding"
+    assert gzipped.content == identity.content == STYLE
+    assert gzipped.headers["etag"] != identity.headers["etag"]
+    revalidated = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+def test_range_is_served_from_the_identity_file(assets):
+    client, manifest = assets
+    response = client.get(
+        manifest.url("/static/css/site.css"), headers={"Accept-Encoding": "gzip", "Range": "bytes=5-14"}
+    )
+
+    assert response.status_code == 206
+    assert "content-encoding" not in response.headers
+    assert response.content == STYLE[5:15]
+    assert response.headers["content-range"] == f"bytes 5-14/{len(STYLE)}"